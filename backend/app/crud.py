@@ -3,6 +3,8 @@ import os
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, joinedload
 
 import json as _json
@@ -22,6 +24,10 @@ from app.models import (
     SceneCharacter,
     SceneLocation,
     EngineRating,
+    AnalysisRun,
+    AnalysisCheckpoint,
+    ChunkAnalysisCache,
+    Chapter,
 )
 
 
@@ -39,6 +45,7 @@ def create_book(
     total_words: Optional[int] = None,
     total_pages: Optional[int] = None,
     is_well_known: bool = False,
+    content_sha256: Optional[str] = None,
 ) -> Book:
     book = Book(
         title=title,
@@ -49,6 +56,7 @@ def create_book(
         total_pages=total_pages,
         is_well_known=1 if is_well_known else 0,
         status="imported",
+        content_sha256=content_sha256,
     )
     db.add(book)
     db.commit()
@@ -77,6 +85,10 @@ def get_books(db: Session, skip: int = 0, limit: int = 100) -> list[Book]:
     return db.query(Book).offset(skip).limit(limit).all()
 
 
+def get_books_by_status(db: Session, status: str) -> list[Book]:
+    return db.query(Book).filter(Book.status == status).all()
+
+
 def update_book_status(db: Session, book_id: int, status: str) -> Optional[Book]:
     book = get_book(db, book_id)
     if book:
@@ -87,15 +99,16 @@ def update_book_status(db: Session, book_id: int, status: str) -> Optional[Book]
     return book
 
 
-def update_book(db: Session, book_id: int, **kwargs) -> Optional[Book]:
+def update_book(db: Session, book_id: int, commit: bool = True, **kwargs) -> Optional[Book]:
     book = get_book(db, book_id)
     if book:
         for key, value in kwargs.items():
             if hasattr(book, key):
                 setattr(book, key, value)
         book.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(book)
+        if commit:
+            db.commit()
+            db.refresh(book)
     return book
 
 
@@ -141,7 +154,8 @@ def clear_analysis_results(db: Session, book_id: int) -> None:
     Remove all analysis artefacts for a book so that re-analysis starts fresh.
 
     Deletes: chunk_characters, chunk_locations, characters, locations,
-    visual_bible, illustrations.  Resets dramatic_score on chunks to NULL.
+    visual_bible, illustrations.  Resets dramatic_score and visual_analysis_json
+    on chunks to NULL, so partial results of an earlier run never linger.
     The book record and its chunks are preserved.
     """
     # 1. Delete junction rows (must go first due to FK constraints)
@@ -184,36 +198,186 @@ def clear_analysis_results(db: Session, book_id: int) -> None:
         synchronize_session="fetch"
     )
 
-    # 5b. Delete scenes (cascade deletes SceneCharacter + SceneLocation via relationship)
+    # 5b. Delete scenes and their links (bulk delete bypasses the ORM cascade)
+    scene_ids = db.query(Scene.id).filter(Scene.book_id == book_id)
+    db.query(SceneCharacter).filter(SceneCharacter.scene_id.in_(scene_ids)).delete(
+        synchronize_session="fetch"
+    )
+    db.query(SceneLocation).filter(SceneLocation.scene_id.in_(scene_ids)).delete(
+        synchronize_session="fetch"
+    )
     db.query(Scene).filter(Scene.book_id == book_id).delete(
         synchronize_session="fetch"
     )
 
-    # 6. Reset dramatic scores on chunks
+    # 6. Reset per-chunk analysis on chunks
     if chunk_ids:
         db.query(Chunk).filter(Chunk.id.in_(chunk_ids)).update(
-            {"dramatic_score": None}, synchronize_session="fetch"
+            {"dramatic_score": None, "visual_analysis_json": None}, synchronize_session="fetch"
         )
 
     db.commit()
 
 
+def find_book_by_content_sha256(
+    db: Session,
+    content_sha256: str,
+    *,
+    exclude_book_id: Optional[int] = None,
+) -> Optional[Book]:
+    """Book uploaded with the same file content; analysed books first, then chunked, then newest."""
+    q = db.query(Book).filter(Book.content_sha256 == content_sha256)
+    if exclude_book_id is not None:
+        q = q.filter(Book.id != exclude_book_id)
+    progress = case((Book.status == "ready", 0), (Book.status == "chunked", 1), else_=2)
+    return q.order_by(progress, Book.id.desc()).first()
+
+
+# Never copied by clone_book_analysis: row identity, and choices the user makes per book
+_CLONE_SKIP_COLUMNS = frozenset({
+    "id", "book_id", "created_at", "updated_at",
+    "reference_image_url", "selected_reference_urls", "approved_at",
+})
+
+
+def _clone_rows(db: Session, rows: list, **overrides) -> dict[int, int]:
+    """Insert copies of *rows* with *overrides*; returns {old id: new id}."""
+    copies = []
+    for row in rows:
+        values = {
+            col.key: getattr(row, col.key)
+            for col in row.__table__.columns
+            if col.key not in _CLONE_SKIP_COLUMNS
+        }
+        values.update(overrides)
+        copies.append(type(row)(**values))
+    db.add_all(copies)
+    db.flush()
+    return {row.id: copy.id for row, copy in zip(rows, copies)}
+
+
+def clone_book_analysis(db: Session, source_book_id: int, target_book_id: int) -> dict[str, int]:
+    """
+    Copy chunks and analysis results (characters, locations, chunk/scene links,
+    scenes, visual bible) of *source_book_id* to *target_book_id*, replacing what
+    the target had. Illustrations, covers, reference searches and entity reference
+    selections are not copied. Returns row counts per kind.
+    """
+    source = get_book(db, source_book_id)
+    target = get_book(db, target_book_id)
+    clear_analysis_results(db, target_book_id)
+    db.query(Chunk).filter(Chunk.book_id == target_book_id).delete(synchronize_session="fetch")
+
+    chunk_map = _clone_rows(
+        db, db.query(Chunk).filter(Chunk.book_id == source_book_id).order_by(Chunk.chunk_index).all(),
+        book_id=target_book_id,
+    )
+    char_map = _clone_rows(db, get_characters_by_book(db, source_book_id), book_id=target_book_id)
+    loc_map = _clone_rows(db, get_locations_by_book(db, source_book_id), book_id=target_book_id)
+    scene_map = _clone_rows(db, get_scenes_by_book(db, source_book_id), book_id=target_book_id)
+
+    chunk_chars = db.query(ChunkCharacter).join(Chunk).filter(Chunk.book_id == source_book_id).all()
+    db.add_all(
+        ChunkCharacter(chunk_id=chunk_map[cc.chunk_id], character_id=char_map[cc.character_id])
+        for cc in chunk_chars
+    )
+    chunk_locs = db.query(ChunkLocation).join(Chunk).filter(Chunk.book_id == source_book_id).all()
+    db.add_all(
+        ChunkLocation(chunk_id=chunk_map[cl.chunk_id], location_id=loc_map[cl.location_id])
+        for cl in chunk_locs
+    )
+    scene_ids = list(scene_map)
+    if scene_ids:
+        db.add_all(
+            SceneCharacter(scene_id=scene_map[sc.scene_id], character_id=char_map[sc.character_id])
+            for sc in db.query(SceneCharacter).filter(SceneCharacter.scene_id.in_(scene_ids)).all()
+        )
+        db.add_all(
+            SceneLocation(scene_id=scene_map[sl.scene_id], location_id=loc_map[sl.location_id])
+            for sl in db.query(SceneLocation).filter(SceneLocation.scene_id.in_(scene_ids)).all()
+        )
+
+    visual_bible = get_visual_bible(db, source_book_id)
+    if visual_bible:
+        _clone_rows(db, [visual_bible], book_id=target_book_id)
+
+    target.total_pages = source.total_pages
+    target.scene_count = source.scene_count
+    target.known_adaptations_json = source.known_adaptations_json
+    target.status = source.status if source.status in ("chunked", "ready") else "chunked"
+    db.commit()
+    return {
+        "chunks": len(chunk_map),
+        "characters": len(char_map),
+        "locations": len(loc_map),
+        "scenes": len(scene_map),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Chapters
+# ---------------------------------------------------------------------------
+
+def replace_chapters(db: Session, book_id: int, chapters_data: list[dict]) -> list[Chapter]:
+    """Store a book's detected chapters (see chapter_service.build_chapters), replacing any."""
+    db.query(Chapter).filter(Chapter.book_id == book_id).delete(synchronize_session="fetch")
+    chapters = [
+        Chapter(
+            book_id=book_id,
+            chapter_index=data["chapter_index"],
+            title=data.get("title"),
+            start_char=data["start_char"],
+            end_char=data["end_char"],
+            start_word=data["start_word"],
+            word_count=data.get("word_count"),
+        )
+        for data in chapters_data
+    ]
+    db.add_all(chapters)
+    db.commit()
+    return chapters
+
+
+def copy_chapters(db: Session, source_book_id: int, target_book_id: int) -> int:
+    """Give *target_book_id* the chapters of *source_book_id* (same text file); returns the count."""
+    db.query(Chapter).filter(Chapter.book_id == target_book_id).delete(synchronize_session="fetch")
+    copied = _clone_rows(db, get_chapters_by_book(db, source_book_id), book_id=target_book_id)
+    db.commit()
+    return len(copied)
+
+
+def get_chapters_by_book(db: Session, book_id: int) -> list[Chapter]:
+    return (
+        db.query(Chapter)
+        .filter(Chapter.book_id == book_id)
+        .order_by(Chapter.chapter_index)
+        .all()
+    )
+
+
 # ---------------------------------------------------------------------------
 # Chunks
 # ---------------------------------------------------------------------------
 
 def create_chunks_batch(db: Session, book_id: int, chunks_data: list[dict]) -> list[Chunk]:
-    """Insert multiple chunks in a single transaction."""
+    """
+    Insert multiple chunks in a single transaction. Chunks with text_offset /
+    text_length (see text_store.attach_byte_spans) store no text of their own.
+    """
     chunks = []
     for data in chunks_data:
+        by_offset = data.get("text_offset") is not None
         chunk = Chunk(
             book_id=book_id,
             chunk_index=data["chunk_index"],
-            text=data["text"],
+            stored_text="" if by_offset else data["text"],
+            text_offset=data["text_offset"] if by_offset else None,
+            text_length=data["text_length"] if by_offset else None,
             start_page=data.get("start_page"),
             end_page=data.get("end_page"),
             word_count=data.get("word_count"),
             dramatic_score=data.get("dramatic_score"),
+            chapter_index=data.get("chapter_index"),
         )
         db.add(chunk)
         chunks.append(chunk)
@@ -260,6 +424,18 @@ def update_chunk_visual_analysis(
     return chunk
 
 
+def update_chunks_analysis(db: Session, rows: list[dict], commit: bool = True) -> int:
+    """
+    Bulk-update chunk analysis fields by primary key: rows of {"id", "dramatic_score"
+    and/or "visual_analysis_json"}. One executemany per distinct set of keys.
+    """
+    if rows:
+        db.execute(update(Chunk), rows)
+        if commit:
+            db.commit()
+    return len(rows)
+
+
 def get_chunk_visual_analysis(db: Session, chunk_id: int) -> Optional[dict]:
     """Load visual_analysis_json from chunk. Returns None if empty or invalid."""
     import json
@@ -386,6 +562,7 @@ def create_visual_bible(
     tone_description: Optional[str] = None,
     illustration_frequency: Optional[int] = None,
     layout_style: Optional[str] = None,
+    commit: bool = True,
 ) -> VisualBible:
     vb = VisualBible(
         book_id=book_id,
@@ -395,8 +572,9 @@ def create_visual_bible(
         layout_style=layout_style,
     )
     db.add(vb)
-    db.commit()
-    db.refresh(vb)
+    if commit:
+        db.commit()
+        db.refresh(vb)
     return vb
 
 
@@ -474,18 +652,10 @@ def update_illustration_status(
 def link_chunk_characters(
     db: Session, chunk_id: int, character_ids: list[int], commit: bool = True
 ) -> None:
-    """Create chunk-character links (skip duplicates)."""
-    for cid in character_ids:
-        exists = (
-            db.query(ChunkCharacter)
-            .filter(
-                ChunkCharacter.chunk_id == chunk_id,
-                ChunkCharacter.character_id == cid,
-            )
-            .first()
-        )
-        if not exists:
-            db.add(ChunkCharacter(chunk_id=chunk_id, character_id=cid))
+    """Create chunk-character links (duplicates skipped by the unique constraint)."""
+    _insert_ignoring_duplicates(
+        db, ChunkCharacter, [{"chunk_id": chunk_id, "character_id": cid} for cid in character_ids]
+    )
     if commit:
         db.commit()
 
@@ -493,18 +663,10 @@ def link_chunk_characters(
 def link_chunk_locations(
     db: Session, chunk_id: int, location_ids: list[int], commit: bool = True
 ) -> None:
-    """Create chunk-location links (skip duplicates)."""
-    for lid in location_ids:
-        exists = (
-            db.query(ChunkLocation)
-            .filter(
-                ChunkLocation.chunk_id == chunk_id,
-                ChunkLocation.location_id == lid,
-            )
-            .first()
-        )
-        if not exists:
-            db.add(ChunkLocation(chunk_id=chunk_id, location_id=lid))
+    """Create chunk-location links (duplicates skipped by the unique constraint)."""
+    _insert_ignoring_duplicates(
+        db, ChunkLocation, [{"chunk_id": chunk_id, "location_id": lid} for lid in location_ids]
+    )
     if commit:
         db.commit()
 
@@ -544,6 +706,7 @@ def create_search_query(
     query_text: str,
     results_count: int = 0,
     provider: Optional[str] = None,
+    commit: bool = True,
 ) -> SearchQuery:
     sq = SearchQuery(
         book_id=book_id,
@@ -554,8 +717,9 @@ def create_search_query(
         provider=provider,
     )
     db.add(sq)
-    db.commit()
-    db.refresh(sq)
+    if commit:
+        db.commit()
+        db.refresh(sq)
     return sq
 
 
@@ -586,6 +750,7 @@ def create_reference_image(
     width: Optional[int] = None,
     height: Optional[int] = None,
     source: str,  # "unsplash" | "serpapi" | "user"
+    commit: bool = True,
 ) -> ReferenceImage:
     rec = ReferenceImage(
         book_id=book_id,
@@ -598,8 +763,9 @@ def create_reference_image(
         source=source,
     )
     db.add(rec)
-    db.commit()
-    db.refresh(rec)
+    if commit:
+        db.commit()
+        db.refresh(rec)
     return rec
 
 
@@ -642,6 +808,7 @@ def trim_reference_images_fifo(
     entity_id: int,
     limit: int = REFERENCE_IMAGES_POOL_LIMIT,
     exclude_urls: Optional[set[str]] = None,
+    commit: bool = True,
 ) -> None:
     """
     Keep at most `limit` reference images per entity; remove oldest by created_at (FIFO).
@@ -660,7 +827,8 @@ def trim_reference_images_fifo(
         to_delete.append(r)
     for r in to_delete:
         db.delete(r)
-    db.commit()
+    if commit:
+        db.commit()
 
 
 def get_selected_reference_urls(db: Session, entity_type: str, entity_id: int) -> list[str]:
@@ -904,6 +1072,90 @@ def create_scene_location(
     return sl
 
 
+# ---------------------------------------------------------------------------
+# Bulk persistence of analysis results
+# ---------------------------------------------------------------------------
+# One executemany per table instead of an add/commit/refresh per row. Junction rows
+# use INSERT ... ON CONFLICT DO NOTHING against their unique constraints, so SQLite
+# skips duplicates without an existence SELECT per pair. Nothing here commits: the
+# caller runs them in one transaction (a DbWriter job).
+
+def _insert_ignoring_duplicates(db: Session, model, rows: list[dict]) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING for all *rows* in one executemany."""
+    if rows:
+        db.execute(sqlite_insert(model).on_conflict_do_nothing(), rows)
+
+
+def _bulk_insert_returning_ids(db: Session, model, rows: list[dict]) -> list[int]:
+    """
+    Insert *rows* (same keys in each) with batched multi-row INSERT ... RETURNING;
+    returns the ids in row order. SQLite gives each new row max(rowid) + 1, so within
+    the one write transaction the ids ascend in insertion order and sorting them
+    restores it (asking SQLAlchemy for parameter order would insert row by row here).
+    """
+    if not rows:
+        return []
+    result = db.execute(
+        insert(model).returning(model.id),
+        rows,
+        execution_options={"render_nulls": True},  # keep None values: one key set, one batch
+    )
+    return sorted(result.scalars())
+
+
+def bulk_create_characters(db: Session, rows: list[dict]) -> list[int]:
+    """Insert character rows (book_id, name, ... incl. ontology JSON); ids in row order."""
+    return _bulk_insert_returning_ids(db, Character, rows)
+
+
+def bulk_create_locations(db: Session, rows: list[dict]) -> list[int]:
+    """Insert location rows (book_id, name, ... incl. ontology JSON); ids in row order."""
+    return _bulk_insert_returning_ids(db, Location, rows)
+
+
+def bulk_link_chunk_entities(
+    db: Session,
+    character_links: list[tuple[int, int]],
+    location_links: list[tuple[int, int]],
+) -> None:
+    """Create (chunk_id, character_id) and (chunk_id, location_id) links, skipping existing ones."""
+    _insert_ignoring_duplicates(
+        db, ChunkCharacter, [{"chunk_id": ch, "character_id": cid} for ch, cid in character_links]
+    )
+    _insert_ignoring_duplicates(
+        db, ChunkLocation, [{"chunk_id": ch, "location_id": lid} for ch, lid in location_links]
+    )
+
+
+def replace_scenes_bulk(
+    db: Session,
+    book_id: int,
+    scenes: list[dict],
+    character_ids: list[list[int]],
+    location_ids: list[list[int]],
+) -> list[int]:
+    """
+    Replace a book's scenes: bulk-delete the old scenes with their links and
+    illustrations, insert *scenes* and link scene i to character_ids[i] /
+    location_ids[i]. Returns the new scene ids in order.
+    """
+    old_ids = db.query(Scene.id).filter(Scene.book_id == book_id)
+    for model in (SceneCharacter, SceneLocation, Illustration):
+        db.query(model).filter(model.scene_id.in_(old_ids)).delete(synchronize_session="fetch")
+    db.query(Scene).filter(Scene.book_id == book_id).delete(synchronize_session="fetch")
+
+    scene_ids = _bulk_insert_returning_ids(db, Scene, [{"book_id": book_id, **row} for row in scenes])
+    _insert_ignoring_duplicates(db, SceneCharacter, [
+        {"scene_id": sid, "character_id": cid}
+        for sid, cids in zip(scene_ids, character_ids) for cid in cids
+    ])
+    _insert_ignoring_duplicates(db, SceneLocation, [
+        {"scene_id": sid, "location_id": lid}
+        for sid, lids in zip(scene_ids, location_ids) for lid in lids
+    ])
+    return scene_ids
+
+
 # ---------------------------------------------------------------------------
 # Engine Ratings
 # ---------------------------------------------------------------------------
@@ -940,3 +1192,142 @@ def update_engine_rating(
 def get_engine_ratings_list(db: Session, book_id: int) -> list[EngineRating]:
     """Returns all EngineRating rows for the book."""
     return db.query(EngineRating).filter(EngineRating.book_id == book_id).all()
+
+
+# ---------------------------------------------------------------------------
+# Analysis runs & checkpoints
+# ---------------------------------------------------------------------------
+
+def create_analysis_run(
+    db: Session,
+    *,
+    book_id: int,
+    run_id: str,
+    chunks_fingerprint: Optional[str] = None,
+    params_json: Optional[str] = None,
+) -> AnalysisRun:
+    run = AnalysisRun(
+        book_id=book_id,
+        run_id=run_id,
+        status="running",
+        chunks_fingerprint=chunks_fingerprint,
+        params_json=params_json,
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def get_analysis_run(db: Session, run_id: str) -> Optional[AnalysisRun]:
+    return db.query(AnalysisRun).filter(AnalysisRun.run_id == run_id).first()
+
+
+def get_latest_analysis_run(db: Session, book_id: int) -> Optional[AnalysisRun]:
+    return (
+        db.query(AnalysisRun)
+        .filter(AnalysisRun.book_id == book_id)
+        .order_by(AnalysisRun.created_at.desc(), AnalysisRun.id.desc())
+        .first()
+    )
+
+
+def get_resumable_analysis_run(
+    db: Session, book_id: int, chunks_fingerprint: str
+) -> Optional[AnalysisRun]:
+    """Latest unfinished run for the same chunks + LLM parameters, if any."""
+    run = get_latest_analysis_run(db, book_id)
+    if run and run.status != "completed" and run.chunks_fingerprint == chunks_fingerprint:
+        return run
+    return None
+
+
+def update_analysis_run_status(db: Session, run_id: str, status: str) -> Optional[AnalysisRun]:
+    run = get_analysis_run(db, run_id)
+    if run:
+        run.status = status
+        run.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(run)
+    return run
+
+
+def delete_analysis_runs(db: Session, book_id: int, keep_run_id: Optional[str] = None) -> int:
+    """Delete a book's analysis runs (and their checkpoints), except *keep_run_id*."""
+    runs = db.query(AnalysisRun).filter(AnalysisRun.book_id == book_id).all()
+    count = 0
+    for run in runs:
+        if run.run_id == keep_run_id:
+            continue
+        db.delete(run)
+        count += 1
+    db.commit()
+    return count
+
+
+def save_analysis_checkpoint(
+    db: Session, run_id: str, stage: str, payload: bytes, commit: bool = True
+) -> None:
+    """Insert or replace the checkpoint for (run_id, stage)."""
+    row = (
+        db.query(AnalysisCheckpoint)
+        .filter(AnalysisCheckpoint.run_id == run_id, AnalysisCheckpoint.stage == stage)
+        .first()
+    )
+    if row:
+        row.payload = payload
+        row.created_at = datetime.utcnow()
+    else:
+        db.add(AnalysisCheckpoint(run_id=run_id, stage=stage, payload=payload))
+    if commit:
+        db.commit()
+
+
+def get_analysis_checkpoints(db: Session, run_id: str) -> dict[str, bytes]:
+    """Return {stage: compressed payload} for a run."""
+    rows = (
+        db.query(AnalysisCheckpoint.stage, AnalysisCheckpoint.payload)
+        .filter(AnalysisCheckpoint.run_id == run_id)
+        .all()
+    )
+    return {stage: payload for stage, payload in rows}
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed chunk analysis cache
+# ---------------------------------------------------------------------------
+
+# Keys per IN (...) query; stays below SQLite's bound-parameter limit
+_CACHE_LOOKUP_SLICE = 500
+
+
+def get_chunk_analysis_cache(db: Session, cache_keys: list[str]) -> dict[str, bytes]:
+    """Return {cache_key: compressed payload} for the keys that are cached."""
+    found: dict[str, bytes] = {}
+    for i in range(0, len(cache_keys), _CACHE_LOOKUP_SLICE):
+        rows = (
+            db.query(ChunkAnalysisCache.cache_key, ChunkAnalysisCache.payload)
+            .filter(ChunkAnalysisCache.cache_key.in_(cache_keys[i:i + _CACHE_LOOKUP_SLICE]))
+            .all()
+        )
+        found.update({key: payload for key, payload in rows})
+    return found
+
+
+def save_chunk_analysis_cache(db: Session, entries: dict[str, bytes], commit: bool = True) -> None:
+    """Insert or replace cache entries {cache_key: compressed payload} in one commit."""
+    if not entries:
+        return
+    existing = {
+        row.cache_key: row
+        for row in db.query(ChunkAnalysisCache).filter(ChunkAnalysisCache.cache_key.in_(list(entries)))
+    }
+    for key, payload in entries.items():
+        row = existing.get(key)
+        if row:
+            row.payload = payload
+            row.created_at = datetime.utcnow()
+        else:
+            db.add(ChunkAnalysisCache(cache_key=key, payload=payload))
+    if commit:
+        db.commit()
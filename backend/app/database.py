@@ -1,18 +1,58 @@
 """Database connection and session management."""
 import logging
 import os
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, event, text, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
+# SQLite pragma profile applied to every new connection. WAL lets the background
+# analysis write while request handlers read; synchronous=NORMAL is durable in WAL
+# mode except for the last transactions on power loss. Set a value to "" to keep
+# SQLite's default for that pragma.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative: KiB rather than pages (64 MiB per connection)
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    # Wait for a lock this long before "database is locked"
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", ""),
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict[str, str]) -> None:
+    """Run ``PRAGMA name = value`` for each non-empty entry of *pragmas*."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if value != "":
+                cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def use_sqlite_pragmas(target: Engine, pragmas: dict[str, str] = SQLITE_PRAGMAS) -> None:
+    """Apply *pragmas* to every connection *target* opens (no-op for other databases)."""
+    if target.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False, "timeout": 30},
     echo=False,
 )
+use_sqlite_pragmas(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -35,6 +75,7 @@ def init_db():
         Illustration, Cover, KDPExport, ChunkCharacter, ChunkLocation,
         SearchQuery, ReferenceImage,
         Scene, SceneCharacter, SceneLocation, EngineRating,
+        AnalysisRun, AnalysisCheckpoint, ChunkAnalysisCache, Chapter,
     )
     try:
         Base.metadata.create_all(bind=engine)
@@ -94,11 +135,27 @@ def _run_migrations():
     _add_column_if_missing("scenes", "title_display", "TEXT")
     _add_column_if_missing("scenes", "narrative_summary_display", "TEXT")
 
+    # Content-addressed uploads: duplicate manuscripts are found by file hash
+    _add_column_if_missing("books", "content_sha256", "VARCHAR(64)")
+    _create_index_if_missing("books", "ix_books_content_sha256", "content_sha256")
+
+    # Chapters detected at ingestion (chapters table created via create_all if new)
+    _add_column_if_missing("chunks", "chapter_index", "INTEGER")
+
+    # Chunk text as a byte span of the book's text file (chunks.text left empty)
+    _add_column_if_missing("chunks", "text_offset", "INTEGER")
+    _add_column_if_missing("chunks", "text_length", "INTEGER")
+
     # Reference images pool table (created via create_all if new)
 
+    # Resumable analysis: analysis_runs + analysis_checkpoints (created via create_all if new)
+
     # Drop reading_progress table if it exists (not needed for B2B)
     _drop_table_if_exists("reading_progress")
 
+    # Large text/JSON columns are CompressedText: compress rows written before
+    _compress_text_columns()
+
 
 def _add_column_if_missing(table: str, column: str, col_type: str):
     """Safely add a column to an existing table (SQLite ALTER TABLE)."""
@@ -110,6 +167,70 @@ def _add_column_if_missing(table: str, column: str, col_type: str):
         logger.info("Migration: added column %s.%s", table, column)
 
 
+def _create_index_if_missing(table: str, index: str, columns: str):
+    """Create an index on an existing table (create_all only indexes new tables)."""
+    insp = inspect(engine)
+    if index not in {ix["name"] for ix in insp.get_indexes(table)}:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})"))
+        logger.info("Migration: created index %s", index)
+
+
+# PRAGMA user_version once existing rows of CompressedText columns are compressed
+_COMPRESSED_SCHEMA_VERSION = 1
+_COMPRESS_BATCH_ROWS = 500
+
+
+def _compress_text_columns():
+    """
+    One-off: rewrite plain TEXT values of every CompressedText column in compressed
+    form, in batches. Marked done in PRAGMA user_version; reads accept both forms,
+    so an interrupted run is simply finished on the next start.
+    """
+    from app.models import COMPRESS_MIN_BYTES, CompressedText, compress_text
+
+    with engine.connect() as conn:
+        if conn.execute(text("PRAGMA user_version")).scalar() >= _COMPRESSED_SCHEMA_VERSION:
+            return
+    compressed = 0
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, CompressedText):
+                continue
+            select_rows = text(
+                f"SELECT rowid, {column.name} FROM {table.name} "
+                f"WHERE rowid > :after AND typeof({column.name}) = 'text' "
+                f"AND length(CAST({column.name} AS BLOB)) >= :min_bytes "
+                f"ORDER BY rowid LIMIT :limit"
+            )
+            update_row = text(f"UPDATE {table.name} SET {column.name} = :value WHERE rowid = :rowid")
+            after = 0
+            while True:
+                with engine.begin() as conn:
+                    rows = conn.execute(
+                        select_rows,
+                        {"after": after, "min_bytes": COMPRESS_MIN_BYTES, "limit": _COMPRESS_BATCH_ROWS},
+                    ).all()
+                    updates = [
+                        {"rowid": rowid, "value": packed}
+                        for rowid, value in rows
+                        if isinstance(packed := compress_text(value), bytes)
+                    ]
+                    if updates:
+                        conn.execute(update_row, updates)
+                if not rows:
+                    break
+                compressed += len(updates)
+                after = rows[-1][0]
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {_COMPRESSED_SCHEMA_VERSION}"))
+    if compressed:
+        logger.info("Migration: compressed %d text values, reclaiming space", compressed)
+        # Freed pages only shrink the file after a VACUUM (not allowed in a transaction)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+
 def _drop_table_if_exists(table: str):
     """Safely drop a table if it exists (for deprecated tables)."""
     insp = inspect(engine)
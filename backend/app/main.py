@@ -9,6 +9,9 @@ load_dotenv()
 
 from app.database import init_db  # noqa: E402
 from app.routers import books, visual_bible, illustrations, webhook, scenes, settings  # noqa: E402
+from app.services.book_service import close_http_client, shutdown_chunk_pool  # noqa: E402
+from app.services.db_writer import shutdown_db_writer  # noqa: E402
+from app.services.text_store import close_all as close_text_maps  # noqa: E402
 
 app = FastAPI(
     title="StoryForge AI",
@@ -47,6 +50,15 @@ app.include_router(settings.router, prefix="/api", tags=["settings"])
 @app.on_event("startup")
 def on_startup():
     init_db()
+    books.resume_interrupted_analyses()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    shutdown_chunk_pool()
+    await close_http_client()
+    close_text_maps()
+    shutdown_db_writer()
 
 
 @app.get("/health")
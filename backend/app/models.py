@@ -1,5 +1,7 @@
 """SQLAlchemy models for StoryForge AI application."""
+import zlib
 from datetime import datetime
+from typing import Optional, Union
 
 from sqlalchemy import (
     Column,
@@ -12,10 +14,75 @@ from sqlalchemy import (
     UniqueConstraint,
     Index,
     Boolean,
+    LargeBinary,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 
 from app.database import Base
+from app.services.text_store import read_span
+
+
+# ---------------------------------------------------------------------------
+# Compressed text columns
+# ---------------------------------------------------------------------------
+
+# Values shorter than this many UTF-8 bytes stay plain TEXT
+COMPRESS_MIN_BYTES = 256
+_ZLIB_LEVEL = 6
+# First byte of a compressed value: raw deflate stream primed with _ZDICT_V1
+_FORMAT_ZLIB_DICT_V1 = 1
+# zlib preset dictionary: JSON keys and phrases shared by the analysis columns, so
+# values of a few hundred bytes compress too. Rows depend on it byte for byte —
+# never edit it; add a new format with a new dictionary instead.
+_ZDICT_V1 = (
+    'the of and a in to with his her their is was "description": "mood": "subject": '
+    '"type": "emotions": "mentions": "personality": "atmosphere": "visual_style": '
+    '"visual_richness": "visual_moment": "technical_tokens": "archetype_tokens": '
+    '"anti_tokens": "materiality": "power_status": "embodiment": "visual_type": '
+    '"scene_id": "scene_type": "title": "primary_location": "characters_present": '
+    '"character_ontologies": "composition_tokens": "environment_tokens": '
+    '"character_tokens": "style_category": "abstract": "flux": "scene_prompt_draft": '
+    '"scene_visual_tokens": "anti_human_override": false, "anti_human_override": true, '
+    '"search_archetype": "entity_class": "visual_markers": ["role": "name": '
+    '"visual_description": "core_tokens": ["style_tokens": ["visual_layers": {"visual_tokens": {'
+).encode("utf-8")
+
+
+def compress_text(value: str) -> Union[str, bytes]:
+    """Storage form of *value* for a CompressedText column (see decompress_text)."""
+    data = value.encode("utf-8")
+    if len(data) < COMPRESS_MIN_BYTES:
+        return value
+    compressor = zlib.compressobj(_ZLIB_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_ZDICT_V1)
+    packed = bytes([_FORMAT_ZLIB_DICT_V1]) + compressor.compress(data) + compressor.flush()
+    return packed if len(packed) < len(data) else value
+
+
+def decompress_text(stored: Union[str, bytes, None]) -> Optional[str]:
+    """Value of a CompressedText column as stored: TEXT as-is, BLOB decompressed."""
+    if stored is None or isinstance(stored, str):
+        return stored
+    if stored[0] != _FORMAT_ZLIB_DICT_V1:
+        raise ValueError(f"Unknown compressed text format {stored[0]}")
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_ZDICT_V1)
+    return (decompressor.decompress(stored[1:]) + decompressor.flush()).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """
+    TEXT column whose large values are stored as zlib-compressed BLOBs (SQLite keeps
+    the BLOB as-is in a TEXT column). Reads accept both forms, so rows written before
+    the column was compressed need no conversion (see database._compress_text_columns).
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
 
 
 # ---------------------------------------------------------------------------
@@ -39,9 +106,9 @@ class Scene(Base):
     visual_intensity = Column(Float, nullable=True)
     illustration_priority = Column(String, nullable=True)
     narrative_position = Column(String, nullable=True)
-    scene_prompt_draft = Column(Text, nullable=True)
-    scene_visual_tokens_json = Column(Text, nullable=True)
-    t2i_prompt_json = Column(Text, nullable=True)
+    scene_prompt_draft = Column(CompressedText, nullable=True)
+    scene_visual_tokens_json = Column(CompressedText, nullable=True)
+    t2i_prompt_json = Column(CompressedText, nullable=True)
     is_selected = Column(Integer, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -100,6 +167,49 @@ class EngineRating(Base):
     )
 
 
+# ---------------------------------------------------------------------------
+# Analysis runs + durable stage checkpoints (resumable analysis)
+# ---------------------------------------------------------------------------
+
+class AnalysisRun(Base):
+    __tablename__ = "analysis_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, nullable=False, unique=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    status = Column(String, default="running")  # running | completed | failed
+    chunks_fingerprint = Column(String, nullable=True)  # sha256 of chunk texts + LLM-relevant params
+    params_json = Column(Text, nullable=True)  # BookAnalyzeRequest dump, used to resume after restart
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    checkpoints = relationship("AnalysisCheckpoint", cascade="all, delete-orphan")
+
+    __table_args__ = (Index("ix_analysis_runs_book_id", "book_id"),)
+
+
+class AnalysisCheckpoint(Base):
+    __tablename__ = "analysis_checkpoints"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, ForeignKey("analysis_runs.run_id"), nullable=False)
+    stage = Column(String, nullable=False)  # batch:<first>-<last> | consolidation | ontology | ...
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("run_id", "stage", name="uq_analysis_checkpoint"),)
+
+
+class ChunkAnalysisCache(Base):
+    """Per-chunk batch-analysis output, content-addressed so any book/run with the same chunk reuses it."""
+    __tablename__ = "chunk_analysis_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String(64), nullable=False, unique=True)  # sha256(prompt version, model, chunk text)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON: analysis + its characters/locations
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # ---------------------------------------------------------------------------
 # Books
 # ---------------------------------------------------------------------------
@@ -121,12 +231,14 @@ class Book(Base):
     well_known_book_title = Column(Text, nullable=True)  # B2B: title of the well-known published work (e.g. "A Study in Scarlet")
     similar_book_title = Column(Text, nullable=True)  # B2B: reference book for search optimization
     scene_count = Column(Integer, nullable=True, default=10)
-    known_adaptations_json = Column(Text, nullable=True)
+    known_adaptations_json = Column(CompressedText, nullable=True)
+    content_sha256 = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded file
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     chunks = relationship("Chunk", back_populates="book", cascade="all, delete-orphan")
+    chapters = relationship("Chapter", back_populates="book", cascade="all, delete-orphan")
     characters = relationship("Character", back_populates="book", cascade="all, delete-orphan")
     locations = relationship("Location", back_populates="book", cascade="all, delete-orphan")
     visual_bible = relationship("VisualBible", back_populates="book", uselist=False, cascade="all, delete-orphan")
@@ -136,6 +248,7 @@ class Book(Base):
     search_queries = relationship("SearchQuery", back_populates="book", cascade="all, delete-orphan")
     scenes = relationship("Scene", back_populates="book", cascade="all, delete-orphan")
     engine_ratings = relationship("EngineRating", cascade="all, delete-orphan")
+    analysis_runs = relationship("AnalysisRun", cascade="all, delete-orphan")
 
 
 # ---------------------------------------------------------------------------
@@ -148,12 +261,16 @@ class Chunk(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
     chunk_index = Column(Integer, nullable=False)
-    text = Column(Text, nullable=False)
+    # Empty when the text is read from the book's file (text_offset / text_length)
+    stored_text = Column("text", CompressedText, key="stored_text", nullable=False, default="")
     start_page = Column(Integer, nullable=True)
     end_page = Column(Integer, nullable=True)
     word_count = Column(Integer, nullable=True)
     dramatic_score = Column(Float, nullable=True)  # 0.0 – 1.0
-    visual_analysis_json = Column(Text, nullable=True)  # JSON: {visual_layers, visual_tokens}
+    visual_analysis_json = Column(CompressedText, nullable=True)  # JSON: {visual_layers, visual_tokens}
+    chapter_index = Column(Integer, nullable=True)  # Chapter.chapter_index; NULL if the book has no chapters
+    text_offset = Column(Integer, nullable=True)  # UTF-8 byte span in Book.file_path (see text_store)
+    text_length = Column(Integer, nullable=True)
 
     # Relationships
     book = relationship("Book", back_populates="chunks")
@@ -161,12 +278,48 @@ class Chunk(Base):
     chunk_characters = relationship("ChunkCharacter", back_populates="chunk", cascade="all, delete-orphan")
     chunk_locations = relationship("ChunkLocation", back_populates="chunk", cascade="all, delete-orphan")
 
+    @property
+    def text(self) -> str:
+        """Chunk text: a slice of the book's text file, or the stored copy."""
+        if self.text_offset is None:
+            return self.stored_text
+        return read_span(self.book.file_path, self.text_offset, self.text_length)
+
+    @text.setter
+    def text(self, value: str) -> None:
+        self.stored_text = value
+        self.text_offset = self.text_length = None
+
     __table_args__ = (
         Index("ix_chunks_book_id", "book_id"),
         Index("ix_chunks_book_index", "book_id", "chunk_index"),
     )
 
 
+# ---------------------------------------------------------------------------
+# Chapters
+# ---------------------------------------------------------------------------
+
+class Chapter(Base):
+    """Chapter detected at ingestion: a [start_char, end_char) range of the book's text file."""
+    __tablename__ = "chapters"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    chapter_index = Column(Integer, nullable=False)
+    title = Column(Text, nullable=True)  # NULL for front matter before the first heading
+    start_char = Column(Integer, nullable=False)
+    end_char = Column(Integer, nullable=False)
+    start_word = Column(Integer, nullable=False)  # words of the text before the chapter
+    word_count = Column(Integer, nullable=True)
+
+    book = relationship("Book", back_populates="chapters")
+
+    __table_args__ = (
+        UniqueConstraint("book_id", "chapter_index", name="uq_chapter_book_index"),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Characters
 # ---------------------------------------------------------------------------
@@ -188,8 +341,8 @@ class Character(Base):
     canonical_search_name = Column(String, nullable=True)
     search_visual_analog = Column(Text, nullable=True)
     text_to_image_prompt = Column(Text, nullable=True)
-    ontology_json = Column(Text, nullable=True)
-    entity_visual_tokens_json = Column(Text, nullable=True)
+    ontology_json = Column(CompressedText, nullable=True)
+    entity_visual_tokens_json = Column(CompressedText, nullable=True)
 
     # Relationships
     book = relationship("Book", back_populates="characters")
@@ -219,8 +372,8 @@ class Location(Base):
     canonical_search_name = Column(String, nullable=True)
     search_visual_analog = Column(Text, nullable=True)
     text_to_image_prompt = Column(Text, nullable=True)
-    ontology_json = Column(Text, nullable=True)
-    entity_visual_tokens_json = Column(Text, nullable=True)
+    ontology_json = Column(CompressedText, nullable=True)
+    entity_visual_tokens_json = Column(CompressedText, nullable=True)
 
     # Relationships
     book = relationship("Book", back_populates="locations")
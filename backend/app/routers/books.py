@@ -2,9 +2,13 @@
 import json as json_lib
 import logging
 import os
+import threading
+import uuid
+from concurrent.futures import Future
 from typing import Any, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal, get_db
@@ -15,6 +19,7 @@ from app.schemas import (
     AnalyzeStatusResponse,
     StatusResponse,
     ChunkResponse,
+    ChapterResponse,
     CharacterResponse,
     LocationResponse,
     SearchQueryResponse,
@@ -25,10 +30,18 @@ from app.services.book_service import (
     download_text_from_google_drive,
     compute_metadata,
     guess_title,
-    chunk_text,
+    chunk_chapters,
+    chunk_text_parallel,
+    load_page_map,
+    save_headings,
+    save_page_map,
 )
-from app.services.upload_service import process_manuscript_upload, UploadError
+from app.services.upload_service import process_saved_manuscript, stream_upload_to_disk, UploadError
 from app.services.ai_service import run_full_analysis
+from app.services.chapter_service import detect_chapters
+from app.services.db_writer import get_db_writer
+from app.services.text_store import attach_byte_spans, read_book_text
+from app.services.analysis_store import ChunkAnalysisCache, CheckpointStore, RunLock, chunks_fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -55,23 +68,58 @@ async def upload_manuscript(
     t0 = time.perf_counter()
     logger.info("[upload] manuscripts/upload: endpoint entered (db session ready) in %.2fs", time.perf_counter() - t0)
     try:
-        logger.info("[upload] reading file...")
-        file_content = await file.read()
-        logger.info("[upload] file.read() done in %.2fs, size=%d bytes", time.perf_counter() - t0, len(file_content))
-
         upload_dir = os.path.join(
             os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
             "data",
             "uploads",
         )
+        filename = file.filename or "manuscript.txt"
 
-        t1 = time.perf_counter()
-        text, metadata = process_manuscript_upload(
-            file_content,
-            file.filename or "manuscript.txt",
-            upload_dir
+        # Stream to disk in blocks: memory per upload stays constant, size is
+        # enforced and the content hash computed while reading
+        file_path, file_size, content_sha256 = await stream_upload_to_disk(file, filename, upload_dir)
+        logger.info(
+            "[upload] streamed to disk in %.2fs, size=%d bytes, sha256=%s",
+            time.perf_counter() - t0, file_size, content_sha256[:12],
         )
-        logger.info("[upload] process_manuscript_upload done in %.2fs", time.perf_counter() - t1)
+
+        texts_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+            "data",
+            "texts",
+        )
+        os.makedirs(texts_dir, exist_ok=True)
+        # Texts are stored by content hash: re-uploads of a file share one text file
+        text_file_path = os.path.join(texts_dir, f"{content_sha256}.txt")
+
+        duplicate = crud.find_book_by_content_sha256(db, content_sha256)
+        if duplicate and duplicate.file_path and os.path.isfile(duplicate.file_path):
+            # Same file as an earlier book: skip extraction, the client may clone its analysis
+            logger.info("[upload] duplicate of book_id=%s, skipping text extraction", duplicate.id)
+            text_file_path = duplicate.file_path
+            metadata = {
+                'title': duplicate.title,
+                'word_count': duplicate.total_words,
+                'estimated_pages': duplicate.total_pages,
+            }
+        else:
+            duplicate = None
+            t1 = time.perf_counter()
+            # Off the event loop: PDF/DOCX parsing runs in a limited worker process
+            text, metadata = await run_in_threadpool(process_saved_manuscript, file_path, filename)
+            logger.info("[upload] process_saved_manuscript done in %.2fs", time.perf_counter() - t1)
+
+            t3 = time.perf_counter()
+            if not os.path.isfile(text_file_path):
+                with open(text_file_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                if metadata.get('page_word_starts'):
+                    # Real PDF page boundaries, used for chunk start/end pages
+                    save_page_map(text_file_path, metadata['page_word_starts'])
+                if metadata.get('headings'):
+                    # DOCX heading structure (title, level, word offset)
+                    save_headings(text_file_path, metadata['headings'])
+            logger.info("[upload] write text file done in %.2fs", time.perf_counter() - t3)
 
         t2 = time.perf_counter()
         book = crud.create_book(
@@ -79,31 +127,26 @@ async def upload_manuscript(
             title=metadata['title'],
             total_words=metadata['word_count'],
             total_pages=metadata['estimated_pages'],
+            file_path=text_file_path,
+            content_sha256=content_sha256,
         )
+        if duplicate:
+            crud.copy_chapters(db, duplicate.id, book.id)
+        elif metadata.get('chapters'):
+            crud.replace_chapters(db, book.id, metadata['chapters'])
         logger.info("[upload] crud.create_book done in %.2fs, book_id=%s", time.perf_counter() - t2, book.id)
-
-        texts_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            "data",
-            "texts",
-        )
-        os.makedirs(texts_dir, exist_ok=True)
-        text_file_path = os.path.join(texts_dir, f"book_{book.id}.txt")
-
-        t3 = time.perf_counter()
-        with open(text_file_path, "w", encoding="utf-8") as f:
-            f.write(text)
-        logger.info("[upload] write text file done in %.2fs", time.perf_counter() - t3)
-
-        crud.update_book(db, book.id, file_path=text_file_path)
         logger.info("[upload] full upload flow done in %.2fs", time.perf_counter() - t0)
 
         logger.info(
             f"Uploaded manuscript: book_id={book.id}, title={metadata['title']}, "
-            f"words={metadata['word_count']}, pages={metadata['estimated_pages']}"
+            f"words={metadata['word_count']}, pages={metadata['estimated_pages']}, "
+            f"chapters={len(book.chapters)}"
         )
-        
-        return crud.get_book(db, book.id)
+
+        response = BookResponse.model_validate(book)
+        if duplicate:
+            response.duplicate_of_book_id = duplicate.id
+        return response
         
     except UploadError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -150,6 +193,9 @@ async def import_book(req: BookImportRequest, db: Session = Depends(get_db)):
         f.write(text)
 
     crud.update_book(db, book.id, file_path=file_path)
+    chapters = detect_chapters(text)
+    if chapters:
+        crud.replace_chapters(db, book.id, chapters)
 
     logger.info("Imported book id=%s title=%s words=%s", book.id, title, meta["total_words"])
     return crud.get_book(db, book.id)
@@ -200,8 +246,7 @@ def chunk_book(book_id: int, db: Session = Depends(get_db)):
         )
 
     # Read raw text
-    with open(book.file_path, "r", encoding="utf-8") as f:
-        text = f.read()
+    text, offsets_valid = read_book_text(book.file_path)
 
     # Delete existing chunks (idempotent re-chunk)
     existing = crud.get_chunks_by_book(db, book_id)
@@ -210,7 +255,26 @@ def chunk_book(book_id: int, db: Session = Depends(get_db)):
             db.delete(c)
         db.commit()
 
-    chunks_data = chunk_text(text)
+    # Large manuscripts are tokenised in worker processes; output equals chunk_text().
+    # PDF uploads carry real page boundaries, other texts get estimated pages.
+    # Books with detected chapters are chunked per chapter: no chunk spans two.
+    page_word_starts = load_page_map(book.file_path)
+    chapters = crud.get_chapters_by_book(db, book_id)
+    if chapters:
+        chunks_data = chunk_chapters(
+            text,
+            [
+                {"chapter_index": c.chapter_index, "start_char": c.start_char,
+                 "end_char": c.end_char, "start_word": c.start_word}
+                for c in chapters
+            ],
+            page_word_starts=page_word_starts,
+        )
+    else:
+        chunks_data = chunk_text_parallel(text, page_word_starts=page_word_starts)
+    if offsets_valid:
+        # Chunks that are verbatim spans of the file are stored as byte offsets only
+        attach_byte_spans(text, chunks_data)
     crud.create_chunks_batch(db, book_id, chunks_data)
 
     # Update book metadata
@@ -220,10 +284,11 @@ def chunk_book(book_id: int, db: Session = Depends(get_db)):
     crud.update_book(db, book_id, total_pages=total_pages, status="chunked")
 
     logger.info(
-        "Book %s chunked into %d chunks (%d pages)",
+        "Book %s chunked into %d chunks (%d pages, %d chapters)",
         book_id,
         len(chunks_data),
         total_pages,
+        len(chapters),
     )
     return StatusResponse(
         status="chunked",
@@ -231,12 +296,232 @@ def chunk_book(book_id: int, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/books/{book_id}/clone-from/{source_book_id}", response_model=StatusResponse)
+def clone_book_from(book_id: int, source_book_id: int, db: Session = Depends(get_db)):
+    """
+    Copy chunks and analysis from an earlier upload of the same file (see
+    BookResponse.duplicate_of_book_id) instead of re-chunking and re-analysing.
+    """
+    book = crud.get_book(db, book_id)
+    source = crud.get_book(db, source_book_id)
+    if not book or not source or book_id == source_book_id:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not book.content_sha256 or book.content_sha256 != source.content_sha256:
+        raise HTTPException(status_code=400, detail="Books were not uploaded from the same file")
+    if "analyzing" in (book.status, source.status):
+        raise HTTPException(status_code=409, detail="Analysis in progress")
+    if source.status not in ("chunked", "ready"):
+        raise HTTPException(status_code=400, detail="Source book has not been chunked yet")
+
+    counts = crud.clone_book_analysis(db, source_book_id, book_id)
+    logger.info("Book %s cloned from book %s: %s", book_id, source_book_id, counts)
+    book = crud.get_book(db, book_id)
+    return StatusResponse(
+        status=book.status,
+        message=(
+            f"Copied {counts['chunks']} chunks, {counts['characters']} characters, "
+            f"{counts['locations']} locations and {counts['scenes']} scenes from book {source_book_id}"
+        ),
+    )
+
+
 # ---------------------------------------------------------------------------
 # AI Analysis
 # ---------------------------------------------------------------------------
 
-def _run_analysis_background(book_id: int, req_dict: dict[str, Any]) -> None:
-    """Run full AI analysis and persist results in a background task (own DB session)."""
+def _chunk_analysis_rows(chunk_index_to_db_id: dict[int, int], analyses: list[dict]) -> list[dict]:
+    """dramatic_score / visual_analysis_json updates for one batch of chunk analyses, keyed by chunk id."""
+    rows = []
+    for ca in analyses:
+        chunk_id = chunk_index_to_db_id.get(ca.get("chunk_index"))
+        if chunk_id is None:
+            continue
+        row: dict[str, Any] = {"id": chunk_id}
+        score = ca.get("dramatic_score")
+        if score is not None:
+            row["dramatic_score"] = float(score)
+        visual_data = {}
+        if "visual_layers" in ca:
+            visual_data["visual_layers"] = ca["visual_layers"]
+        if "visual_tokens" in ca:
+            visual_data["visual_tokens"] = ca["visual_tokens"]
+        if visual_data:
+            row["visual_analysis_json"] = json_lib.dumps(visual_data)
+        if len(row) > 1:
+            rows.append(row)
+    return rows
+
+
+def _entity_json(data: dict, key: str) -> Optional[str]:
+    value = data.get(key)
+    return json_lib.dumps(value) if value else None
+
+
+def _character_row(book_id: int, ch_data: dict) -> dict[str, Any]:
+    return {
+        "book_id": book_id,
+        "name": ch_data.get("name", "Unknown"),
+        "physical_description": ch_data.get("physical_description"),
+        "personality_traits": ch_data.get("personality_traits"),
+        "typical_emotions": ", ".join(ch_data.get("typical_emotions", [])),
+        "is_main": 1 if ch_data.get("is_main", False) else 0,
+        "visual_type": ch_data.get("visual_type") or None,
+        "is_well_known_entity": 1 if ch_data.get("is_well_known_entity", False) else 0,
+        "canonical_search_name": ch_data.get("canonical_search_name") or None,
+        "search_visual_analog": ch_data.get("search_visual_analog") or None,
+        "ontology_json": _entity_json(ch_data, "ontology"),
+        "entity_visual_tokens_json": _entity_json(ch_data, "entity_visual_tokens"),
+    }
+
+
+def _location_row(book_id: int, loc_data: dict) -> dict[str, Any]:
+    return {
+        "book_id": book_id,
+        "name": loc_data.get("name", "Unknown"),
+        "visual_description": loc_data.get("visual_description"),
+        "atmosphere": loc_data.get("atmosphere"),
+        "is_main": 1 if loc_data.get("is_main", False) else 0,
+        "is_well_known_entity": 1 if loc_data.get("is_well_known_entity", False) else 0,
+        "canonical_search_name": loc_data.get("canonical_search_name") or None,
+        "search_visual_analog": loc_data.get("search_visual_analog") or None,
+        "ontology_json": _entity_json(loc_data, "ontology"),
+        "entity_visual_tokens_json": _entity_json(loc_data, "entity_visual_tokens"),
+    }
+
+
+def _persist_entities(
+    db: Session,
+    book_id: int,
+    result: dict,
+    req_dict: dict[str, Any],
+) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Persist main characters / locations (with ontology and entity visual tokens),
+    known adaptations and the visual bible, without committing. Returns name→id maps.
+    """
+    char_rows = [_character_row(book_id, ch) for ch in result.get("main_characters", [])]
+    char_ids = crud.bulk_create_characters(db, char_rows)
+    char_name_to_id = {row["name"].lower(): cid for row, cid in zip(char_rows, char_ids)}
+
+    loc_rows = [_location_row(book_id, loc) for loc in result.get("main_locations", [])]
+    loc_ids = crud.bulk_create_locations(db, loc_rows)
+    loc_name_to_id = {row["name"].lower(): lid for row, lid in zip(loc_rows, loc_ids)}
+
+    # ----- Save known_adaptations to Book -----
+    known_adaptations = result.get("known_adaptations")
+    if known_adaptations and bool(req_dict.get("is_well_known", False)):
+        crud.update_book(db, book_id, commit=False, known_adaptations_json=json_lib.dumps(known_adaptations))
+
+    # ----- Create visual bible -----
+    tone = result.get("tone_and_style", {})
+    crud.create_visual_bible(
+        db,
+        book_id=book_id,
+        style_category=req_dict.get("style_category", "fiction"),
+        tone_description=(
+            f"{tone.get('genre', '')} | {tone.get('mood', '')} | "
+            f"{tone.get('visual_style', '')}"
+        ),
+        illustration_frequency=req_dict.get("illustration_frequency", 4),
+        layout_style=req_dict.get("layout_style", "inline_classic"),
+        commit=False,
+    )
+    return char_name_to_id, loc_name_to_id
+
+
+def _persist_chunk_links(
+    db: Session,
+    chunk_index_to_db_id: dict[int, int],
+    chunk_analyses: list[dict],
+    char_name_to_id: dict[str, int],
+    loc_name_to_id: dict[str, int],
+) -> None:
+    """Link chunks to the persisted characters / locations they mention (one INSERT per table, no commit)."""
+    char_links: list[tuple[int, int]] = []
+    loc_links: list[tuple[int, int]] = []
+    for ca in chunk_analyses:
+        db_chunk_id = chunk_index_to_db_id.get(ca.get("chunk_index"))
+        if db_chunk_id is None:
+            continue
+        for name in ca.get("characters_present") or []:
+            if name.lower() in char_name_to_id:
+                char_links.append((db_chunk_id, char_name_to_id[name.lower()]))
+        for name in ca.get("locations_present") or []:
+            if name.lower() in loc_name_to_id:
+                loc_links.append((db_chunk_id, loc_name_to_id[name.lower()]))
+    crud.bulk_link_chunk_entities(db, char_links, loc_links)
+
+
+def _persist_scenes(
+    db: Session,
+    book_id: int,
+    scenes_data: list[dict],
+    char_name_to_id: dict[str, int],
+    loc_name_to_id: dict[str, int],
+) -> None:
+    """Replace the book's scenes and their character / primary-location links (no commit)."""
+    rows: list[dict] = []
+    character_ids: list[list[int]] = []
+    location_ids: list[list[int]] = []
+    for scene_data in scenes_data:
+        svt = scene_data.get("scene_visual_tokens")
+        t2i = scene_data.get("t2i_prompt_json")
+        rows.append({
+            "title": scene_data.get("title"),
+            "title_display": scene_data.get("title_display"),
+            "scene_type": scene_data.get("scene_type"),
+            "chunk_start_index": scene_data.get("chunk_start_index", 0),
+            "chunk_end_index": scene_data.get("chunk_end_index", 0),
+            "narrative_summary": scene_data.get("narrative_summary"),
+            "narrative_summary_display": scene_data.get("narrative_summary_display"),
+            "visual_description": scene_data.get("visual_description"),
+            "visual_intensity": scene_data.get("visual_intensity"),
+            "illustration_priority": scene_data.get("illustration_priority"),
+            "scene_prompt_draft": scene_data.get("scene_prompt_draft"),
+            "scene_visual_tokens_json": json_lib.dumps(svt) if svt else None,
+            "t2i_prompt_json": json_lib.dumps(t2i) if t2i else None,
+            "is_selected": 1,
+        })
+        character_ids.append([
+            char_name_to_id[name.lower()]
+            for name in scene_data.get("characters_present") or []
+            if name.lower() in char_name_to_id
+        ])
+        primary_loc = (scene_data.get("primary_location") or "").lower()
+        location_ids.append([loc_name_to_id[primary_loc]] if primary_loc in loc_name_to_id else [])
+    crud.replace_scenes_bulk(db, book_id, rows, character_ids, location_ids)
+
+
+def _run_analysis_background(
+    book_id: int,
+    req_dict: dict[str, Any],
+    run_id: Optional[str] = None,
+    run_lock: Optional[RunLock] = None,
+) -> None:
+    """
+    Run full AI analysis and persist results in a background task (own DB session).
+
+    Results are persisted as they become available: each batch's chunk analyses
+    (dramatic_score, visual_analysis_json) as soon as the batch completes, then
+    characters / locations / chunk links once the entity stages finish, and the
+    scenes at the end. GET /books/{id}/chunks therefore shows partial results while
+    the analysis is still running. All of these, plus checkpoints and cache entries,
+    go through the shared DbWriter: chunk analyses as one bulk UPDATE per batch,
+    entities with their chunk links and the scenes with their links each as one
+    job of a few executemany INSERTs in a single transaction.
+
+    When *run_id* is given, stage results are checkpointed under that analysis run,
+    and any stages it already completed are reused instead of re-calling the LLM.
+    Chunks analysed before (by any run, any book) come from the chunk analysis cache
+    unless the request asks for a fresh analysis. The run's RunLock is held throughout
+    (taken here unless the caller passes it already held); if another worker holds it,
+    that worker is executing the run and this call returns.
+    """
+    if run_id and run_lock is None:
+        run_lock = RunLock(run_id)
+        if not run_lock.acquire():
+            logger.warning("[analyze] background: run %s is already being executed by another worker", run_id)
+            return
     db = SessionLocal()
     try:
         book = crud.get_book(db, book_id)
@@ -249,9 +534,47 @@ def _run_analysis_background(book_id: int, req_dict: dict[str, Any]) -> None:
             logger.error("[analyze] background: no chunks for book %s", book_id)
             return
         chunks_for_ai = [
-            {"chunk_index": c.chunk_index, "text": c.text} for c in chunks_db
+            {"chunk_index": c.chunk_index, "text": c.text, "chapter_index": c.chapter_index}
+            for c in chunks_db
         ]
+        chunk_index_to_db_id = {c.chunk_index: c.id for c in chunks_db}
         total_chunks = len(chunks_for_ai)
+
+        # Chunk analyses seen so far, kept until the entities exist to link them to; the
+        # same dicts run_full_analysis holds, so alias-resolved names are picked up.
+        seen_analyses: list[dict] = []
+        char_name_to_id: dict[str, int] = {}
+        loc_name_to_id: dict[str, int] = {}
+
+        writer = get_db_writer(db.get_bind())
+        chunk_writes: list[Future] = []
+
+        def _flush_chunk_writes() -> None:
+            """Wait for the queued chunk analyses; re-raise the first failed write."""
+            writer.flush()
+            for future in chunk_writes:
+                future.result()
+
+        def _on_chunk_analyses(analyses: list[dict]) -> None:
+            rows = _chunk_analysis_rows(chunk_index_to_db_id, analyses)
+            chunk_writes.append(writer.submit(lambda w: crud.update_chunks_analysis(w, rows, commit=False)))
+            seen_analyses.extend(analyses)
+
+        def _write_entities(w: Session, consolidated: dict) -> tuple[dict[str, int], dict[str, int]]:
+            chars, locs = _persist_entities(w, book_id, consolidated, req_dict)
+            _persist_chunk_links(w, chunk_index_to_db_id, seen_analyses, chars, locs)
+            return chars, locs
+
+        def _on_entities_ready(consolidated: dict) -> None:
+            _flush_chunk_writes()
+            chars, locs = writer.write(lambda w: _write_entities(w, consolidated))
+            char_name_to_id.update(chars)
+            loc_name_to_id.update(locs)
+            logger.info(
+                "[analyze] background: persisted %d characters, %d locations and chunk links",
+                len(char_name_to_id), len(loc_name_to_id),
+            )
+
         _analysis_progress[book_id] = {"current_chunk": 0, "total_chunks": total_chunks}
         try:
             def _on_chunks(chunks_processed: int, total: int) -> None:
@@ -259,201 +582,60 @@ def _run_analysis_background(book_id: int, req_dict: dict[str, Any]) -> None:
 
             scene_count = req_dict.get("scene_count", 10)
             is_well_known_book = bool(req_dict.get("is_well_known", False))
-            logger.info("[analyze] background: run_full_analysis book_id=%s chunks=%s scene_count=%s is_well_known=%s", book_id, total_chunks, scene_count, is_well_known_book)
-            result = run_full_analysis(chunks_for_ai, progress_callback=_on_chunks, scene_count=scene_count, is_well_known_book=is_well_known_book)
+            checkpoints = CheckpointStore(run_id, session_factory=writer.session_factory, writer=writer) if run_id else None
+            logger.info("[analyze] background: run_full_analysis book_id=%s run_id=%s chunks=%s scene_count=%s is_well_known=%s", book_id, run_id, total_chunks, scene_count, is_well_known_book)
+            result = run_full_analysis(
+                chunks_for_ai,
+                progress_callback=_on_chunks,
+                scene_count=scene_count,
+                is_well_known_book=is_well_known_book,
+                analysis_run_id=run_id,
+                checkpoints=checkpoints,
+                on_chunk_analyses=_on_chunk_analyses,
+                on_entities_ready=_on_entities_ready,
+                chunk_cache=ChunkAnalysisCache(writer.session_factory, writer=writer),
+                fresh=bool(req_dict.get("fresh", False)),
+            )
         finally:
             _analysis_progress.pop(book_id, None)
-        logger.info("[analyze] background: run_full_analysis done, persisting...")
+        _flush_chunk_writes()
+        logger.info("[analyze] background: run_full_analysis done, persisting scenes...")
 
-        # ----- Persist characters -----
-        char_name_to_id: dict[str, int] = {}
-        for ch_data in result.get("main_characters", []):
-            char = crud.create_character(
-                db,
-                book_id=book_id,
-                name=ch_data.get("name", "Unknown"),
-                physical_description=ch_data.get("physical_description"),
-                personality_traits=ch_data.get("personality_traits"),
-                typical_emotions=", ".join(ch_data.get("typical_emotions", [])),
-                is_main=bool(ch_data.get("is_main", False)),
-                visual_type=ch_data.get("visual_type") or None,
-                is_well_known_entity=bool(ch_data.get("is_well_known_entity", False)),
-                canonical_search_name=ch_data.get("canonical_search_name") or None,
-                search_visual_analog=ch_data.get("search_visual_analog") or None,
-            )
-            char_name_to_id[char.name.lower()] = char.id
-            # Save ontology and entity visual tokens if available
-            ontology = ch_data.get("ontology")
-            entity_visual_tokens = ch_data.get("entity_visual_tokens")
-            if ontology or entity_visual_tokens:
-                crud.update_character_ontology(
-                    db, char.id,
-                    ontology_json=json_lib.dumps(ontology) if ontology else None,
-                    entity_visual_tokens_json=json_lib.dumps(entity_visual_tokens) if entity_visual_tokens else None,
-                )
-
-        # ----- Persist locations -----
-        loc_name_to_id: dict[str, int] = {}
-        for loc_data in result.get("main_locations", []):
-            loc = crud.create_location(
-                db,
-                book_id=book_id,
-                name=loc_data.get("name", "Unknown"),
-                visual_description=loc_data.get("visual_description"),
-                atmosphere=loc_data.get("atmosphere"),
-                is_main=bool(loc_data.get("is_main", False)),
-                is_well_known_entity=bool(loc_data.get("is_well_known_entity", False)),
-                canonical_search_name=loc_data.get("canonical_search_name") or None,
-                search_visual_analog=loc_data.get("search_visual_analog") or None,
-            )
-            loc_name_to_id[loc.name.lower()] = loc.id
-            # Save ontology and entity visual tokens if available
-            ontology = loc_data.get("ontology")
-            entity_visual_tokens = loc_data.get("entity_visual_tokens")
-            if ontology or entity_visual_tokens:
-                crud.update_location_ontology(
-                    db, loc.id,
-                    ontology_json=json_lib.dumps(ontology) if ontology else None,
-                    entity_visual_tokens_json=json_lib.dumps(entity_visual_tokens) if entity_visual_tokens else None,
-                )
-
-        # ----- Save known_adaptations to Book -----
-        known_adaptations = result.get("known_adaptations")
-        if known_adaptations and is_well_known_book:
-            try:
-                crud.update_book(
-                    db, book_id,
-                    known_adaptations_json=json_lib.dumps(known_adaptations),
-                )
-            except Exception as e:
-                logger.warning("[analyze] Could not save known_adaptations: %s", e)
-
-        # ----- Create visual bible -----
-        tone = result.get("tone_and_style", {})
-        crud.create_visual_bible(
-            db,
-            book_id=book_id,
-            style_category=req_dict.get("style_category", "fiction"),
-            tone_description=(
-                f"{tone.get('genre', '')} | {tone.get('mood', '')} | "
-                f"{tone.get('visual_style', '')}"
-            ),
-            illustration_frequency=req_dict.get("illustration_frequency", 4),
-            layout_style=req_dict.get("layout_style", "inline_classic"),
-        )
-
-        # ----- Enrich chunks -----
-        chunk_index_to_db_id = {c.chunk_index: c.id for c in chunks_db}
-        chunks_to_update: dict[int, dict] = {}
-        chunk_char_links: list[tuple[int, list[int]]] = []
-        chunk_loc_links: list[tuple[int, list[int]]] = []
-        for ca in result.get("chunk_analyses", []):
-            idx = ca.get("chunk_index")
-            db_chunk_id = chunk_index_to_db_id.get(idx)
-            if db_chunk_id is None:
-                continue
-            score = ca.get("dramatic_score")
-            if score is not None:
-                if db_chunk_id not in chunks_to_update:
-                    chunks_to_update[db_chunk_id] = {}
-                chunks_to_update[db_chunk_id]["dramatic_score"] = float(score)
-            char_ids = [char_name_to_id[n.lower()] for n in ca.get("characters_present", []) if n.lower() in char_name_to_id]
-            if char_ids:
-                chunk_char_links.append((db_chunk_id, char_ids))
-            loc_ids = [loc_name_to_id[n.lower()] for n in ca.get("locations_present", []) if n.lower() in loc_name_to_id]
-            if loc_ids:
-                chunk_loc_links.append((db_chunk_id, loc_ids))
-            visual_data = {}
-            if "visual_layers" in ca:
-                visual_data["visual_layers"] = ca["visual_layers"]
-            if "visual_tokens" in ca:
-                visual_data["visual_tokens"] = ca["visual_tokens"]
-            if visual_data:
-                if db_chunk_id not in chunks_to_update:
-                    chunks_to_update[db_chunk_id] = {}
-                chunks_to_update[db_chunk_id]["visual_data"] = visual_data
-        for chunk_id, updates in chunks_to_update.items():
-            chunk = crud.get_chunk(db, chunk_id)
-            if chunk:
-                if "dramatic_score" in updates:
-                    chunk.dramatic_score = updates["dramatic_score"]
-                if "visual_data" in updates:
-                    chunk.visual_analysis_json = json_lib.dumps(updates["visual_data"])
-        for chunk_id, char_ids in chunk_char_links:
-            crud.link_chunk_characters(db, chunk_id, char_ids, commit=False)
-        for chunk_id, loc_ids in chunk_loc_links:
-            crud.link_chunk_locations(db, chunk_id, loc_ids, commit=False)
-        try:
-            db.commit()
-        except Exception as e:
-            logger.error("Failed to commit chunk updates: %s", e)
-            db.rollback()
-            crud.update_book_status(db, book_id, "error")
-            return
         # ----- Persist scenes -----
         scenes_data = result.get("scenes", [])
         if scenes_data:
-            crud.delete_scenes_by_book(db, book_id)
-            for scene_data in scenes_data:
-                svt = scene_data.get("scene_visual_tokens")
-                t2i = scene_data.get("t2i_prompt_json")
-                scene = crud.create_scene(
-                    db,
-                    book_id=book_id,
-                    title=scene_data.get("title"),
-                    title_display=scene_data.get("title_display"),
-                    scene_type=scene_data.get("scene_type"),
-                    chunk_start_index=scene_data.get("chunk_start_index", 0),
-                    chunk_end_index=scene_data.get("chunk_end_index", 0),
-                    narrative_summary=scene_data.get("narrative_summary"),
-                    narrative_summary_display=scene_data.get("narrative_summary_display"),
-                    visual_description=scene_data.get("visual_description"),
-                    visual_intensity=scene_data.get("visual_intensity"),
-                    illustration_priority=scene_data.get("illustration_priority"),
-                    scene_prompt_draft=scene_data.get("scene_prompt_draft"),
-                    scene_visual_tokens_json=json_lib.dumps(svt) if svt else None,
-                    t2i_prompt_json=json_lib.dumps(t2i) if t2i else None,
-                    is_selected=1,
-                )
-                # Link characters
-                for char_name in (scene_data.get("characters_present") or []):
-                    char_id = char_name_to_id.get(char_name.lower())
-                    if char_id:
-                        try:
-                            crud.create_scene_character(db, scene_id=scene.id, character_id=char_id)
-                        except Exception:
-                            db.rollback()
-                # Link primary location
-                primary_loc = scene_data.get("primary_location", "")
-                if primary_loc:
-                    loc_id = loc_name_to_id.get(primary_loc.lower())
-                    if loc_id:
-                        try:
-                            crud.create_scene_location(db, scene_id=scene.id, location_id=loc_id)
-                        except Exception:
-                            db.rollback()
             try:
-                db.commit()
+                writer.write(lambda w: _persist_scenes(w, book_id, scenes_data, char_name_to_id, loc_name_to_id))
+                logger.info("[analyze] Saved %d scenes for book_id=%s", len(scenes_data), book_id)
             except Exception as e:
-                logger.error("Failed to commit scenes: %s", e)
-                db.rollback()
-            logger.info("[analyze] Saved %d scenes for book_id=%s", len(scenes_data), book_id)
+                logger.error("Failed to save scenes: %s", e)
 
         crud.update_book_status(db, book_id, "ready")
+        if run_id:
+            crud.update_analysis_run_status(db, run_id, "completed")
+        premerge = result.get("entity_premerge") or {}
         logger.info(
-            "[analyze] background complete book_id=%s: %d characters, %d locations, %d scenes",
+            "[analyze] background complete book_id=%s: %d characters, %d locations, %d scenes; "
+            "entity pre-merge saved %s chars of consolidation prompt",
             book_id, len(char_name_to_id), len(loc_name_to_id), len(scenes_data),
+            premerge.get("prompt_chars_saved", 0),
         )
     except Exception as exc:
         logger.exception("Analysis failed for book %s: %s", book_id, exc)
         _analysis_progress.pop(book_id, None)
         try:
+            get_db_writer(db.get_bind()).flush()  # let queued writes of this run land before the status
+            db.rollback()
             crud.update_book_status(db, book_id, "error")
+            if run_id:
+                crud.update_analysis_run_status(db, run_id, "failed")
             db.commit()
         except Exception:
             db.rollback()
     finally:
         db.close()
+        if run_lock is not None:
+            run_lock.release()
 
 
 @router.post("/books/{book_id}/analyze", response_model=AnalyzeStatusResponse, status_code=202)
@@ -476,6 +658,22 @@ def analyze_book(
             status_code=400,
             detail="Book has no chunks. Call /chunk first.",
         )
+    req_dict = req.model_dump()
+    fingerprint = chunks_fingerprint(
+        [{"chunk_index": c.chunk_index, "text": c.text} for c in chunks_db], req_dict
+    )
+    run = crud.get_resumable_analysis_run(db, book_id, fingerprint)
+    if run:
+        run_id = run.run_id
+        crud.update_analysis_run_status(db, run_id, "running")
+        logger.info("[analyze] Resuming unfinished analysis run %s for book_id=%s", run_id, book_id)
+    else:
+        run_id = str(uuid.uuid4())
+        crud.delete_analysis_runs(db, book_id)
+        crud.create_analysis_run(
+            db, book_id=book_id, run_id=run_id,
+            chunks_fingerprint=fingerprint, params_json=json_lib.dumps(req_dict),
+        )
     logger.info("[analyze] Clearing previous analysis for book_id=%s", book_id)
     crud.clear_analysis_results(db, book_id)
     crud.update_book(
@@ -488,11 +686,54 @@ def analyze_book(
         status="analyzing",
     )
     db.commit()
-    background_tasks.add_task(_run_analysis_background, book_id, req.model_dump())
+    background_tasks.add_task(_run_analysis_background, book_id, req_dict, run_id)
     logger.info("[analyze] 202 Accepted – background task started")
     return AnalyzeStatusResponse(status="analyzing", estimated_time=600)
 
 
+def resume_interrupted_analyses() -> None:
+    """
+    Startup scan: books left in "analyzing" by a dead worker are restarted from
+    their last analysis run's checkpoints. Books with no resumable run are marked "error".
+
+    Every uvicorn worker runs this scan. A run is resumed only by the worker that gets
+    its RunLock, and only if it is still unfinished once the lock is held — runs in
+    progress in a live worker, or just resumed and finished by another one, are skipped.
+    """
+    db = SessionLocal()
+    try:
+        stuck = [b.id for b in crud.get_books_by_status(db, "analyzing")]
+        for book_id in stuck:
+            run = crud.get_latest_analysis_run(db, book_id)
+            if not run or run.status == "completed" or not run.params_json:
+                logger.warning("[analyze] startup: book %s stuck in analyzing with no resumable run", book_id)
+                crud.update_book_status(db, book_id, "error")
+                continue
+            run_id = run.run_id
+            run_lock = RunLock(run_id)
+            if not run_lock.acquire():
+                logger.info("[analyze] startup: run %s is executed by another worker", run_id)
+                continue
+            db.expire_all()  # re-read: another worker may have finished or replaced it meanwhile
+            run = crud.get_analysis_run(db, run_id)
+            if crud.get_book(db, book_id).status != "analyzing" or not run or run.status == "completed":
+                logger.info("[analyze] startup: run %s was finished by another worker", run_id)
+                run_lock.release()
+                continue
+            req_dict = json_lib.loads(run.params_json)
+            crud.clear_analysis_results(db, book_id)
+            crud.update_analysis_run_status(db, run_id, "running")
+            logger.info("[analyze] startup: resuming analysis run %s for book_id=%s", run_id, book_id)
+            threading.Thread(
+                target=_run_analysis_background,
+                args=(book_id, req_dict, run_id, run_lock),
+                name=f"resume-analysis-{book_id}",
+                daemon=True,
+            ).start()
+    finally:
+        db.close()
+
+
 @router.get("/books/{book_id}/analysis-progress")
 def get_analysis_progress(book_id: int):
     """Return current batch / total batches while analysis is running. 404 if not in progress."""
@@ -559,6 +800,15 @@ def get_chunks(book_id: int, db: Session = Depends(get_db)):
     return crud.get_chunks_by_book(db, book_id)
 
 
+@router.get("/books/{book_id}/chapters", response_model=list[ChapterResponse])
+def get_chapters(book_id: int, db: Session = Depends(get_db)):
+    """Get the chapters detected at upload, ordered by chapter_index (empty if none)."""
+    book = crud.get_book(db, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return crud.get_chapters_by_book(db, book_id)
+
+
 # ---------------------------------------------------------------------------
 # Search queries (audit log)
 # ---------------------------------------------------------------------------
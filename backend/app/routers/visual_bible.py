@@ -1,4 +1,5 @@
 """Visual Bible API endpoints."""
+import asyncio
 import json
 import logging
 import os
@@ -22,6 +23,7 @@ from app.schemas import (
     EngineRatingResponse,
 )
 from app import crud
+from app.services.db_writer import get_db_writer
 from app.services.search_service import (
     search_references_for_book,
     get_proposed_search_queries,
@@ -136,6 +138,40 @@ def patch_entity_summaries(
 # Reference image search
 # ---------------------------------------------------------------------------
 
+def _persist_reference_images(
+    db: Session, book_id: int, pools: list[tuple[str, int, list[dict], str]]
+) -> None:
+    """Add new search-result images to each (entity_type, entity_id) pool and trim it (no commit)."""
+    # Rows added here are not flushed yet, so the DB lookup alone misses repeats within one call
+    added: set[tuple[str, int, str]] = set()
+    for entity_type, entity_id, images, default_source in pools:
+        for img in images:
+            url = img.get("url")
+            if not url or (entity_type, entity_id, url) in added:
+                continue
+            if crud.get_reference_image_by_entity_url(db, entity_type, entity_id, url):
+                continue
+            added.add((entity_type, entity_id, url))
+            src = img.get("source") or img.get("provider") or default_source
+            if src not in ("unsplash", "serpapi"):
+                src = default_source
+            crud.create_reference_image(
+                db,
+                book_id=book_id,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                url=url,
+                thumbnail=img.get("thumbnail"),
+                width=img.get("width"),
+                height=img.get("height"),
+                source=src,
+                commit=False,
+            )
+        db.flush()
+        exclude = set(crud.get_selected_reference_urls(db, entity_type, entity_id))
+        crud.trim_reference_images_fifo(db, entity_type, entity_id, exclude_urls=exclude, commit=False)
+
+
 @router.post("/books/{book_id}/search-references")
 async def search_references(
     book_id: int,
@@ -209,62 +245,20 @@ async def search_references(
                 img["source"] = "serpapi"
         locs_by_name[item["name"]] = images
 
-    # Persist search results to reference_images (append, FIFO cap 50 per entity)
-    char_list = result.get("characters", [])
-    for item in char_list:
+    # Persist search results to reference_images (append, FIFO cap 50 per entity),
+    # as one job on the DB writer
+    pools: list[tuple[str, int, list[dict], str]] = []
+    for item in result.get("characters", []):
         char = next((c for c in characters if c.name == item["name"]), None)
-        if not char:
-            continue
-        for img in item.get("images", []):
-            url = img.get("url")
-            if not url:
-                continue
-            if crud.get_reference_image_by_entity_url(db, "character", char.id, url):
-                continue
-            src = img.get("source") or img.get("provider") or "unsplash"
-            if src not in ("unsplash", "serpapi"):
-                src = "unsplash"
-            crud.create_reference_image(
-                db,
-                book_id=book_id,
-                entity_type="character",
-                entity_id=char.id,
-                url=url,
-                thumbnail=img.get("thumbnail"),
-                width=img.get("width"),
-                height=img.get("height"),
-                source=src,
-            )
-        exclude = set(crud.get_selected_reference_urls(db, "character", char.id))
-        crud.trim_reference_images_fifo(db, "character", char.id, exclude_urls=exclude)
-
-    loc_list = result.get("locations", [])
-    for item in loc_list:
+        if char:
+            pools.append(("character", char.id, item.get("images", []), "unsplash"))
+    for item in result.get("locations", []):
         loc = next((l for l in locations if l.name == item["name"]), None)
-        if not loc:
-            continue
-        for img in item.get("images", []):
-            url = img.get("url")
-            if not url:
-                continue
-            if crud.get_reference_image_by_entity_url(db, "location", loc.id, url):
-                continue
-            src = img.get("source") or img.get("provider") or "serpapi"
-            if src not in ("unsplash", "serpapi"):
-                src = "serpapi"
-            crud.create_reference_image(
-                db,
-                book_id=book_id,
-                entity_type="location",
-                entity_id=loc.id,
-                url=url,
-                thumbnail=img.get("thumbnail"),
-                width=img.get("width"),
-                height=img.get("height"),
-                source=src,
-            )
-        exclude = set(crud.get_selected_reference_urls(db, "location", loc.id))
-        crud.trim_reference_images_fifo(db, "location", loc.id, exclude_urls=exclude)
+        if loc:
+            pools.append(("location", loc.id, item.get("images", []), "serpapi"))
+    if pools:
+        writer = get_db_writer(db.get_bind())
+        await asyncio.wrap_future(writer.submit(lambda w: _persist_reference_images(w, book_id, pools)))
 
     response = {
         "characters": chars_by_name,
@@ -27,6 +27,10 @@ class BookResponse(BaseModel):
     is_well_known: Optional[int] = 0
     well_known_book_title: Optional[str] = None
     similar_book_title: Optional[str] = None
+    content_sha256: Optional[str] = None
+    # Set on upload when the same file was uploaded before: POST
+    # /books/{id}/clone-from/{duplicate_of_book_id} copies its chunks and analysis
+    duplicate_of_book_id: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -40,6 +44,7 @@ class BookAnalyzeRequest(BaseModel):
     well_known_book_title: Optional[str] = None
     similar_book_title: Optional[str] = None
     scene_count: int = 10  # number of key scenes to extract
+    fresh: bool = False  # ignore cached chunk analyses and make prompts unique to this run
 
 
 # ---------------------------------------------------------------------------
@@ -220,6 +225,20 @@ class ChunkResponse(BaseModel):
     end_page: Optional[int] = None
     word_count: Optional[int] = None
     dramatic_score: Optional[float] = None
+    chapter_index: Optional[int] = None
+
+
+class ChapterResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    book_id: int
+    chapter_index: int
+    title: Optional[str] = None
+    start_char: int
+    end_char: int
+    start_word: int
+    word_count: Optional[int] = None
 
 
 # ---------------------------------------------------------------------------
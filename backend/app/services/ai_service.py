@@ -1,9 +1,12 @@
 """AI analysis service using OpenAI GPT for book analysis."""
+import hashlib
 import json
 import logging
 import os
+import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Callable, Optional
 
 try:
@@ -14,6 +17,18 @@ except ImportError:
 
 from openai import OpenAI
 
+from app.services.batch_planner import BATCH_MAX_OUTPUT_TOKENS, plan_batches
+from app.services.book_service import count_tokens
+from app.services.entity_merger import (
+    CHARACTER_TEXT_FIELDS,
+    LOCATION_TEXT_FIELDS,
+    fold_entities,
+    premerge_entities,
+)
+from app.services.llm_fallback import as_fallback, is_fallback
+from app.services.llm_limiter import chat_completion
+from app.services.pipeline_dag import Stage, run_stages
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -48,7 +63,7 @@ def _get_client() -> OpenAI:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY environment variable is not set")
-        _client = OpenAI(api_key=api_key)
+        _client = OpenAI(api_key=api_key, max_retries=0)  # retried by llm_limiter.chat_completion
     return _client
 
 
@@ -191,6 +206,26 @@ def build_visual_tokens(visual_layers: dict) -> dict:
     }
 
 
+def enrich_chunk_analysis(chunk_analysis: dict, chunk_text: str, total_chunks: int) -> dict:
+    """
+    Add the deterministic per-chunk fields (no LLM): narrative_position, visual_density,
+    dramatic_score and, when visual_layers are present, visual_tokens. Mutates and
+    returns *chunk_analysis*. Needs nothing from consolidation, so it runs per batch.
+    """
+    chunk_idx = chunk_analysis.get("chunk_index", 0)
+    chunk_analysis["narrative_position"] = detect_narrative_position(chunk_idx, total_chunks)
+    chunk_analysis["visual_density"] = assess_visual_density(chunk_text)
+    chunk_analysis["dramatic_score"] = calculate_dramatic_score(
+        text=chunk_text,
+        action_level=chunk_analysis.get("action_level", 0.5),
+        emotional_intensity=chunk_analysis.get("emotional_intensity", 0.5),
+        visual_richness=chunk_analysis.get("visual_richness", 0.5),
+    )
+    if "visual_layers" in chunk_analysis:
+        chunk_analysis["visual_tokens"] = build_visual_tokens(chunk_analysis["visual_layers"])
+    return chunk_analysis
+
+
 # ---------------------------------------------------------------------------
 # Prompts
 # ---------------------------------------------------------------------------
@@ -330,7 +365,8 @@ def build_entity_visual_tokens_batch(entities: list[dict]) -> list[dict]:
     logger.info("[entity_tokens] build_entity_visual_tokens_batch: %d entities", len(entities))
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model=MODEL,
             messages=[
                 {"role": "system", "content": ENTITY_VISUAL_TOKEN_PROMPT},
@@ -347,7 +383,7 @@ def build_entity_visual_tokens_batch(entities: list[dict]) -> list[dict]:
         )
     except Exception as e:
         logger.error("[entity_tokens] LLM call failed: %s", e)
-        return _build_entity_token_fallbacks(entities)
+        return as_fallback(_build_entity_token_fallbacks(entities))
 
     # Strip markdown code fences if present
     if raw.startswith("```"):
@@ -360,7 +396,7 @@ def build_entity_visual_tokens_batch(entities: list[dict]) -> list[dict]:
             raise ValueError("Expected JSON array")
     except (json.JSONDecodeError, ValueError) as e:
         logger.error("[entity_tokens] Failed to parse response: %s | raw: %s", e, raw[:500])
-        return _build_entity_token_fallbacks(entities)
+        return as_fallback(_build_entity_token_fallbacks(entities))
 
     # Validate and normalise each result
     validated: list[dict] = []
@@ -430,6 +466,7 @@ def _build_entity_token_fallbacks(entities: list[dict]) -> list[dict]:
 
 CONSOLIDATION_PROMPT = """\
 Given these character and location extractions from multiple sections of a book, consolidate into:
+(Entries may carry "mentions" — how many sections or merged extractions they came from; use it when ranking importance.)
 
 LANGUAGE RULES (mandatory):
 - Write ALL of the following in ENGLISH only (they are stored and used for image search and T2I): physical_description, personality_traits, visual_description, atmosphere, search_visual_analog.
@@ -499,19 +536,84 @@ Return ONLY valid JSON:
 """
 
 
+# Part of every chunk cache key: editing the batch prompt invalidates cached analyses
+BATCH_PROMPT_VERSION = hashlib.sha256(BATCH_ANALYSIS_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+
 # ---------------------------------------------------------------------------
 # Batch analysis
 # ---------------------------------------------------------------------------
 
-def analyze_chunk_batch(chunks: list[dict], run_id: Optional[str] = None) -> dict:
+# How often chunks missing from a batch response are re-requested as smaller sub-batches
+BATCH_SPLIT_MAX_DEPTH = 3
+
+_json_decoder = json.JSONDecoder()
+
+
+def _salvage_json_array(text: str, key: str) -> list:
+    """Every complete element of the top-level array *key* in possibly truncated JSON *text*."""
+    match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+    if not match:
+        return []
+    items: list = []
+    pos = match.end()
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            break
+        try:
+            item, pos = _json_decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break  # truncated element — everything before it is kept
+        items.append(item)
+    return items
+
+
+def parse_batch_response(text: str) -> tuple[dict, bool]:
+    """
+    Parse a batch-analysis response. Returns (result, complete).
+
+    Invalid JSON (usually a response cut off at max_tokens) is salvaged element by
+    element: every complete characters / locations / chunk_analyses entry before the
+    cut is kept, and *complete* is False.
     """
-    Analyze a batch of chunks (10-15) via GPT.
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, True
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text = text or ""
+    return {
+        "characters": [c for c in _salvage_json_array(text, "characters") if isinstance(c, dict)],
+        "locations": [loc for loc in _salvage_json_array(text, "locations") if isinstance(loc, dict)],
+        "chunk_analyses": [ca for ca in _salvage_json_array(text, "chunk_analyses") if isinstance(ca, dict)],
+    }, False
+
+
+def _merge_batch_results(first: dict, second: dict) -> dict:
+    merged = dict(first)
+    for key in ("characters", "locations", "chunk_analyses"):
+        merged[key] = list(first.get(key, []) or []) + list(second.get(key, []) or [])
+    merged["chunk_analyses"].sort(key=lambda ca: ca.get("chunk_index", 0))
+    return merged
+
 
-    *chunks* is a list of dicts with keys: chunk_index, text.
+def analyze_chunk_batch(chunks: list[dict], run_id: Optional[str] = None, _depth: int = 0) -> dict:
+    """
+    Analyze a batch of chunks via GPT.
+
+    *chunks* is a list of dicts with keys: chunk_index, text — normally one batch from
+    batch_planner.plan_batches(), sized so the response fits BATCH_MAX_OUTPUT_TOKENS.
     *run_id*: optional unique id for this analysis run; appended to the prompt to reduce
     OpenAI server-side cache hits when re-analyzing the same manuscript (same prompt would
     otherwise return identical or near-identical responses).
     Returns parsed JSON with characters, locations, chunk_analyses.
+
+    A truncated or invalid response keeps every complete element (parse_batch_response);
+    chunks still missing from chunk_analyses are re-requested as a sub-batch (split in
+    halves if nothing at all was recovered), up to BATCH_SPLIT_MAX_DEPTH times.
     """
     logger.info("analyze_chunk_batch: batch size=%s, calling OpenAI", len(chunks))
     client = _get_client()
@@ -524,7 +626,8 @@ def analyze_chunk_batch(chunks: list[dict], run_id: Optional[str] = None) -> dic
         parts.append(f"--- CHUNK {ch['chunk_index']} ---\n{ch['text']}")
     user_content = "\n\n".join(parts)
 
-    response = client.chat.completions.create(
+    response = chat_completion(
+        client,
         model=MODEL,
         response_format={"type": "json_object"},
         messages=[
@@ -532,10 +635,11 @@ def analyze_chunk_batch(chunks: list[dict], run_id: Optional[str] = None) -> dic
             {"role": "user", "content": user_content},
         ],
         temperature=0.3,
-        max_tokens=4096,
+        max_tokens=BATCH_MAX_OUTPUT_TOKENS,
     )
 
     result_text = response.choices[0].message.content
+    finish_reason = getattr(response.choices[0], "finish_reason", None)
     usage = response.usage
     logger.info(
         "Batch analysis: prompt_tokens=%s completion_tokens=%s total=%s",
@@ -544,17 +648,212 @@ def analyze_chunk_batch(chunks: list[dict], run_id: Optional[str] = None) -> dic
         usage.total_tokens,
     )
 
-    try:
-        return json.loads(result_text)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse batch analysis JSON: %s", result_text[:500])
-        return {"characters": [], "locations": [], "chunk_analyses": []}
+    result, complete = parse_batch_response(result_text)
+    requested = {ch["chunk_index"] for ch in chunks}
+    seen: set[int] = set()
+    analyses: list[dict] = []
+    for ca in result.get("chunk_analyses", []) or []:
+        idx = ca.get("chunk_index") if isinstance(ca, dict) else None
+        if idx in requested and idx not in seen:
+            seen.add(idx)
+            analyses.append(ca)
+    result["chunk_analyses"] = analyses
+    missing = [ch for ch in chunks if ch["chunk_index"] not in seen]
+    if complete and not missing:
+        return result
+
+    logger.warning(
+        "Batch analysis %s (finish_reason=%s): recovered %d/%d chunk analyses",
+        "response incomplete" if complete else "JSON invalid",
+        finish_reason, len(analyses), len(chunks),
+    )
+    if not missing:
+        return result
+    if _depth >= BATCH_SPLIT_MAX_DEPTH:
+        logger.error(
+            "Batch analysis: giving up on chunks %s after %d retries",
+            [ch["chunk_index"] for ch in missing], _depth,
+        )
+        return result
+    # Missing chunks as one smaller sub-batch; halve it when nothing came back at all
+    if len(missing) == len(chunks) and len(missing) > 1:
+        half = len(missing) // 2
+        sub_batches = [missing[:half], missing[half:]]
+    else:
+        sub_batches = [missing]
+    for sub in sub_batches:
+        result = _merge_batch_results(result, analyze_chunk_batch(sub, run_id=run_id, _depth=_depth + 1))
+    return result
 
 
 # ---------------------------------------------------------------------------
 # Consolidation
 # ---------------------------------------------------------------------------
 
+# Max estimated prompt tokens of entity JSON per consolidation call. Larger inputs are
+# reduced first: groups of batch outputs are merged in parallel, level by level.
+CONSOLIDATION_GROUP_TOKENS = int(os.getenv("OPENAI_CONSOLIDATION_GROUP_TOKENS", "12000"))
+# Entities of each kind kept by one merge call (the final pass keeps the top 5).
+MERGE_KEEP_PER_KIND = 15
+# Reduce levels before falling back to a deterministic cut by mentions.
+MAX_MERGE_LEVELS = 4
+ENTITY_MERGE_PROMPT = """\
+You receive character and location extractions from consecutive sections of one book.
+The same entity may appear several times, also under variant names (nicknames, titles, short forms).
+
+Merge them:
+- Merge every duplicate into ONE entry; keep the most complete "name" in the ORIGINAL language of the book.
+- Combine descriptions: keep every distinct concrete visual detail (age, build, hair, eyes, clothing; architecture, colours, lighting), drop repetition. Keep each description under 80 words.
+- "mentions" = sum of the mentions of the merged entries (an entry without "mentions" counts as 1).
+- Keep at most {keep} characters and {keep} locations — those with the most mentions / plot importance.
+
+Return ONLY valid JSON:
+{{
+  "characters": [
+    {{"name": "", "physical_description": "", "personality": "", "emotions": ["", ""], "mentions": 1}}
+  ],
+  "locations": [
+    {{"name": "", "visual_description": "", "atmosphere": "", "mentions": 1}}
+  ]
+}}
+""".format(keep=MERGE_KEEP_PER_KIND)
+
+
+def _dedupe_group(group: dict) -> dict:
+    return {
+        "characters": fold_entities(group.get("characters", []), CHARACTER_TEXT_FIELDS),
+        "locations": fold_entities(group.get("locations", []), LOCATION_TEXT_FIELDS),
+    }
+
+
+def _estimate_entity_tokens(group: dict) -> int:
+    return count_tokens(json.dumps(group, ensure_ascii=False))
+
+
+def _top_by_mentions(entities: list[dict], keep: int) -> list[dict]:
+    return sorted(entities, key=lambda e: -int(e.get("mentions") or 1))[:keep]
+
+
+def _pack_entity_groups(items: list[dict], sizes: list[int], budget: int) -> list[list[int]]:
+    """Pack consecutive items (indexes) into groups whose summed size stays within *budget*."""
+    groups: list[list[int]] = []
+    current: list[int] = []
+    current_size = 0
+    for i, size in enumerate(sizes):
+        if current and current_size + size > budget:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(i)
+        current_size += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def merge_entity_group(group: dict, run_id: Optional[str] = None) -> dict:
+    """
+    One map-reduce step: merge duplicate characters/locations of *group* via GPT,
+    keeping at most MERGE_KEEP_PER_KIND of each. Falls back to the deterministic
+    name-based merge (cut by mentions) if the call or its JSON fails.
+    """
+    fallback = {
+        "characters": _top_by_mentions(group.get("characters", []), MERGE_KEEP_PER_KIND),
+        "locations": _top_by_mentions(group.get("locations", []), MERGE_KEEP_PER_KIND),
+    }
+    user_content = json.dumps(
+        {**group, **({"analysis_run_id": run_id} if run_id else {})}, ensure_ascii=False
+    )
+    try:
+        response = chat_completion(
+            _get_client(),
+            model=MODEL,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": ENTITY_MERGE_PROMPT},
+                {"role": "user", "content": user_content},
+            ],
+            temperature=0.2,
+            max_tokens=4096,
+        )
+        usage = response.usage
+        logger.info(
+            "Entity merge: prompt_tokens=%s completion_tokens=%s total=%s",
+            usage.prompt_tokens, usage.completion_tokens, usage.total_tokens,
+        )
+        merged = json.loads(response.choices[0].message.content)
+    except json.JSONDecodeError:
+        logger.error("Failed to parse entity merge JSON; using name-based merge")
+        return fallback
+    except Exception as e:
+        logger.error("Entity merge call failed: %s; using name-based merge", e)
+        return fallback
+    return {
+        "characters": merged.get("characters") or [],
+        "locations": merged.get("locations") or [],
+    }
+
+
+def reduce_entity_groups(
+    all_batch_results: list[dict],
+    run_id: Optional[str] = None,
+    group_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> dict:
+    """
+    Tree-reduce per-batch character/location extractions until they fit one
+    consolidation prompt of *group_tokens*.
+
+    Each level dedupes same-name entries locally, packs consecutive batch outputs into
+    groups within the budget and merges the groups in parallel (merge_entity_group);
+    the merged groups are the next level's inputs. Each merge keeps a bounded number
+    of entities, so the number and size of calls shrinks geometrically per level.
+    Returns {"characters": [...], "locations": [...]}.
+    """
+    budget = group_tokens or CONSOLIDATION_GROUP_TOKENS
+    workers = max(1, concurrency or ANALYSIS_CONCURRENCY)
+    items = [_dedupe_group(b) for b in all_batch_results]
+
+    for level in range(MAX_MERGE_LEVELS):
+        sizes = [_estimate_entity_tokens(it) for it in items]
+        if sum(sizes) <= budget:
+            break
+        groups = _pack_entity_groups(items, sizes, budget)
+        # A lone item already within budget has nothing to merge with at this level
+        to_merge = [g for g in groups if len(g) > 1 or sizes[g[0]] > budget]
+        logger.info(
+            "[consolidate] level %d: %d inputs (~%d tokens) -> %d groups, %d merge calls",
+            level + 1, len(items), sum(sizes), len(groups), len(to_merge),
+        )
+        combined: dict[int, dict] = {}
+        for g in groups:
+            combined[g[0]] = _dedupe_group({
+                "characters": [c for i in g for c in items[i].get("characters", [])],
+                "locations": [loc for i in g for loc in items[i].get("locations", [])],
+            })
+        merged: dict[int, dict] = {}
+        with ThreadPoolExecutor(max_workers=min(workers, max(1, len(to_merge)))) as pool:
+            futures = {pool.submit(merge_entity_group, combined[g[0]], run_id): g[0] for g in to_merge}
+            for future in as_completed(futures):
+                merged[futures[future]] = _dedupe_group(future.result())
+        items = [merged.get(g[0], combined[g[0]]) for g in groups]
+    else:
+        logger.warning("[consolidate] still over budget after %d levels; cutting by mentions", MAX_MERGE_LEVELS)
+
+    reduced = _dedupe_group({
+        "characters": [c for it in items for c in it.get("characters", [])],
+        "locations": [loc for it in items for loc in it.get("locations", [])],
+    })
+    # Hard stop for the final prompt: keep the most mentioned entities that fit
+    while _estimate_entity_tokens(reduced) > budget and (
+        len(reduced["characters"]) > MERGE_KEEP_PER_KIND or len(reduced["locations"]) > MERGE_KEEP_PER_KIND
+    ):
+        reduced = {
+            "characters": _top_by_mentions(reduced["characters"], max(MERGE_KEEP_PER_KIND, len(reduced["characters"]) * 3 // 4)),
+            "locations": _top_by_mentions(reduced["locations"], max(MERGE_KEEP_PER_KIND, len(reduced["locations"]) * 3 // 4)),
+        }
+    return reduced
+
+
 def consolidate_results(
     all_batch_results: list[dict],
     is_well_known_book: bool = False,
@@ -564,18 +863,19 @@ def consolidate_results(
     Take all batch results and consolidate characters/locations into
     top-5 lists plus overall tone.
 
+    Long manuscripts are first tree-reduced (reduce_entity_groups) so the final
+    consolidation prompt stays within CONSOLIDATION_GROUP_TOKENS regardless of
+    book length.
+
     When is_well_known_book=True, the prompt instructs the model to also
     populate known_adaptations (film/TV/animation adaptations list).
     *run_id*: optional unique id for this run; appended to the prompt to reduce cache hits.
     """
     client = _get_client()
 
-    # Gather all characters & locations across batches
-    all_chars: list[dict] = []
-    all_locs: list[dict] = []
-    for batch in all_batch_results:
-        all_chars.extend(batch.get("characters", []))
-        all_locs.extend(batch.get("locations", []))
+    reduced = reduce_entity_groups(all_batch_results, run_id=run_id)
+    all_chars = reduced["characters"]
+    all_locs = reduced["locations"]
 
     user_content = json.dumps(
         {
@@ -587,7 +887,8 @@ def consolidate_results(
         ensure_ascii=False,
     )
 
-    response = client.chat.completions.create(
+    response = chat_completion(
+        client,
         model=MODEL,
         response_format={"type": "json_object"},
         messages=[
@@ -610,14 +911,92 @@ def consolidate_results(
         return json.loads(response.choices[0].message.content)
     except json.JSONDecodeError:
         logger.error("Failed to parse consolidation JSON")
-        return {"main_characters": [], "main_locations": [], "tone_and_style": {}}
+        return as_fallback({"main_characters": [], "main_locations": [], "tone_and_style": {}})
 
 
 # ---------------------------------------------------------------------------
 # Full analysis pipeline
 # ---------------------------------------------------------------------------
 
-BATCH_SIZE = 10  # chunks per GPT call; fewer round-trips = faster total analysis
+# Batch-analysis calls kept in flight at once. Tune per deployment to match the OpenAI
+# rate-limit tier (requests/tokens per minute); 1 restores the old strictly serial loop.
+ANALYSIS_CONCURRENCY = max(1, int(os.getenv("OPENAI_ANALYSIS_CONCURRENCY", "4")))
+
+
+def _analyze_batches_concurrently(
+    batches: list[list[dict]],
+    run_id: Optional[str],
+    concurrency: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    on_batch_result: Optional[Callable[[int, dict], None]] = None,
+) -> list[dict]:
+    """
+    Run analyze_chunk_batch over *batches* with at most *concurrency* calls in flight.
+
+    Results are returned in batch order regardless of completion order, so the
+    downstream chunk_analyses stay deterministic. *progress_callback* is invoked
+    from the calling thread after every completed batch with the cumulative number
+    of chunks processed so far; *on_batch_result(batch_num, result)* likewise, before
+    it (e.g. to checkpoint the result). The first failing batch cancels the pending
+    ones and its exception is re-raised.
+    """
+    num_batches = len(batches)
+    total_chunks = sum(len(b) for b in batches)
+    results: list[Optional[dict]] = [None] * num_batches
+
+    def _run(batch_num: int, batch: list[dict]) -> dict:
+        t_batch = time.perf_counter()
+        logger.info(
+            "[analyze] Batch %d/%d (chunk_index %d\u2013%d of %d)...",
+            batch_num + 1, num_batches,
+            batch[0]["chunk_index"],
+            batch[-1]["chunk_index"],
+            total_chunks,
+        )
+        result = analyze_chunk_batch(batch, run_id=run_id)
+        logger.info("[analyze] Batch %d/%d done in %.1fs", batch_num + 1, num_batches, time.perf_counter() - t_batch)
+        return result
+
+    chunks_processed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="analyze-batch") as pool:
+        futures = {pool.submit(_run, n, batch): n for n, batch in enumerate(batches)}
+        try:
+            for fut in as_completed(futures):
+                n = futures[fut]
+                results[n] = fut.result()
+                if on_batch_result:
+                    on_batch_result(n, results[n])
+                chunks_processed += len(batches[n])
+                if progress_callback:
+                    try:
+                        progress_callback(chunks_processed, total_chunks)
+                    except Exception:
+                        pass
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+    return [r if r is not None else {} for r in results]
+
+
+def _checkpointed(checkpoints, stage: str, fn: Callable[[], object]):
+    """
+    Return the checkpointed result for *stage* if present, else run *fn* and checkpoint
+    it — unless *fn* fell back (see llm_fallback), so that a resumed run retries it.
+    """
+    if checkpoints is not None:
+        cached = checkpoints.get(stage)
+        if cached is not None:
+            logger.info("[analyze] %s: resumed from checkpoint", stage)
+            return cached
+    result = fn()
+    if checkpoints is not None:
+        if is_fallback(result):
+            logger.warning("[analyze] %s: fallback result, not checkpointed", stage)
+        else:
+            checkpoints.put(stage, result)
+    return result
 
 
 def run_full_analysis(
@@ -626,245 +1005,374 @@ def run_full_analysis(
     scene_count: int = 10,
     is_well_known_book: bool = False,
     analysis_run_id: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    checkpoints=None,
+    on_chunk_analyses: Optional[Callable[[list[dict]], None]] = None,
+    on_entities_ready: Optional[Callable[[dict], None]] = None,
+    chunk_cache=None,
+    fresh: bool = False,
 ) -> dict:
     """
     Run the complete analysis pipeline:
-      1) Batch analysis (groups of BATCH_SIZE)
-      2) Consolidation
-      2.5) Ontology Classifier — classify all entities
-      3) Post-process chunks with dramatic scoring, narrative positions, visual tokens
-      4) Return combined result with per-chunk data
+      1) Batch analysis (token-budgeted batches from plan_batches, up to *concurrency* in flight);
+         chunks are post-processed (dramatic scoring, narrative positions, visual tokens)
+         per batch, as each batch completes
+      2) Consolidation → ontology classifier → entity visual tokens, concurrently with
+         scene extraction (Pass A windowing, Pass B LLM refinement); see pipeline_dag
+      3) Scene visual composition once scenes and ontology are both done
+      4) Return combined result with per-chunk data and per-stage timings
 
     *chunks* — list of dicts with at least {chunk_index, text}.
 
-    *analysis_run_id* — optional unique id for this run. When set, it is included in
-    prompts so that re-analyzing the same manuscript produces different prompts and
-    avoids OpenAI server-side cache hits (otherwise identical prompts can return
-    identical or near-identical summaries). If None, a new UUID is generated per run.
+    *analysis_run_id* — optional unique id for this run (logs, checkpoints). If None,
+    a new UUID is generated per run.
+
+    *fresh* — force a fresh analysis: the chunk cache is not read, and the run id is
+    included in prompts so that re-analyzing the same manuscript produces different
+    prompts and avoids OpenAI server-side cache hits (otherwise identical prompts can
+    return identical or near-identical summaries).
+
+    *chunk_cache* — optional analysis_store.ChunkAnalysisCache. Chunks whose text was
+    analysed before (same prompt version and model) reuse that analysis; only the
+    other chunks are batched and sent to the LLM, and their results are cached.
+
+    *concurrency* — max batch-analysis calls in flight; defaults to ANALYSIS_CONCURRENCY.
+
+    *checkpoints* — optional analysis_store.CheckpointStore for this run. Every batch
+    result and every later LLM stage is read from it when present and written to it
+    when computed, so a restarted run makes no new LLM calls for finished work.
+
+    *on_chunk_analyses* — optional callback, called from the calling thread with each
+    batch's enriched chunk_analyses as soon as the batch completes (resumed batches
+    first), e.g. to persist them while the run continues. When set, the bulky
+    visual_layers / visual_tokens are dropped from the in-memory analyses afterwards,
+    so the returned chunk_analyses do not carry them.
+
+    Before consolidation, entity_merger.premerge_entities folds name variants of the
+    same character/location; characters_present / locations_present in the chunk
+    analyses are rewritten to the canonical names at that point (after
+    on_chunk_analyses has seen them).
+
+    *on_entities_ready* — optional callback, called from the calling thread with the
+    consolidated result (main_characters and main_locations including ontology and
+    entity_visual_tokens) as soon as the entity stages finish, while scene stages
+    may still be running.
 
     Returns:
     {
         "main_characters": [...],   # each includes "ontology" dict
         "main_locations":  [...],   # each includes "ontology" dict
         "tone_and_style":  {...},
-        "chunk_analyses":  [...]
+        "chunk_analyses":  [...],
+        "scenes":          [...],
+        "entity_premerge": {...},   # alias groups and consolidation prompt chars saved
+        "stage_timings":   {...}    # post-batch stage → {start, end, seconds}
     }
     """
+    from app.services.analysis_store import (
+        assemble_batch_result,
+        batch_stage,
+        chunk_cache_key,
+        split_batch_result,
+    )
     from app.services.ontology_service import classify_entities_batch
 
     run_id = analysis_run_id or str(uuid.uuid4())
-    logger.info("[analyze] run_full_analysis: analysis_run_id=%s", run_id)
-
-    all_batch_results: list[dict] = []
-    all_chunk_analyses: list[dict] = []
+    # The run id only goes into prompts for fresh runs (defeats OpenAI-side caching)
+    prompt_run_id = run_id if fresh else None
+    logger.info("[analyze] run_full_analysis: analysis_run_id=%s fresh=%s", run_id, fresh)
 
     chunk_text_map = {ch["chunk_index"]: ch["text"] for ch in chunks}
+    total_chunks = len(chunks)
     manuscript_lang = detect_manuscript_language(chunks)
     logger.info("[analyze] detected manuscript language: %s", manuscript_lang)
 
-    # 1. Batch analysis
+    # 1. Batch analysis. Chunks found in the content-addressed cache are reused as-is;
+    # only the remaining runs of chunks are packed into batches and sent to the LLM.
     t_start = time.perf_counter()
-    num_batches = (len(chunks) + BATCH_SIZE - 1) // BATCH_SIZE
+    cache_keys: dict[int, str] = {}
+    cached_entries: dict[int, dict] = {}
+    if chunk_cache is not None:
+        cache_keys = {
+            ch["chunk_index"]: chunk_cache_key(ch["text"], BATCH_PROMPT_VERSION, MODEL) for ch in chunks
+        }
+        if not fresh:
+            try:
+                found = chunk_cache.get_many(list(cache_keys.values()))
+            except Exception as e:
+                logger.warning("[analyze] chunk cache lookup failed, analysing all chunks: %s", e)
+                found = {}
+            cached_entries = {idx: found[key] for idx, key in cache_keys.items() if key in found}
+
+    # Units in chunk order: ("cached", chunks) for runs of cache hits, ("batch", chunks) otherwise
+    units: list[tuple[str, list[dict]]] = []
+    run: list[dict] = []
+    run_cached = False
+    for ch in list(chunks) + [None]:
+        is_cached = ch is not None and ch["chunk_index"] in cached_entries
+        if run and (ch is None or is_cached != run_cached):
+            if run_cached:
+                units.append(("cached", run))
+            else:
+                units.extend(("batch", b) for b in plan_batches(run))
+            run = []
+        if ch is not None:
+            run.append(ch)
+            run_cached = is_cached
+    batches = [unit_chunks for kind, unit_chunks in units if kind == "batch"]
+    num_batches = len(batches)
+    workers = max(1, min(concurrency or ANALYSIS_CONCURRENCY, num_batches or 1))
     logger.info(
-        "[analyze] run_full_analysis: starting batch loop, total chunks=%s, BATCH_SIZE=%s, num_batches=%s",
-        len(chunks), BATCH_SIZE, num_batches,
+        "[analyze] run_full_analysis: starting batch loop, total chunks=%s, cached chunks=%s, "
+        "num_batches=%s, concurrency=%s",
+        len(chunks), len(cached_entries), num_batches, workers,
     )
-    for i in range(0, len(chunks), BATCH_SIZE):
-        batch_num = i // BATCH_SIZE + 1
-        t_batch = time.perf_counter()
-        batch = chunks[i: i + BATCH_SIZE]
+    # Per unit: entity extractions (for consolidation) and enriched chunk analyses
+    batch_entities: list[dict] = [{} for _ in units]
+    batch_analyses: list[list[dict]] = [[] for _ in units]
+
+    def _accept_batch(n: int, result: dict) -> None:
+        analyses = result.get("chunk_analyses", [])
+        for ca in analyses:
+            enrich_chunk_analysis(ca, chunk_text_map.get(ca.get("chunk_index", 0), ""), total_chunks)
+        if on_chunk_analyses and analyses:
+            on_chunk_analyses(analyses)
+            for ca in analyses:
+                ca.pop("visual_layers", None)
+                ca.pop("visual_tokens", None)
+        batch_entities[n] = {
+            "characters": result.get("characters", []),
+            "locations": result.get("locations", []),
+        }
+        batch_analyses[n] = analyses
+
+    pending: list[int] = []
+    resumed_chunks = 0
+    for n, (kind, unit_chunks) in enumerate(units):
+        if kind == "cached":
+            _accept_batch(n, assemble_batch_result(
+                {ch["chunk_index"]: cached_entries[ch["chunk_index"]] for ch in unit_chunks}
+            ))
+            resumed_chunks += len(unit_chunks)
+            continue
+        cached = checkpoints.get(batch_stage(unit_chunks)) if checkpoints is not None else None
+        if cached is not None:
+            _accept_batch(n, cached)
+            resumed_chunks += len(unit_chunks)
+        else:
+            pending.append(n)
+    if resumed_chunks:
         logger.info(
-            "[analyze] Batch %d/%d (chunk_index %d\u2013%d of %d)...",
-            batch_num, num_batches,
-            batch[0]["chunk_index"],
-            batch[-1]["chunk_index"],
-            len(chunks),
+            "[analyze] reusing %d/%d chunks (%d from the chunk cache), %d/%d batches to analyse",
+            resumed_chunks, len(chunks), len(cached_entries), len(pending), num_batches,
         )
-        result = analyze_chunk_batch(batch, run_id=run_id)
-        all_batch_results.append(result)
-        all_chunk_analyses.extend(result.get("chunk_analyses", []))
+
+    def _on_batch_progress(chunks_processed: int, _total: int) -> None:
         if progress_callback:
+            progress_callback(resumed_chunks + chunks_processed, len(chunks))
+
+    def _on_batch_result(i: int, result: dict) -> None:
+        n = pending[i]
+        analysed = {ca.get("chunk_index") for ca in result.get("chunk_analyses", [])}
+        if checkpoints is not None and all(ch["chunk_index"] in analysed for ch in units[n][1]):
+            # A batch that gave up on some chunks is re-requested by a resumed run
+            checkpoints.put(batch_stage(units[n][1]), result)
+        if chunk_cache is not None:
             try:
-                chunks_processed = i + len(batch)
-                progress_callback(chunks_processed, len(chunks))
-            except Exception:
-                pass
-        logger.info("[analyze] Batch %d/%d done in %.1fs", batch_num, num_batches, time.perf_counter() - t_batch)
-
-    # 2. Consolidation
-    t_cons = time.perf_counter()
-    logger.info("[analyze] Consolidating results from %d batches...", len(all_batch_results))
-    if progress_callback:
-        try:
-            progress_callback(len(chunks), len(chunks))
-        except Exception:
-            pass
-    consolidated = consolidate_results(
-        all_batch_results, is_well_known_book=is_well_known_book, run_id=run_id
-    )
-    logger.info("[analyze] Consolidation done in %.1fs", time.perf_counter() - t_cons)
-
-    # 2.5. Ontology Classifier — single batched LLM call for all entities
-    t_onto = time.perf_counter()
-    logger.info("[analyze] Classifying entities ontology...")
-    main_characters = consolidated.get("main_characters", [])
-    main_locations = consolidated.get("main_locations", [])
-
-    entities_for_ontology: list[dict] = []
-    for ch in main_characters:
-        entities_for_ontology.append({
-            "name": ch.get("name", ""),
-            "description": ch.get("physical_description", ""),
-            "visual_type": ch.get("visual_type", ""),
-            "entity_role": "character",
-        })
-    for loc in main_locations:
-        entities_for_ontology.append({
-            "name": loc.get("name", ""),
-            "description": loc.get("visual_description", ""),
-            "visual_type": "location",
-            "entity_role": "location",
-        })
-
-    ontology_results: list[dict] = []
-    if entities_for_ontology:
-        try:
-            ontology_results = classify_entities_batch(entities_for_ontology)
-        except Exception as e:
-            logger.error("[analyze] Ontology classification failed: %s", e)
-            ontology_results = []
-
-    # Attach ontology back to each character / location
-    onto_map: dict[str, dict] = {}
-    for o in ontology_results:
-        if isinstance(o, dict) and o.get("name"):
-            onto_map[o["name"].lower()] = o
-
-    for ch in main_characters:
-        key = ch.get("name", "").lower()
-        ch["ontology"] = onto_map.get(key, {})
-
-    for loc in main_locations:
-        key = loc.get("name", "").lower()
-        loc["ontology"] = onto_map.get(key, {})
+                chunk_cache.put_many({
+                    cache_keys[idx]: entry
+                    for idx, entry in split_batch_result(result).items() if idx in cache_keys
+                })
+            except Exception as e:
+                logger.warning("[analyze] could not write chunk cache: %s", e)
+        _accept_batch(n, result)
+
+    if pending:
+        _analyze_batches_concurrently(
+            [units[n][1] for n in pending], prompt_run_id, workers,
+            _on_batch_progress, on_batch_result=_on_batch_result,
+        )
+    all_chunk_analyses = [ca for analyses in batch_analyses for ca in analyses]
+    logger.info("[analyze] Batch loop done in %.1fs", time.perf_counter() - t_start)
 
-    logger.info("[analyze] Ontology done in %.1fs", time.perf_counter() - t_onto)
+    # 1b. Deterministic alias pre-merge — fold "Holmes" / "Mr. Holmes" / "Sherlock Holmes"
+    # before consolidation; also rewrites *_present names in the chunk analyses.
+    all_batch_results, premerge_report = premerge_entities(batch_entities, all_chunk_analyses)
 
-    # 3. Entity-level visual token builder — single batched LLM call
     if progress_callback:
         try:
             progress_callback(len(chunks), len(chunks))
         except Exception:
             pass
-    t_tokens = time.perf_counter()
-    logger.info("[analyze] Building entity visual tokens...")
-
-    entities_for_tokens: list[dict] = []
-    for ch in main_characters:
-        onto = ch.get("ontology") or {}
-        entities_for_tokens.append({
-            "name": ch.get("name", ""),
-            "description": ch.get("physical_description", ""),
-            "entity_class": onto.get("entity_class", "human"),
-            "anti_human_override": onto.get("anti_human_override", False),
-            "visual_markers": onto.get("visual_markers", []),
-            "search_archetype": onto.get("search_archetype"),
-        })
-    for loc in main_locations:
-        onto = loc.get("ontology") or {}
-        entities_for_tokens.append({
-            "name": loc.get("name", ""),
-            "description": loc.get("visual_description", ""),
-            "entity_class": onto.get("entity_class", "construct"),
-            "anti_human_override": False,
-            "visual_markers": onto.get("visual_markers", []),
-            "search_archetype": None,
-        })
-
-    token_results: list[dict] = []
-    if entities_for_tokens:
-        try:
-            token_results = build_entity_visual_tokens_batch(entities_for_tokens)
-        except Exception as e:
-            logger.error("[analyze] Entity token building failed: %s", e)
-            token_results = []
-
-    # Attach visual tokens back to each character / location
-    token_map: dict[str, dict] = {}
-    for t in token_results:
-        if isinstance(t, dict) and t.get("name"):
-            token_map[t["name"].lower()] = t
-
-    for ch in main_characters:
-        key = ch.get("name", "").lower()
-        ch["entity_visual_tokens"] = token_map.get(key, {})
-
-    for loc in main_locations:
-        key = loc.get("name", "").lower()
-        loc["entity_visual_tokens"] = token_map.get(key, {})
-
-    logger.info("[analyze] Entity visual tokens done in %.1fs", time.perf_counter() - t_tokens)
-
-    # 3b. Post-process chunks with deterministic enhancements
-    total_chunks = len(chunks)
 
-    for chunk_analysis in all_chunk_analyses:
-        chunk_idx = chunk_analysis.get("chunk_index", 0)
-        chunk_text = chunk_text_map.get(chunk_idx, "")
-
-        chunk_analysis["narrative_position"] = detect_narrative_position(chunk_idx, total_chunks)
-        chunk_analysis["visual_density"] = assess_visual_density(chunk_text)
-        chunk_analysis["dramatic_score"] = calculate_dramatic_score(
-            text=chunk_text,
-            action_level=chunk_analysis.get("action_level", 0.5),
-            emotional_intensity=chunk_analysis.get("emotional_intensity", 0.5),
-            visual_richness=chunk_analysis.get("visual_richness", 0.5),
+    # 2-5. Post-batch stages as a dependency graph; independent stages run concurrently.
+    # Scene windowing (Pass A) and refinement (Pass B) need only the chunk analyses, so
+    # they overlap with consolidation → ontology → entity tokens; composition waits for
+    # both the scenes and the ontology.
+    def _consolidate(_out: dict) -> dict:
+        logger.info("[analyze] Consolidating results from %d batches...", len(all_batch_results))
+        return _checkpointed(
+            checkpoints, "consolidation",
+            lambda: consolidate_results(
+                all_batch_results, is_well_known_book=is_well_known_book, run_id=prompt_run_id
+            ),
         )
-        characters_present = chunk_analysis.get("characters_present", [])
-        chunk_analysis["character_priority"] = calculate_character_priority(
-            characters_present, main_characters
-        )
-        if "visual_layers" in chunk_analysis:
-            chunk_analysis["visual_tokens"] = build_visual_tokens(chunk_analysis["visual_layers"])
 
-    # 4. Scene extraction — sliding window + LLM refinement
-    if progress_callback:
-        try:
-            progress_callback(len(chunks), len(chunks))
-        except Exception:
-            pass
-    t_scenes = time.perf_counter()
-    logger.info("[analyze] Extracting scenes (scene_count=%d)...", scene_count)
-
-    scenes: list[dict] = []
-    if scene_count > 0 and all_chunk_analyses:
+    def _classify_ontology(out: dict) -> None:
+        consolidated = out["consolidation"]
+        main_characters = consolidated.setdefault("main_characters", [])
+        main_locations = consolidated.setdefault("main_locations", [])
+        logger.info("[analyze] Classifying entities ontology...")
+
+        entities_for_ontology: list[dict] = []
+        for ch in main_characters:
+            entities_for_ontology.append({
+                "name": ch.get("name", ""),
+                "description": ch.get("physical_description", ""),
+                "visual_type": ch.get("visual_type", ""),
+                "entity_role": "character",
+            })
+        for loc in main_locations:
+            entities_for_ontology.append({
+                "name": loc.get("name", ""),
+                "description": loc.get("visual_description", ""),
+                "visual_type": "location",
+                "entity_role": "location",
+            })
+
+        ontology_results: list[dict] = []
+        if entities_for_ontology:
+            try:
+                ontology_results = _checkpointed(
+                    checkpoints, "ontology", lambda: classify_entities_batch(entities_for_ontology)
+                )
+            except Exception as e:
+                logger.error("[analyze] Ontology classification failed: %s", e)
+                ontology_results = []
+
+        # Attach ontology back to each character / location
+        onto_map: dict[str, dict] = {}
+        for o in ontology_results:
+            if isinstance(o, dict) and o.get("name"):
+                onto_map[o["name"].lower()] = o
+
+        for ch in main_characters:
+            key = ch.get("name", "").lower()
+            ch["ontology"] = onto_map.get(key, {})
+
+        for loc in main_locations:
+            key = loc.get("name", "").lower()
+            loc["ontology"] = onto_map.get(key, {})
+
+    def _build_entity_tokens(out: dict) -> None:
+        consolidated = out["consolidation"]
+        main_characters = consolidated["main_characters"]
+        main_locations = consolidated["main_locations"]
+        logger.info("[analyze] Building entity visual tokens...")
+
+        entities_for_tokens: list[dict] = []
+        for ch in main_characters:
+            onto = ch.get("ontology") or {}
+            entities_for_tokens.append({
+                "name": ch.get("name", ""),
+                "description": ch.get("physical_description", ""),
+                "entity_class": onto.get("entity_class", "human"),
+                "anti_human_override": onto.get("anti_human_override", False),
+                "visual_markers": onto.get("visual_markers", []),
+                "search_archetype": onto.get("search_archetype"),
+            })
+        for loc in main_locations:
+            onto = loc.get("ontology") or {}
+            entities_for_tokens.append({
+                "name": loc.get("name", ""),
+                "description": loc.get("visual_description", ""),
+                "entity_class": onto.get("entity_class", "construct"),
+                "anti_human_override": False,
+                "visual_markers": onto.get("visual_markers", []),
+                "search_archetype": None,
+            })
+
+        token_results: list[dict] = []
+        if entities_for_tokens:
+            try:
+                token_results = _checkpointed(
+                    checkpoints, "entity_tokens", lambda: build_entity_visual_tokens_batch(entities_for_tokens)
+                )
+            except Exception as e:
+                logger.error("[analyze] Entity token building failed: %s", e)
+                token_results = []
+
+        # Attach visual tokens back to each character / location
+        token_map: dict[str, dict] = {}
+        for t in token_results:
+            if isinstance(t, dict) and t.get("name"):
+                token_map[t["name"].lower()] = t
+
+        for ch in main_characters:
+            key = ch.get("name", "").lower()
+            ch["entity_visual_tokens"] = token_map.get(key, {})
+
+        for loc in main_locations:
+            key = loc.get("name", "").lower()
+            loc["entity_visual_tokens"] = token_map.get(key, {})
+
+    def _character_priority(out: dict) -> list[float]:
+        # The only per-chunk field that needs consolidation. Returned rather than written
+        # into the chunk dicts, which the scene stages read concurrently; merged after the DAG.
+        main_characters = out["consolidation"].get("main_characters", [])
+        return [
+            calculate_character_priority(chunk_analysis.get("characters_present", []), main_characters)
+            for chunk_analysis in all_chunk_analyses
+        ]
+
+    def _entities_ready(out: dict) -> None:
+        on_entities_ready(out["consolidation"])
+
+    def _scene_candidates(_out: dict) -> list[dict]:
+        # Pass A — deterministic sliding window; needs only the chunk analyses
+        from app.services.scene_extractor import group_chunks_into_candidate_scenes
+
+        if scene_count <= 0 or not all_chunk_analyses:
+            return []
+        if checkpoints is not None and checkpoints.has("scenes"):
+            return []
+        candidates = group_chunks_into_candidate_scenes(all_chunk_analyses, scene_count)
+        logger.info("[scene_extractor] Pass A: %d candidates", len(candidates))
+        return candidates
+
+    def _extract_scenes(out: dict) -> list[dict]:
+        # Pass B — LLM refinement of the Pass A candidates
+        from app.services.scene_extractor import extract_scenes_llm
+
+        if scene_count <= 0 or not all_chunk_analyses:
+            return []
+        logger.info("[analyze] Extracting scenes (scene_count=%d)...", scene_count)
+        candidates = out["scene_candidates"]
         try:
-            from app.services.scene_extractor import extract_scenes
-            scenes = extract_scenes(
-                all_chunk_analyses,
-                scene_count=scene_count,
-                chunk_text_map=chunk_text_map,
-                manuscript_lang=manuscript_lang,
-                analysis_run_id=run_id,
+            scenes = _checkpointed(
+                checkpoints, "scenes",
+                lambda: extract_scenes_llm(
+                    candidates, scene_count,
+                    chunk_text_map=chunk_text_map,
+                    manuscript_lang=manuscript_lang,
+                    analysis_run_id=prompt_run_id,
+                ) if candidates else [],
             )
         except Exception as e:
             logger.error("[analyze] Scene extraction failed: %s", e)
-            scenes = []
-
-    logger.info("[analyze] Scene extraction done in %.1fs: %d scenes", time.perf_counter() - t_scenes, len(scenes))
-
-    # 5. Scene visual composer — build visual tokens + T2I prompts per scene
-    if progress_callback:
-        try:
-            progress_callback(len(chunks), len(chunks))
-        except Exception:
-            pass
-    t_composer = time.perf_counter()
-    logger.info("[analyze] Building scene visual tokens and T2I prompts...")
-
-    if scenes:
+            return []
+        logger.info("[scene_extractor] Pass B: %d scenes selected", len(scenes))
+        return scenes
+
+    def _compose_scenes(out: dict) -> list[dict]:
+        # Scene visual composer — build visual tokens + T2I prompts per scene
+        scenes = out["scenes"]
+        if not scenes:
+            return scenes
+        logger.info("[analyze] Building scene visual tokens and T2I prompts...")
         try:
             from app.services.scene_visual_composer import compose_scenes_batch
+            consolidated = out["consolidation"]
             tone_and_style = consolidated.get("tone_and_style", {})
             style_cat = tone_and_style.get("genre", "fiction")
             character_ontologies = [
@@ -875,19 +1383,42 @@ def run_full_analysis(
                     "visual_markers": (ch.get("ontology") or {}).get("visual_markers", []),
                     "search_archetype": (ch.get("ontology") or {}).get("search_archetype"),
                 }
-                for ch in main_characters
+                for ch in consolidated.get("main_characters", [])
             ]
-            scenes = compose_scenes_batch(scenes, character_ontologies, style_cat)
+            return _checkpointed(
+                checkpoints, "composed_scenes",
+                lambda: compose_scenes_batch(scenes, character_ontologies, style_cat),
+            )
         except Exception as e:
             logger.error("[analyze] Scene visual composition failed: %s", e)
-
-    logger.info("[analyze] Scene composition done in %.1fs", time.perf_counter() - t_composer)
+            return scenes
+
+    stages = [
+        Stage("consolidation", _consolidate),
+        Stage("scene_candidates", _scene_candidates),
+        Stage("scenes", _extract_scenes, deps=("scene_candidates",)),
+        Stage("ontology", _classify_ontology, deps=("consolidation",)),
+        Stage("character_priority", _character_priority, deps=("consolidation",)),
+        Stage("entity_tokens", _build_entity_tokens, deps=("ontology",)),
+        Stage("composed_scenes", _compose_scenes, deps=("scenes", "ontology")),
+    ]
+    if on_entities_ready:
+        stages.append(Stage("entities_ready", _entities_ready, deps=("entity_tokens",), inline=True))
+    outputs, stage_timings = run_stages(stages, max_workers=max(2, workers))
+    for chunk_analysis, priority in zip(all_chunk_analyses, outputs["character_priority"]):
+        chunk_analysis["character_priority"] = priority
 
     # Final merge and return
+    consolidated = outputs["consolidation"]
+    main_characters = consolidated.get("main_characters", [])
+    main_locations = consolidated.get("main_locations", [])
+    scenes = outputs["composed_scenes"]
     consolidated["chunk_analyses"] = all_chunk_analyses
     consolidated["main_characters"] = main_characters
     consolidated["main_locations"] = main_locations
     consolidated["scenes"] = scenes
+    consolidated["entity_premerge"] = premerge_report
+    consolidated["stage_timings"] = stage_timings
 
     logger.info(
         "[analyze] Analysis complete in %.1fs: %d chunks, %d main characters, %d main locations",
@@ -0,0 +1,264 @@
+"""
+Analysis Store — durable, compressed storage for analysis results.
+
+Checkpoints: every expensive stage of run_full_analysis (each batch result,
+consolidation, ontology, entity tokens, scenes) is written as zlib-compressed JSON
+keyed by (run_id, stage). A run that is restarted with the same run_id reads
+finished stages back instead of repeating their LLM calls.
+
+Chunk cache: each chunk's batch-analysis output is also stored under a hash of
+(prompt version, model, chunk text), so re-analysing an edited manuscript — or the
+same text in another book — only sends the changed chunks to the LLM, however the
+batches are packed.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.database import SessionLocal
+from app.services.db_writer import DbWriter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Params that change what the LLM is asked; a resumed run must match on all of them.
+RESUME_PARAM_KEYS = ("scene_count", "is_well_known", "fresh")
+# Lock files of running analysis runs (see RunLock)
+RUN_LOCK_DIR = os.getenv("ANALYSIS_RUN_LOCK_DIR") or os.path.join(tempfile.gettempdir(), "storyforge-analysis-runs")
+
+
+def compress_json(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def decompress_json(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def chunks_fingerprint(chunks: list[dict], params: Optional[dict] = None) -> str:
+    """
+    Stable hash of the chunk texts (in order) plus the LLM-relevant request params.
+    Used to decide whether an unfinished run can be resumed for the current chunks.
+    """
+    h = hashlib.sha256()
+    for ch in chunks:
+        h.update(str(ch["chunk_index"]).encode("ascii"))
+        h.update(b"\x00")
+        h.update((ch.get("text") or "").encode("utf-8"))
+        h.update(b"\x01")
+    relevant = {k: (params or {}).get(k) for k in RESUME_PARAM_KEYS}
+    h.update(json.dumps(relevant, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def batch_stage(batch: list[dict]) -> str:
+    """Checkpoint key for a batch — by chunk range, so a re-planned batch never matches stale data."""
+    return f"batch:{batch[0]['chunk_index']}-{batch[-1]['chunk_index']}"
+
+
+class CheckpointStore:
+    """
+    Read/write stage checkpoints for one analysis run.
+
+    Existing checkpoints are loaded once (still compressed) on construction; each
+    put() is committed before it returns — through *writer* when given (merged with
+    the other queued writes), otherwise through its own short-lived session — so a
+    crash after put() never loses that stage.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        session_factory: Callable[[], Session] = SessionLocal,
+        writer: Optional[DbWriter] = None,
+    ):
+        self.run_id = run_id
+        self._session_factory = session_factory
+        self._writer = writer
+        self._lock = threading.Lock()
+        db = session_factory()
+        try:
+            self._payloads: dict[str, bytes] = crud.get_analysis_checkpoints(db, run_id)
+        finally:
+            db.close()
+        if self._payloads:
+            logger.info(
+                "[checkpoints] run %s: %d stages already checkpointed", run_id, len(self._payloads)
+            )
+
+    def has(self, stage: str) -> bool:
+        return stage in self._payloads
+
+    def get(self, stage: str) -> Optional[Any]:
+        payload = self._payloads.get(stage)
+        if payload is None:
+            return None
+        try:
+            return decompress_json(payload)
+        except (zlib.error, ValueError) as e:
+            logger.warning("[checkpoints] run %s: unreadable checkpoint %s: %s", self.run_id, stage, e)
+            return None
+
+    def put(self, stage: str, data: Any) -> None:
+        payload = compress_json(data)
+        if self._writer is not None:
+            self._writer.write(
+                lambda db: crud.save_analysis_checkpoint(db, self.run_id, stage, payload, commit=False)
+            )
+            with self._lock:
+                self._payloads[stage] = payload
+            return
+        with self._lock:
+            db = self._session_factory()
+            try:
+                crud.save_analysis_checkpoint(db, self.run_id, stage, payload)
+            finally:
+                db.close()
+            self._payloads[stage] = payload
+
+
+class RunLock:
+    """
+    Exclusive OS file lock on one analysis run, held by the process executing it.
+
+    Every uvicorn worker runs the startup resume scan; the lock makes sure a run is
+    executed by one of them only, and that a run still in progress in a live worker is
+    not resumed by another. The OS drops the lock when its process dies, so the run of
+    a crashed worker can be taken over.
+    """
+
+    def __init__(self, run_id: str, lock_dir: Optional[str] = None):
+        self.path = os.path.join(lock_dir or RUN_LOCK_DIR, f"{run_id}.lock")
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False if another process or thread holds it."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        if fcntl is None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()  # also drops the flock
+        self._file = None
+
+
+def chunk_cache_key(text: str, prompt_version: str, model: str) -> str:
+    """Content address of one chunk's analysis: sha256 over prompt version, model and text."""
+    h = hashlib.sha256()
+    for part in (prompt_version, model, text or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _entities_for_chunk(entities: list[dict], present: list[str]) -> list[dict]:
+    names = {n.lower() for n in present if isinstance(n, str)}
+    return [e for e in entities if isinstance(e, dict) and (e.get("name") or "").lower() in names]
+
+
+def split_batch_result(result: dict) -> dict[int, dict]:
+    """
+    Split one analyze_chunk_batch result into per-chunk cache entries:
+    {chunk_index: {"analysis": ..., "characters": [...], "locations": [...]}}.
+
+    A chunk keeps the batch-level characters/locations it lists as present; entities
+    no chunk lists are kept with the batch's first chunk so they are never lost.
+    """
+    characters = result.get("characters", []) or []
+    locations = result.get("locations", []) or []
+    entries: dict[int, dict] = {}
+    for ca in result.get("chunk_analyses", []) or []:
+        if not isinstance(ca, dict) or ca.get("chunk_index") is None:
+            continue
+        analysis = {k: v for k, v in ca.items() if k != "chunk_index"}
+        entries[ca["chunk_index"]] = {
+            "analysis": analysis,
+            "characters": _entities_for_chunk(characters, ca.get("characters_present") or []),
+            "locations": _entities_for_chunk(locations, ca.get("locations_present") or []),
+        }
+    if entries:
+        first = entries[min(entries)]
+        placed_chars = {e["name"].lower() for en in entries.values() for e in en["characters"]}
+        placed_locs = {e["name"].lower() for en in entries.values() for e in en["locations"]}
+        first["characters"] += [
+            e for e in characters if isinstance(e, dict) and (e.get("name") or "").lower() not in placed_chars
+        ]
+        first["locations"] += [
+            e for e in locations if isinstance(e, dict) and (e.get("name") or "").lower() not in placed_locs
+        ]
+    return entries
+
+
+def assemble_batch_result(entries: dict[int, dict]) -> dict:
+    """Inverse of split_batch_result: a batch-shaped result for cached chunks (in chunk order)."""
+    result: dict = {"characters": [], "locations": [], "chunk_analyses": []}
+    for idx in sorted(entries):
+        entry = entries[idx]
+        result["characters"].extend(entry.get("characters", []))
+        result["locations"].extend(entry.get("locations", []))
+        result["chunk_analyses"].append({"chunk_index": idx, **entry.get("analysis", {})})
+    return result
+
+
+class ChunkAnalysisCache:
+    """
+    Read/write the content-addressed per-chunk analysis cache. Reads use short-lived
+    sessions; writes go through *writer* when given, otherwise a session of their own.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, writer: Optional[DbWriter] = None):
+        self._session_factory = session_factory
+        self._writer = writer
+
+    def get_many(self, keys: list[str]) -> dict[str, dict]:
+        db = self._session_factory()
+        try:
+            payloads = crud.get_chunk_analysis_cache(db, keys)
+        finally:
+            db.close()
+        found: dict[str, dict] = {}
+        for key, payload in payloads.items():
+            try:
+                found[key] = decompress_json(payload)
+            except (zlib.error, ValueError) as e:
+                logger.warning("[chunk_cache] unreadable entry %s: %s", key[:12], e)
+        return found
+
+    def put_many(self, entries: dict[str, dict]) -> None:
+        payloads = {key: compress_json(entry) for key, entry in entries.items()}
+        if self._writer is not None:
+            self._writer.write(lambda db: crud.save_chunk_analysis_cache(db, payloads, commit=False))
+            return
+        db = self._session_factory()
+        try:
+            crud.save_chunk_analysis_cache(db, payloads)
+        finally:
+            db.close()
@@ -0,0 +1,141 @@
+"""
+Batch Planner — token-budget-aware packing of chunks into batch-analysis calls.
+
+Replaces the fixed BATCH_SIZE slicing: contiguous chunks are packed greedily until
+either the prompt budget (chunk text sent to the model) or the expected completion
+budget (the JSON the model writes back) would be exceeded. Batches therefore come out
+fewer and fuller, and no batch is planned whose response would be cut off at max_tokens.
+Chunks that carry a chapter_index are never batched across a chapter boundary.
+"""
+import logging
+import os
+from typing import Optional
+
+from app.services.book_service import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Completion limit (max_tokens) of the chat models, matched by longest name prefix so
+# dated snapshots ("gpt-4o-mini-2024-07-18") resolve too. A max_tokens above the model's
+# limit makes every batch call fail with a 400, so the configured budget is clamped to it.
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-4o-mini": 16384,
+    "gpt-4o": 16384,
+    "gpt-4.1": 32768,
+    "gpt-4-turbo": 4096,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 4096,
+}
+# Models not in the table: a budget every current chat model accepts
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+
+def model_max_output_tokens(model: str) -> Optional[int]:
+    """Completion limit of *model* from MODEL_MAX_OUTPUT_TOKENS, or None if unknown."""
+    matches = [prefix for prefix in MODEL_MAX_OUTPUT_TOKENS if model.startswith(prefix)]
+    return MODEL_MAX_OUTPUT_TOKENS[max(matches, key=len)] if matches else None
+
+
+def resolve_max_output_tokens(model: str, configured: Optional[int] = None) -> int:
+    """
+    Completion budget per batch call for *model*: *configured* (OPENAI_BATCH_MAX_OUTPUT_TOKENS)
+    clamped to the model's limit, or the limit itself when not configured. For unknown
+    models a configured value is trusted and the default is DEFAULT_MAX_OUTPUT_TOKENS.
+    """
+    limit = model_max_output_tokens(model)
+    if configured is None:
+        return limit or DEFAULT_MAX_OUTPUT_TOKENS
+    if limit is not None and configured > limit:
+        logger.warning(
+            "[batch_planner] OPENAI_BATCH_MAX_OUTPUT_TOKENS=%d exceeds the %d-token limit of %s; using %d",
+            configured, limit, model, limit,
+        )
+        return limit
+    return configured
+
+
+# Completion budget per batch call (passed as max_tokens), derived from OPENAI_MODEL.
+BATCH_MAX_OUTPUT_TOKENS = resolve_max_output_tokens(
+    os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+    int(os.getenv("OPENAI_BATCH_MAX_OUTPUT_TOKENS") or 0) or None,
+)
+# Prompt budget for chunk text per call; gpt-4o-mini has a 128K context window.
+BATCH_MAX_INPUT_TOKENS = int(os.getenv("OPENAI_BATCH_MAX_INPUT_TOKENS", "60000"))
+# Hard cap on chunks per call — bounds what a single failed or slow call can cost.
+BATCH_MAX_CHUNKS = int(os.getenv("OPENAI_BATCH_MAX_CHUNKS", "20"))
+
+# Expected completion size. Each chunk_analyses entry is ~250-320 tokens of JSON; the
+# batch-level characters/locations lists grow with the amount of text analysed.
+OUTPUT_TOKENS_BASE = 200
+OUTPUT_TOKENS_PER_CHUNK = 320
+OUTPUT_TOKENS_PER_INPUT_TOKEN = 0.06
+# Only this share of BATCH_MAX_OUTPUT_TOKENS is planned for, as headroom for chatty responses.
+OUTPUT_SAFETY_MARGIN = 0.8
+
+# "--- CHUNK n ---" header and separators added per chunk in the user message
+CHUNK_OVERHEAD_TOKENS = 10
+
+
+def chunk_token_count(chunk: dict) -> int:
+    """Prompt tokens for one chunk: its precomputed token_count if present, else tiktoken."""
+    tokens = chunk.get("token_count")
+    if tokens is None:
+        tokens = count_tokens(chunk.get("text") or "")
+    return int(tokens) + CHUNK_OVERHEAD_TOKENS
+
+
+def estimate_output_tokens(input_tokens: list[int]) -> int:
+    """Expected completion tokens for a batch whose chunks have the given prompt sizes."""
+    return int(
+        OUTPUT_TOKENS_BASE
+        + sum(OUTPUT_TOKENS_PER_CHUNK + t * OUTPUT_TOKENS_PER_INPUT_TOKEN for t in input_tokens)
+    )
+
+
+def plan_batches(
+    chunks: list[dict],
+    *,
+    max_input_tokens: Optional[int] = None,
+    max_output_tokens: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> list[list[dict]]:
+    """
+    Pack *chunks* (in order) into contiguous batches that fit the token budgets.
+
+    A batch is closed when adding the next chunk would exceed the prompt budget,
+    the safety-adjusted completion budget, or max_chunks, or when the next chunk
+    starts a new chapter ("chapter_index"). A single chunk always forms a batch on
+    its own, even if it alone is over budget.
+    Chunks may carry a precomputed "token_count" to skip re-tokenising.
+    """
+    max_input = max_input_tokens or BATCH_MAX_INPUT_TOKENS
+    output_budget = int((max_output_tokens or BATCH_MAX_OUTPUT_TOKENS) * OUTPUT_SAFETY_MARGIN)
+    cap = max(1, max_chunks or BATCH_MAX_CHUNKS)
+
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    current_tokens: list[int] = []
+
+    for chunk in chunks:
+        tokens = chunk_token_count(chunk)
+        if current:
+            fits = (
+                len(current) < cap
+                and chunk.get("chapter_index") == current[-1].get("chapter_index")
+                and sum(current_tokens) + tokens <= max_input
+                and estimate_output_tokens(current_tokens + [tokens]) <= output_budget
+            )
+            if not fits:
+                batches.append(current)
+                current, current_tokens = [], []
+        current.append(chunk)
+        current_tokens.append(tokens)
+
+    if current:
+        batches.append(current)
+
+    logger.info(
+        "[batch_planner] %d chunks -> %d batches (input<=%d, output<=%d, max_chunks=%d)",
+        len(chunks), len(batches), max_input, output_budget, cap,
+    )
+    return batches
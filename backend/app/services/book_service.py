@@ -1,12 +1,21 @@
 """Book import and text processing service."""
+import bisect
+import codecs
+import json
 import os
 import re
 import logging
-from typing import Optional
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Iterator, Optional
 
 import httpx
 import tiktoken
 
+from app.services.upload_service import decode_text_bytes, normalize_newlines
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -33,10 +42,150 @@ def build_direct_download_url(file_id: str) -> str:
 # Download
 # ---------------------------------------------------------------------------
 
-async def download_text_from_google_drive(google_drive_link: str) -> str:
+# Largest Google Drive import accepted; the download stops as soon as it is crossed
+GDRIVE_MAX_BYTES = int(os.getenv("GDRIVE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Reconnects after an interrupted transfer (resumed with a Range request)
+GDRIVE_DOWNLOAD_RETRIES = int(os.getenv("GDRIVE_DOWNLOAD_RETRIES", "3"))
+
+# Known non-text file types
+_NON_TEXT_TYPES = (
+    "application/pdf",
+    "application/msword",
+    "application/vnd.openxmlformats",
+    "application/vnd.ms-",
+    "image/",
+    "application/zip",
+    "application/x-rar",
+)
+_CONTENT_RANGE_START = re.compile(r"bytes\s+(\d+)-")
+
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)")
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared client (connection pool) for downloads; closed by close_http_client()."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(follow_redirects=True, timeout=60.0)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared download client (application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _charset(content_type: str) -> Optional[str]:
+    """Charset declared in a Content-Type header, or None if missing / unknown."""
+    match = _CHARSET.search(content_type)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return None
+
+
+def _check_download_response(response: httpx.Response, resumed: bool) -> None:
+    if response.status_code not in (200, 206) or (response.status_code == 206 and not resumed):
+        raise RuntimeError(
+            f"Failed to download file from Google Drive "
+            f"(HTTP {response.status_code})"
+        )
+    content_type = response.headers.get("content-type", "").lower()
+    if any(nt in content_type for nt in _NON_TEXT_TYPES):
+        raise RuntimeError(
+            "The linked file does not appear to be a .txt file. "
+            "Please ensure the file format is correct."
+        )
+
+
+async def download_to_file(
+    url: str,
+    dest_path: str,
+    *,
+    max_bytes: Optional[int] = None,
+    retries: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> httpx.Headers:
+    """
+    Stream *url* into *dest_path* without holding it in memory.
+
+    The download is abandoned as soon as it exceeds *max_bytes* (GDRIVE_MAX_BYTES),
+    or up front if Content-Length already does. After a dropped connection it is
+    resumed up to *retries* times with a Range request for the missing bytes; a
+    server that ignores Range (200 instead of 206) restarts from the beginning.
+    Returns the headers of the first response. A partial file is removed on failure.
+
+    Raises:
+        RuntimeError – HTTP error, non-text content, size limit, or network error
+    """
+    max_bytes = GDRIVE_MAX_BYTES if max_bytes is None else max_bytes
+    retries = GDRIVE_DOWNLOAD_RETRIES if retries is None else retries
+    client = client or _get_http_client()
+    limit_error = RuntimeError(f"File exceeds {max_bytes // (1024 * 1024)} MB limit.")
+    headers: Optional[httpx.Headers] = None
+    received = 0
+    attempt = 0
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                request_headers = {"Range": f"bytes={received}-"} if received else {}
+                try:
+                    async with client.stream("GET", url, headers=request_headers) as response:
+                        _check_download_response(response, resumed=bool(received))
+                        if headers is None:
+                            headers = response.headers
+                        if response.status_code == 206:
+                            match = _CONTENT_RANGE_START.match(response.headers.get("content-range", ""))
+                            if not match or int(match.group(1)) != received:
+                                raise RuntimeError("Google Drive returned an unexpected byte range.")
+                        elif received:
+                            logger.info("Server ignored Range, restarting download of %s", url)
+                            f.seek(0)
+                            f.truncate()
+                            received = 0
+                        length = response.headers.get("content-length")
+                        if length and length.isdigit() and received + int(length) > max_bytes:
+                            raise limit_error
+                        async for block in response.aiter_bytes():
+                            received += len(block)
+                            if received > max_bytes:
+                                raise limit_error
+                            f.write(block)
+                    return headers
+                except httpx.TransportError as exc:
+                    attempt += 1
+                    if attempt > retries:
+                        raise RuntimeError(f"Download from Google Drive failed: {exc}") from exc
+                    logger.warning(
+                        "Download of %s interrupted after %d bytes (%s), resuming (%d/%d)",
+                        url, received, exc, attempt, retries,
+                    )
+    except BaseException:
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        raise
+
+
+async def download_text_from_google_drive(
+    google_drive_link: str,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+) -> str:
     """
     Download a plain-text file from a Google Drive shareable link.
 
+    The file is streamed to a temporary file (see download_to_file), so an
+    oversized file is rejected after GDRIVE_MAX_BYTES rather than in full.
+
     Raises:
         ValueError  – invalid link format
         RuntimeError – network / download error
@@ -51,48 +200,34 @@ async def download_text_from_google_drive(google_drive_link: str) -> str:
     url = build_direct_download_url(file_id)
     logger.info("Downloading from Google Drive: %s", url)
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=60.0) as client:
-        response = await client.get(url)
-
-        if response.status_code != 200:
+    fd, temp_path = tempfile.mkstemp(prefix=f"gdrive-{file_id}-", suffix=".part")
+    os.close(fd)
+    try:
+        headers = await download_to_file(url, temp_path, client=client)
+        content_type = headers.get("content-type", "").lower()
+        with open(temp_path, "rb") as f:
+            data = f.read()
+    finally:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    # The declared charset if any, else BOM / detection as for uploaded .txt files
+    encoding = _charset(content_type)
+    text = normalize_newlines(data.decode(encoding, errors="replace")) if encoding else decode_text_bytes(data)[0]
+
+    # Google may serve HTML for files that require auth
+    if "text/html" in content_type and len(data) < 5000:
+        if "ServiceLogin" in text or "accounts.google.com" in text:
             raise RuntimeError(
-                f"Failed to download file from Google Drive "
-                f"(HTTP {response.status_code})"
+                "File is not publicly shared. Please set sharing to "
+                "'Anyone with the link'."
             )
 
-        content_type = response.headers.get("content-type", "").lower()
-        # Reject known non-text file types
-        non_text_types = (
-            "application/pdf",
-            "application/msword",
-            "application/vnd.openxmlformats",
-            "application/vnd.ms-",
-            "image/",
-            "application/zip",
-            "application/x-rar",
-        )
-        if any(nt in content_type for nt in non_text_types):
-            raise RuntimeError(
-                "The linked file does not appear to be a .txt file. "
-                "Please ensure the file format is correct."
-            )
-        # Google may serve HTML for files that require auth
-        if "text/html" in content_type and len(response.text) < 5000:
-            if "ServiceLogin" in response.text or "accounts.google.com" in response.text:
-                raise RuntimeError(
-                    "File is not publicly shared. Please set sharing to "
-                    "'Anyone with the link'."
-                )
-
-        text = response.text
-
     if not text.strip():
         raise RuntimeError("Downloaded file is empty.")
 
-    # Guard against absurdly large files (>10 MB text)
-    if len(text.encode("utf-8")) > 10 * 1024 * 1024:
-        raise RuntimeError("File exceeds 10 MB limit.")
-
     return text
 
 
@@ -131,143 +266,405 @@ def count_tokens(text: str) -> int:
     return len(_get_encoder().encode(text))
 
 
+_PARAGRAPH_SEP = re.compile(r"\n\s*\n")
+_SENTENCE_SEP = re.compile(r"(?<=[.!?])\s+")
+
+
+def _iter_paragraphs(text: str, offset: int = 0) -> Iterator[tuple[str, int]]:
+    """
+    Stripped, non-blank paragraphs of *text* (blank-line separated), lazily, each
+    with the position of its first character (plus *offset*).
+    """
+    start = 0
+    for match in _PARAGRAPH_SEP.finditer(text):
+        raw = text[start:match.start()]
+        para = raw.strip()
+        if para:
+            yield para, offset + start + len(raw) - len(raw.lstrip())
+        start = match.end()
+    raw = text[start:]
+    para = raw.strip()
+    if para:
+        yield para, offset + start + len(raw) - len(raw.lstrip())
+
+
 def chunk_text(
     text: str,
     *,
     target_tokens: int = 2000,
     overlap_tokens: int = 200,
+    page_word_starts: Optional[list[int]] = None,
 ) -> list[dict]:
     """
     Split *text* into overlapping chunks that respect paragraph boundaries.
 
+    Pages are estimated from WORDS_PER_PAGE unless *page_word_starts* (words of the
+    text before each real page, e.g. from a PDF) is given.
+
     Returns a list of dicts:
-        {chunk_index, text, start_page, end_page, word_count}
+        {chunk_index, text, start_page, end_page, word_count, start_char, end_char}
+    where text[start_char:end_char] is the span of the source the chunk was built
+    from (equal to the chunk text unless paragraph or sentence separators were
+    normalised).
+    """
+    return list(iter_chunks(
+        text, target_tokens=target_tokens, overlap_tokens=overlap_tokens,
+        page_word_starts=page_word_starts,
+    ))
+
+
+def iter_chunks(
+    text: str,
+    *,
+    target_tokens: int = 2000,
+    overlap_tokens: int = 200,
+    page_word_starts: Optional[list[int]] = None,
+) -> Iterator[dict]:
     """
-    paragraphs = re.split(r"\n\s*\n", text)
-    # Remove blanks
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+    Generator behind chunk_text(): yields each chunk as soon as it is complete.
 
+    Every paragraph (and every sentence of an oversized paragraph) is tokenised and
+    word-counted exactly once; overlap selection and page offsets reuse those counts.
+    """
     enc = _get_encoder()
-    chunks: list[dict] = []
-    current_paragraphs: list[str] = []
+    measured = (
+        _measure_paragraph(para, enc, target_tokens, start) for para, start in _iter_paragraphs(text)
+    )
+    return _assemble_chunks(measured, target_tokens, overlap_tokens, page_word_starts)
+
+
+# A piece of a chunk: (text, tokens, words, start_char)
+_Piece = tuple[str, int, int, int]
+# (paragraph, tokens, words, start_char, sentences) — sentences as pieces, only for
+# paragraphs over the chunk target (None otherwise)
+_MeasuredParagraph = tuple[str, int, int, int, Optional[list[_Piece]]]
+
+
+def _measure_paragraph(
+    para: str, enc: tiktoken.Encoding, target_tokens: int, start: int = 0
+) -> _MeasuredParagraph:
+    para_tokens = len(enc.encode(para))
+    sentences = None
+    if para_tokens > target_tokens:
+        sentences = []
+        sent_start = 0
+        for match in [*_SENTENCE_SEP.finditer(para), None]:
+            s = para[sent_start:match.start()] if match else para[sent_start:]
+            sentences.append((s, len(enc.encode(s)), len(s.split()), start + sent_start))
+            if match:
+                sent_start = match.end()
+    return para, para_tokens, len(para.split()), start, sentences
+
+
+def _assemble_chunks(
+    measured: Iterator[_MeasuredParagraph],
+    target_tokens: int,
+    overlap_tokens: int,
+    page_word_starts: Optional[list[int]] = None,
+    *,
+    word_offset: int = 0,
+    chunk_index: int = 0,
+) -> Iterator[dict]:
+    """
+    Pack measured paragraphs into chunks; no tokenisation happens here.
+    *word_offset* / *chunk_index* are those of the first paragraph / chunk when the
+    paragraphs are a slice of the text (a chapter).
+    """
+    # Paragraph pieces of the chunk being built
+    current: list[_Piece] = []
     current_tokens = 0
-    word_offset = 0  # running word position in the full text
-
-    def _flush(paras: list[str], w_offset: int) -> dict:
-        chunk_text_str = "\n\n".join(paras)
-        words = chunk_text_str.split()
-        wc = len(words)
-        start_page = max(1, w_offset // WORDS_PER_PAGE + 1)
-        end_page = max(start_page, (w_offset + wc) // WORDS_PER_PAGE + 1)
+    # word_offset: running word position in the full text
+
+    def _make(chunk_str: str, wc: int, w_offset: int, pieces: list[_Piece]) -> dict:
+        if page_word_starts:
+            # Real pages: page of the chunk's first and last word
+            start_page = max(1, bisect.bisect_right(page_word_starts, w_offset))
+            end_page = max(start_page, bisect.bisect_right(page_word_starts, w_offset + wc - 1))
+        else:
+            start_page = max(1, w_offset // WORDS_PER_PAGE + 1)
+            end_page = max(start_page, (w_offset + wc) // WORDS_PER_PAGE + 1)
         return {
-            "chunk_index": len(chunks),
-            "text": chunk_text_str,
+            "chunk_index": chunk_index,
+            "text": chunk_str,
             "start_page": start_page,
             "end_page": end_page,
             "word_count": wc,
+            "start_char": pieces[0][3],
+            "end_char": pieces[-1][3] + len(pieces[-1][0]),
         }
 
-    for para in paragraphs:
-        para_tokens = len(enc.encode(para))
+    def _flush() -> tuple[dict, list[_Piece], int, int]:
+        """Chunk from *current*, plus the overlap carried over, its tokens and the new offset."""
+        chunk = _make("\n\n".join(p[0] for p in current), sum(p[2] for p in current), word_offset, current)
+        overlap, overlap_tok = _pick_overlap(current, overlap_tokens)
+        new_offset = word_offset + sum(p[2] for p in current) - sum(p[2] for p in overlap)
+        return chunk, overlap, overlap_tok, new_offset
 
+    for para, para_tokens, para_words, para_start, sentences in measured:
         # If a single paragraph exceeds target, force-flush current then
         # split the huge paragraph by sentences.
-        if para_tokens > target_tokens:
-            if current_paragraphs:
-                chunks.append(_flush(current_paragraphs, word_offset))
-                # Overlap: keep last paragraphs that fit within overlap_tokens
-                overlap_paras, overlap_tok = _pick_overlap(
-                    current_paragraphs, enc, overlap_tokens
-                )
-                word_offset += sum(len(p.split()) for p in current_paragraphs) - sum(
-                    len(p.split()) for p in overlap_paras
-                )
-                current_paragraphs = list(overlap_paras)
-                current_tokens = overlap_tok
+        if sentences is not None:
+            if current:
+                chunk, _, _, word_offset = _flush()
+                yield chunk
+                chunk_index += 1
             # Add the huge paragraph as its own chunk(s)
-            for sub in _split_large_paragraph(para, enc, target_tokens, overlap_tokens):
-                sub_words = sub.split()
-                start_p = max(1, word_offset // WORDS_PER_PAGE + 1)
-                end_p = max(start_p, (word_offset + len(sub_words)) // WORDS_PER_PAGE + 1)
-                chunks.append({
-                    "chunk_index": len(chunks),
-                    "text": sub,
-                    "start_page": start_p,
-                    "end_page": end_p,
-                    "word_count": len(sub_words),
-                })
-                word_offset += len(sub_words)
-            current_paragraphs = []
+            for sub_sentences in _split_large_paragraph(sentences, target_tokens, overlap_tokens):
+                sub_words = sum(s[2] for s in sub_sentences)
+                yield _make(" ".join(s[0] for s in sub_sentences), sub_words, word_offset, sub_sentences)
+                chunk_index += 1
+                word_offset += sub_words
+            current = []
             current_tokens = 0
             continue
 
-        if current_tokens + para_tokens > target_tokens and current_paragraphs:
-            chunks.append(_flush(current_paragraphs, word_offset))
-            overlap_paras, overlap_tok = _pick_overlap(
-                current_paragraphs, enc, overlap_tokens
-            )
-            word_offset += sum(len(p.split()) for p in current_paragraphs) - sum(
-                len(p.split()) for p in overlap_paras
-            )
-            current_paragraphs = list(overlap_paras)
-            current_tokens = overlap_tok
+        if current_tokens + para_tokens > target_tokens and current:
+            chunk, current, current_tokens, word_offset = _flush()
+            yield chunk
+            chunk_index += 1
 
-        current_paragraphs.append(para)
+        current.append((para, para_tokens, para_words, para_start))
         current_tokens += para_tokens
 
     # Remaining paragraphs
-    if current_paragraphs:
-        chunks.append(_flush(current_paragraphs, word_offset))
-
-    return chunks
+    if current:
+        yield _make("\n\n".join(p[0] for p in current), sum(p[2] for p in current), word_offset, current)
 
 
-def _pick_overlap(
-    paragraphs: list[str],
-    enc: tiktoken.Encoding,
-    max_tokens: int,
-) -> tuple[list[str], int]:
-    """Pick trailing paragraphs that fit within *max_tokens* for overlap."""
-    picked: list[str] = []
+def _pick_overlap(pieces: list[_Piece], max_tokens: int) -> tuple[list[_Piece], int]:
+    """Pick trailing pieces that fit within *max_tokens* for overlap."""
     total = 0
-    for para in reversed(paragraphs):
-        t = len(enc.encode(para))
+    start = len(pieces)
+    for i in range(len(pieces) - 1, -1, -1):
+        t = pieces[i][1]
         if total + t > max_tokens:
             break
-        picked.insert(0, para)
         total += t
-    return picked, total
+        start = i
+    return pieces[start:], total
 
 
 def _split_large_paragraph(
-    text: str,
-    enc: tiktoken.Encoding,
+    sentences: list[_Piece],
     target_tokens: int,
     overlap_tokens: int,
-) -> list[str]:
-    """Split an oversized paragraph into smaller pieces by sentences."""
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    parts: list[str] = []
-    current: list[str] = []
+) -> list[list[_Piece]]:
+    """Split an oversized paragraph, given as measured sentences, into runs of sentences."""
+    parts: list[list[_Piece]] = []
+    current: list[_Piece] = []
     current_tok = 0
 
     for sent in sentences:
-        st = len(enc.encode(sent))
+        st = sent[1]
         if current_tok + st > target_tokens and current:
-            parts.append(" ".join(current))
+            parts.append(current)
             # Keep overlap worth of sentences
-            overlap_sents, _ = _pick_overlap(current, enc, overlap_tokens)
-            current = list(overlap_sents)
-            current_tok = sum(len(enc.encode(s)) for s in current)
+            current, current_tok = _pick_overlap(current, overlap_tokens)
         current.append(sent)
         current_tok += st
 
     if current:
-        parts.append(" ".join(current))
+        parts.append(current)
 
     return parts
 
 
+# ---------------------------------------------------------------------------
+# Parallel chunking (very large manuscripts)
+# ---------------------------------------------------------------------------
+
+# Texts at least this long are tokenised in a process pool by chunk_text_parallel()
+PARALLEL_CHUNK_MIN_CHARS = int(os.getenv("PARALLEL_CHUNK_MIN_CHARS", "2000000"))
+# Worker processes for parallel chunking (default: CPU count, max 8; 1 disables)
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+# Approximate characters of paragraphs handed to one worker task
+_SEGMENT_CHARS = 250_000
+
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            # spawn: forking a process that runs uvicorn / DB threads is not safe
+            _chunk_pool = ProcessPoolExecutor(
+                max_workers=CHUNK_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _chunk_pool
+
+
+def shutdown_chunk_pool() -> None:
+    """Stop the chunking worker processes (application shutdown)."""
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is not None:
+            _chunk_pool.shutdown(wait=False, cancel_futures=True)
+            _chunk_pool = None
+
+
+def _measure_segment(paragraphs: list[tuple[str, int]], target_tokens: int) -> list[_MeasuredParagraph]:
+    """Worker task: token/word counts for one segment of (paragraph, start_char)."""
+    enc = _get_encoder()
+    return [_measure_paragraph(para, enc, target_tokens, start) for para, start in paragraphs]
+
+
+def _iter_segments(text: str, segment_chars: int, offset: int = 0) -> Iterator[list[tuple[str, int]]]:
+    """Consecutive runs of whole (paragraph, start_char), each about *segment_chars* long."""
+    segment: list[tuple[str, int]] = []
+    size = 0
+    for para, start in _iter_paragraphs(text, offset):
+        segment.append((para, start))
+        size += len(para)
+        if size >= segment_chars:
+            yield segment
+            segment, size = [], 0
+    if segment:
+        yield segment
+
+
+def chunk_text_parallel(
+    text: str,
+    *,
+    target_tokens: int = 2000,
+    overlap_tokens: int = 200,
+    min_chars: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    page_word_starts: Optional[list[int]] = None,
+) -> list[dict]:
+    """
+    chunk_text() for very large texts: tokenisation runs in worker processes.
+
+    The text is cut at paragraph boundaries into segments that are measured in
+    parallel; the measurements are then packed in order by the same assembly step as
+    the serial chunker, so overlaps, chunk_index and page numbers — and thus the
+    result — are identical to chunk_text(). Texts shorter than *min_chars*
+    (PARALLEL_CHUNK_MIN_CHARS), or CHUNK_WORKERS=1, use the serial path.
+    """
+    min_chars = PARALLEL_CHUNK_MIN_CHARS if min_chars is None else min_chars
+    if len(text) < min_chars or (executor is None and CHUNK_WORKERS <= 1):
+        return chunk_text(
+            text, target_tokens=target_tokens, overlap_tokens=overlap_tokens,
+            page_word_starts=page_word_starts,
+        )
+
+    pool = executor or _get_chunk_pool()
+    futures = [
+        pool.submit(_measure_segment, segment, target_tokens)
+        for segment in _iter_segments(text, _SEGMENT_CHARS)
+    ]
+    logger.info("Chunking %d chars in %d parallel segments", len(text), len(futures))
+
+    def _measured() -> Iterator[_MeasuredParagraph]:
+        for future in futures:  # submission order == text order
+            yield from future.result()
+
+    return list(_assemble_chunks(_measured(), target_tokens, overlap_tokens, page_word_starts))
+
+
+def chunk_chapters(
+    text: str,
+    chapters: list[dict],
+    *,
+    target_tokens: int = 2000,
+    overlap_tokens: int = 200,
+    min_chars: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    page_word_starts: Optional[list[int]] = None,
+) -> list[dict]:
+    """
+    chunk_text() run separately on each chapter ({chapter_index, start_char,
+    end_char, start_word}, see chapter_service.build_chapters), so no chunk — and
+    no overlap — crosses a chapter boundary. Each chunk also gets its chapter_index;
+    chunk_index and pages continue across chapters as in the full text.
+
+    Texts of at least *min_chars* (PARALLEL_CHUNK_MIN_CHARS) are measured in worker
+    processes, all chapters at once, as in chunk_text_parallel().
+    """
+    min_chars = PARALLEL_CHUNK_MIN_CHARS if min_chars is None else min_chars
+    parallel = len(text) >= min_chars and (executor is not None or CHUNK_WORKERS > 1)
+    if parallel:
+        pool = executor or _get_chunk_pool()
+        futures = [
+            [
+                pool.submit(_measure_segment, segment, target_tokens)
+                for segment in _iter_segments(
+                    text[ch["start_char"]:ch["end_char"]], _SEGMENT_CHARS, ch["start_char"],
+                )
+            ]
+            for ch in chapters
+        ]
+        logger.info(
+            "Chunking %d chars in %d chapters, %d parallel segments",
+            len(text), len(chapters), sum(len(f) for f in futures),
+        )
+    else:
+        enc = _get_encoder()
+
+    chunks: list[dict] = []
+    for i, ch in enumerate(chapters):
+        if parallel:
+            measured = (m for future in futures[i] for m in future.result())
+        else:
+            measured = (
+                _measure_paragraph(para, enc, target_tokens, start)
+                for para, start in _iter_paragraphs(text[ch["start_char"]:ch["end_char"]], ch["start_char"])
+            )
+        for chunk in _assemble_chunks(
+            measured, target_tokens, overlap_tokens, page_word_starts,
+            word_offset=ch["start_word"], chunk_index=len(chunks),
+        ):
+            chunk["chapter_index"] = ch["chapter_index"]
+            chunks.append(chunk)
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Text structure sidecars (real PDF pages, DOCX headings)
+# ---------------------------------------------------------------------------
+
+def _sidecar_path(text_path: str, kind: str) -> str:
+    return f"{os.path.splitext(text_path)[0]}.{kind}.json"
+
+
+def _save_sidecar(text_path: str, kind: str, value: Any) -> None:
+    with open(_sidecar_path(text_path, kind), "w", encoding="utf-8") as f:
+        json.dump({kind: value}, f)
+
+
+def _load_sidecar(text_path: str, kind: str) -> Any:
+    try:
+        with open(_sidecar_path(text_path, kind), "r", encoding="utf-8") as f:
+            return json.load(f).get(kind) or None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable %s sidecar for %s: %s", kind, text_path, e)
+        return None
+
+
+def save_page_map(text_path: str, page_word_starts: list[int]) -> None:
+    """Store the word offset of each real page (PDF) next to the text file."""
+    _save_sidecar(text_path, "pages", page_word_starts)
+
+
+def load_page_map(text_path: str) -> Optional[list[int]]:
+    """page_word_starts saved for *text_path*, or None if the text has no real pages."""
+    return _load_sidecar(text_path, "pages")
+
+
+def save_headings(text_path: str, headings: list[dict]) -> None:
+    """Store document headings ({title, level, word_offset}) next to the text file."""
+    _save_sidecar(text_path, "headings", headings)
+
+
+def load_headings(text_path: str) -> Optional[list[dict]]:
+    """Headings saved for *text_path*, or None if the source had no heading styles."""
+    return _load_sidecar(text_path, "headings")
+
+
 def guess_title(text: str, filename: Optional[str] = None) -> str:
     """
     Guess book title from the file name or first non-empty line of text.
@@ -0,0 +1,151 @@
+"""
+Chapter Service — chapter detection at ingestion.
+
+Chapters are found, in order of preference, from:
+  - DOCX heading styles (extract_docx_structure headings): the shallowest heading
+    level below Title that occurs at least twice;
+  - PDF outlines (bookmarks): top-level entries, mapped to their page's first word;
+  - heading lines in the text ("Chapter 12", "CHAPTER IV: The Storm", "Глава 3",
+    "Prologue", ...). Plain-text uploads need a blank line before the heading;
+    DOCX/PDF text has one paragraph/line per heading already.
+
+The result covers the whole text as contiguous [start_char, end_char) ranges, so
+chunking can run per chapter and never straddle a chapter boundary. Fewer than two
+detected headings means no usable structure and no chapters.
+"""
+import logging
+import re
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MIN_CHAPTERS = 2
+MAX_TITLE_CHARS = 200
+
+_HEADING = (
+    r"(?:Chapter|CHAPTER|Глава|ГЛАВА)[ \t]+(?:\d+|[IVXLCDM]+|[A-ZА-ЯЁ][\w-]*)\b[^\n]{0,80}"
+    r"|Prologue|PROLOGUE|Epilogue|EPILOGUE|Пролог|ПРОЛОГ|Эпилог|ЭПИЛОГ"
+)
+# Heading alone on a line that follows a blank line (plain text)
+_TXT_HEADING = re.compile(rf"(?:\A|\n[ \t]*\n)[ \t]*(?P<title>{_HEADING})[ \t]*(?=\n|\Z)")
+# Heading alone on a line (DOCX paragraphs / PDF lines)
+_LINE_HEADING = re.compile(rf"(?:\A|\n)[ \t]*(?P<title>{_HEADING})[ \t]*(?=\n|\Z)")
+_WORD = re.compile(r"\S+")
+
+
+def heading_lines(text: str, *, blank_line_before: bool = True) -> list[tuple[int, str]]:
+    """(char_offset, title) of chapter heading lines in *text*."""
+    pattern = _TXT_HEADING if blank_line_before else _LINE_HEADING
+    return [(m.start("title"), m.group("title").strip()) for m in pattern.finditer(text)]
+
+
+def _chars_at_words(text: str, word_offsets: list[int]) -> list[int]:
+    """Char offset of the n-th word of *text* for each n in *word_offsets* (sorted)."""
+    result: list[int] = []
+    pending = sorted(word_offsets)
+    i = 0
+    for n, match in enumerate(_WORD.finditer(text)):
+        while i < len(pending) and pending[i] <= n:
+            result.append(match.start())
+            i += 1
+        if i == len(pending):
+            break
+    result.extend([len(text)] * (len(pending) - i))
+    return result
+
+
+def _from_docx_headings(text: str, headings: list[dict]) -> list[tuple[int, str]]:
+    levels = [h["level"] for h in headings if h.get("level")]
+    chapter_level = min((lvl for lvl in set(levels) if levels.count(lvl) >= MIN_CHAPTERS), default=None)
+    if chapter_level is None:
+        return []
+    chosen = [h for h in headings if h.get("level") == chapter_level]
+    chars = _chars_at_words(text, [h["word_offset"] for h in chosen])
+    return list(zip(chars, (h["title"] for h in chosen)))
+
+
+def _from_pdf_outline(
+    text: str, outline: list[dict], page_word_starts: list[int]
+) -> list[tuple[int, str]]:
+    entries = [
+        (page_word_starts[o["page"]], o["title"])
+        for o in outline
+        if 0 <= o.get("page", -1) < len(page_word_starts)
+    ]
+    chars = _chars_at_words(text, [w for w, _ in entries])
+    return list(zip(chars, (title for _, title in entries)))
+
+
+def build_chapters(text: str, starts: list[tuple[int, str]]) -> list[dict]:
+    """
+    Contiguous chapters from heading (char_offset, title) pairs. Text before the
+    first heading becomes an untitled chapter 0 if it has any words.
+
+    Returns:
+        [{chapter_index, title, start_char, end_char, start_word, word_count}]
+    """
+    by_offset: dict[int, str] = {}
+    for offset, title in sorted(starts):
+        by_offset.setdefault(offset, (title or "").strip()[:MAX_TITLE_CHARS] or None)
+    if len(by_offset) < MIN_CHAPTERS:
+        return []
+    offsets = sorted(by_offset)
+    if text[:offsets[0]].strip():
+        by_offset[0] = None
+        offsets.insert(0, 0)
+    else:
+        by_offset[0] = by_offset.pop(offsets[0])
+        offsets[0] = 0
+
+    # Words before each chapter start, in one pass over the text
+    start_words: list[int] = []
+    words_seen = 0
+    i = 0
+    for match in _WORD.finditer(text):
+        while i < len(offsets) and offsets[i] <= match.start():
+            start_words.append(words_seen)
+            i += 1
+        words_seen += 1
+    start_words.extend([words_seen] * (len(offsets) - i))
+
+    chapters = []
+    for idx, offset in enumerate(offsets):
+        end = offsets[idx + 1] if idx + 1 < len(offsets) else len(text)
+        end_word = start_words[idx + 1] if idx + 1 < len(offsets) else words_seen
+        chapters.append({
+            "chapter_index": idx,
+            "title": by_offset[offset],
+            "start_char": offset,
+            "end_char": end,
+            "start_word": start_words[idx],
+            "word_count": end_word - start_words[idx],
+        })
+    return chapters
+
+
+def detect_chapters(
+    text: str,
+    *,
+    headings: Optional[list[dict]] = None,
+    pdf_outline: Optional[list[dict]] = None,
+    page_word_starts: Optional[list[int]] = None,
+    plain_text: bool = True,
+) -> list[dict]:
+    """
+    Chapters of an extracted manuscript (see build_chapters), or [] if no structure
+    is found. *headings* come from DOCX, *pdf_outline* ({title, page}) with
+    *page_word_starts* from PDF; *plain_text* selects the stricter heading-line rule.
+    """
+    sources = []
+    if headings:
+        sources.append(("docx headings", lambda: _from_docx_headings(text, headings)))
+    if pdf_outline and page_word_starts:
+        sources.append(("pdf outline", lambda: _from_pdf_outline(text, pdf_outline, page_word_starts)))
+    sources.append(("heading lines", lambda: heading_lines(text, blank_line_before=plain_text)))
+
+    for name, find in sources:
+        chapters = build_chapters(text, find())
+        if chapters:
+            logger.info("[chapters] %d chapters from %s", len(chapters), name)
+            return chapters
+    return []
@@ -0,0 +1,206 @@
+"""
+DB Writer — one thread that performs the queued SQLite writes of the application.
+
+SQLite allows a single writer at a time; background stages (analysis checkpoints,
+chunk cache, chunk analyses, search-query log, reference images) that each commit
+through their own session queue up on the file lock and pay one fsync per commit.
+Instead they submit write jobs here:
+
+  - A job is a callable fn(session) that adds / updates rows and does NOT commit.
+  - The writer thread takes every job queued so far (up to DB_WRITER_MAX_BATCH,
+    optionally waiting DB_WRITER_LINGER_MS for more to arrive) and runs them in order
+    in one session, flushing after each, with one commit for the whole batch. Jobs
+    submitted while a batch is being written form the next one (group commit).
+  - submit() returns a Future resolved with the job's return value once its batch is
+    committed; write() waits for it. barrier() / flush() wait until everything
+    submitted before them is committed.
+  - If a batch fails, it is rolled back and its jobs are replayed one transaction
+    each, so a bad job fails only its own Future.
+
+Jobs run on the writer thread: they must return plain values (ids, counts), not ORM
+objects bound to the writer's session, and must not wait on the writer themselves.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Most jobs merged into one transaction
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", "200"))
+# How long the writer waits for more jobs before committing a partial batch; with
+# WAL + synchronous=NORMAL commits are cheap, so by default it does not wait
+DB_WRITER_LINGER_MS = float(os.getenv("DB_WRITER_LINGER_MS", "0"))
+
+WriteJob = Callable[[Session], Any]
+
+_STOP = object()
+
+
+def _barrier_job(db: Session) -> None:
+    return None
+
+
+class DbWriter:
+    """Single-writer queue: merges submitted write jobs into few large transactions."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        max_batch: int = DB_WRITER_MAX_BATCH,
+        linger_ms: float = DB_WRITER_LINGER_MS,
+    ):
+        self._session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.linger = max(0.0, linger_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.commits = 0
+        self.jobs_written = 0
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # ----- public API -----
+
+    @property
+    def session_factory(self) -> Callable[[], Session]:
+        """Sessions on the writer's database, for reads that must see its commits."""
+        return self._session_factory
+
+    def submit(self, fn: WriteJob) -> Future:
+        """Queue a write job; the Future resolves with its result once committed."""
+        future: Future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("DbWriter is closed")
+            self._queue.put((fn, future))
+        return future
+
+    def write(self, fn: WriteJob, timeout: Optional[float] = None) -> Any:
+        """Submit a job and wait for its commit; returns its result or raises its error."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("write() called from a write job would deadlock")
+        return self.submit(fn).result(timeout)
+
+    def barrier(self) -> Future:
+        """A Future that resolves once every job submitted before it is committed (or failed)."""
+        return self.submit(_barrier_job)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every job submitted so far is committed (or failed)."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("flush() called from a write job would deadlock")
+        self.barrier().result(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued, then stop the writer thread."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ----- writer thread -----
+
+    def _next_batch(self) -> tuple[list[tuple[WriteJob, Future]], bool]:
+        """Block for the first job, then collect more until max_batch or the linger expires."""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: list[tuple[WriteJob, Future]]) -> None:
+        live = [(fn, f) for fn, f in batch if f.set_running_or_notify_cancel()]
+        if not live:
+            return
+        db = self._session_factory()
+        try:
+            try:
+                results = []
+                for fn, _ in live:
+                    results.append(fn(db))
+                    db.flush()  # later jobs of the batch see these rows (sessions don't autoflush)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(live) == 1:
+                    live[0][1].set_exception(e)
+                    return
+                logger.warning("[db_writer] batch of %d jobs failed (%s); replaying one by one", len(live), e)
+                for fn, future in live:
+                    self._write_one(db, fn, future)
+                return
+            self.commits += 1
+            self.jobs_written += len(live)
+            for (_, future), result in zip(live, results):
+                future.set_result(result)
+        finally:
+            db.close()
+
+    def _write_one(self, db: Session, fn: WriteJob, future: Future) -> None:
+        try:
+            result = fn(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            future.set_exception(e)
+            return
+        self.commits += 1
+        self.jobs_written += 1
+        future.set_result(result)
+
+
+_writers: dict[Any, DbWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_db_writer(bind: Optional[Any] = None) -> DbWriter:
+    """
+    The process-wide writer for *bind* — pass db.get_bind() of the caller's session;
+    default the application engine. Started on first use.
+    """
+    bind = engine if bind is None else bind
+    with _writers_lock:
+        writer = _writers.get(bind)
+        if writer is None:
+            factory = SessionLocal if bind is engine else sessionmaker(autocommit=False, autoflush=False, bind=bind)
+            writer = _writers[bind] = DbWriter(factory)
+        return writer
+
+
+def shutdown_db_writer() -> None:
+    """Write the queued jobs and stop the writer threads (application shutdown)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,324 @@
+"""
+Entity Merger — deterministic alias resolution for batch-extracted characters/locations.
+
+Batch analysis returns the same entity many times, often under variant names
+("Holmes", "Sherlock Holmes", "Mr. Holmes"). Before any consolidation tokens are
+spent, names are normalised (case, punctuation, honorifics), grouped by token-set
+equality, near-identical spelling and unambiguous token-subset containment, and a
+merge is vetoed when the two names are regularly listed side by side in the same
+chunk (then they are most likely two different people, e.g. "Mr. and Mrs. Holmes").
+Every alias group is folded into one entry under its most complete name.
+"""
+import difflib
+import json
+import logging
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Titles / articles ignored when comparing names (English + Russian manuscripts)
+HONORIFICS = frozenset({
+    "mr", "mrs", "ms", "miss", "mister", "madam", "madame", "dr", "doctor", "prof", "professor",
+    "sir", "lady", "lord", "dame", "captain", "capt", "colonel", "general", "sergeant",
+    "inspector", "detective", "father", "uncle", "aunt", "king", "queen", "prince", "princess",
+    "saint", "st", "the",
+    "господин", "госпожа", "мистер", "миссис", "мисс", "доктор", "профессор", "капитан",
+    "полковник", "генерал", "сэр", "леди", "лорд", "дядя", "тётя", "тетя", "отец", "князь",
+    "княгиня", "граф", "графиня", "царь", "король", "королева",
+})
+# Gendered titles: names whose titles disagree ("Mr. Holmes" / "Mrs. Holmes") are never merged
+_MALE_TITLES = frozenset({
+    "mr", "mister", "sir", "lord", "king", "prince", "father", "uncle",
+    "господин", "мистер", "сэр", "лорд", "дядя", "отец", "князь", "граф", "царь", "король",
+})
+_FEMALE_TITLES = frozenset({
+    "mrs", "ms", "miss", "madam", "madame", "lady", "dame", "queen", "princess", "aunt",
+    "госпожа", "миссис", "мисс", "леди", "тётя", "тетя", "княгиня", "графиня", "королева",
+})
+# Whole-name similarity (difflib ratio) at which two names count as spelling variants
+SPELLING_SIMILARITY = 0.9
+# Two names listed together in more than this share of the chunks of the rarer one
+# are treated as different entities and never merged by containment / spelling.
+COOCCURRENCE_MAX = 0.3
+# Cap on a description combined from several extractions of the same entity
+MAX_MERGED_DESCRIPTION_CHARS = 600
+
+CHARACTER_TEXT_FIELDS = ("physical_description", "personality")
+LOCATION_TEXT_FIELDS = ("visual_description", "atmosphere")
+
+_NON_WORD_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def name_tokens(name: str) -> tuple[str, ...]:
+    """Normalised name tokens without honorifics ("Mr. Sherlock Holmes" → ("sherlock", "holmes"))."""
+    text = unicodedata.normalize("NFKC", name or "").casefold().replace("ё", "е")
+    tokens = _NON_WORD_RE.sub(" ", text).replace("_", " ").split()
+    stripped = [t for t in tokens if t not in HONORIFICS]
+    return tuple(stripped or tokens)
+
+
+def _title_gender(name: str) -> Optional[str]:
+    """"m" / "f" from a gendered title in *name*, None when there is none (or both)."""
+    raw = set(_NON_WORD_RE.sub(" ", unicodedata.normalize("NFKC", name or "").casefold()).split())
+    male, female = bool(raw & _MALE_TITLES), bool(raw & _FEMALE_TITLES)
+    if male == female:
+        return None
+    return "m" if male else "f"
+
+
+def _combine_text(a: str, b: str) -> str:
+    if not b or b in a:
+        return a
+    if not a or a in b:
+        return b
+    return f"{a}; {b}"[:MAX_MERGED_DESCRIPTION_CHARS]
+
+
+def fold_entities(entities: Iterable[dict], text_fields: tuple[str, ...]) -> list[dict]:
+    """
+    Merge entries with the same name (case-insensitive) without an LLM call.
+    Distinct descriptions are joined, emotions unioned and "mentions" summed.
+    Order of first appearance is kept.
+    """
+    merged: dict[str, dict] = {}
+    for ent in entities:
+        if not isinstance(ent, dict):
+            continue
+        name = (ent.get("name") or "").strip()
+        if not name:
+            continue
+        key = name.lower()
+        mentions = int(ent.get("mentions") or 1)
+        cur = merged.get(key)
+        if cur is None:
+            merged[key] = dict(ent, name=name, mentions=mentions)
+            continue
+        cur["mentions"] += mentions
+        for field in text_fields:
+            cur[field] = _combine_text(cur.get(field) or "", ent.get(field) or "")
+        if ent.get("emotions"):
+            cur["emotions"] = list(dict.fromkeys((cur.get("emotions") or []) + list(ent["emotions"])))
+    return list(merged.values())
+
+
+class _UnionFind:
+    def __init__(self, items: Iterable[str]):
+        self.parent = {i: i for i in items}
+
+    def find(self, x: str) -> str:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: str, b: str) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def _cooccur(a: set[int], b: set[int]) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) > COOCCURRENCE_MAX
+
+
+def resolve_aliases(
+    mentions: dict[str, int],
+    chunks_by_name: Optional[dict[str, set[int]]] = None,
+) -> dict[str, str]:
+    """
+    Map every name in *mentions* to its canonical alias-group name.
+
+    *mentions* — name → how often it was extracted / listed.
+    *chunks_by_name* — name → chunk indexes whose *_present list contains it (co-occurrence veto).
+    The canonical name is the most complete (most tokens) and then most mentioned one.
+    """
+    chunks_by_name = chunks_by_name or {}
+    names = [n for n in mentions if n.strip()]
+    tokens = {n: name_tokens(n) for n in names}
+    uf = _UnionFind(names)
+
+    # 1. Identical normalised token sets ("Mr. Holmes" / "holmes", "Holmes, Sherlock" / "Sherlock Holmes").
+    # Keys carry the title gender; untitled names join a token set only if it has a single gender.
+    genders = {n: _title_gender(n) for n in names}
+    genders_by_set: dict[frozenset, set[str]] = {}
+    for n in names:
+        if genders[n]:
+            genders_by_set.setdefault(frozenset(tokens[n]), set()).add(genders[n])
+    by_key: dict[tuple[frozenset, Optional[str]], list[str]] = {}
+    for n in names:
+        token_set = frozenset(tokens[n])
+        gender = genders[n]
+        if gender is None and len(genders_by_set.get(token_set, ())) == 1:
+            gender = next(iter(genders_by_set[token_set]))
+        by_key.setdefault((token_set, gender), []).append(n)
+    for group in by_key.values():
+        for other in group[1:]:
+            uf.union(group[0], other)
+    keys = list(by_key)
+
+    def _compatible(a: tuple, b: tuple) -> bool:
+        return a[1] is None or b[1] is None or a[1] == b[1]
+
+    group_chunks = {
+        k: set().union(*(chunks_by_name.get(n, set()) for n in by_key[k])) for k in keys
+    }
+
+    # 2. Spelling variants with the same number of tokens ("Sherlok Holmes")
+    joined = {k: " ".join(sorted(k[0])) for k in keys}
+    for i, a in enumerate(keys):
+        for b in keys[i + 1:]:
+            if len(a[0]) != len(b[0]) or abs(len(joined[a]) - len(joined[b])) > 2 or len(joined[a]) < 5:
+                continue
+            if a[0] == b[0] or not _compatible(a, b):
+                continue
+            matcher = difflib.SequenceMatcher(None, joined[a], joined[b])
+            if matcher.quick_ratio() < SPELLING_SIMILARITY or matcher.ratio() < SPELLING_SIMILARITY:
+                continue
+            if not _cooccur(group_chunks[a], group_chunks[b]):
+                uf.union(by_key[a][0], by_key[b][0])
+
+    # 3. Unambiguous containment ("Holmes" ⊂ "Sherlock Holmes", but not if "Mycroft Holmes" exists too)
+    for short in keys:
+        containing = {
+            uf.find(by_key[k][0]) for k in keys if short[0] < k[0] and _compatible(short, k)
+        }
+        if len(containing) != 1:
+            continue
+        target = containing.pop()
+        if uf.find(by_key[short][0]) == target:
+            continue
+        target_chunks = set().union(*(group_chunks[k] for k in keys if uf.find(by_key[k][0]) == target))
+        if not _cooccur(group_chunks[short], target_chunks):
+            uf.union(target, by_key[short][0])
+
+    components: dict[str, list[str]] = {}
+    for n in names:
+        components.setdefault(uf.find(n), []).append(n)
+    alias_map: dict[str, str] = {}
+    for members in components.values():
+        canonical = max(members, key=lambda n: (len(tokens[n]), mentions.get(n, 0), -len(n)))
+        for n in members:
+            alias_map[n] = canonical
+    return alias_map
+
+
+def _alias_groups(alias_map: dict[str, str]) -> dict[str, list[str]]:
+    """canonical → sorted aliases, for groups that merged more than one name."""
+    groups: dict[str, list[str]] = {}
+    for name, canonical in alias_map.items():
+        if name != canonical:
+            groups.setdefault(canonical, []).append(name)
+    return {c: sorted(names) for c, names in groups.items()}
+
+
+def _payload_chars(batch_results: list[dict]) -> int:
+    """Size of the entity JSON the consolidation stage would be sent (chars, ~4 per token)."""
+    return len(json.dumps(
+        [{"characters": b.get("characters", []), "locations": b.get("locations", [])} for b in batch_results],
+        ensure_ascii=False,
+    ))
+
+
+def _resolve_kind(
+    batch_results: list[dict],
+    chunk_analyses: list[dict],
+    kind: str,
+    present_key: str,
+) -> dict[str, str]:
+    mentions: dict[str, int] = {}
+    chunks_by_name: dict[str, set[int]] = {}
+    for b in batch_results:
+        for ent in b.get(kind, []):
+            if isinstance(ent, dict) and (ent.get("name") or "").strip():
+                name = ent["name"].strip()
+                mentions[name] = mentions.get(name, 0) + int(ent.get("mentions") or 1)
+    for ca in chunk_analyses:
+        for name in ca.get(present_key) or []:
+            if isinstance(name, str) and name.strip():
+                name = name.strip()
+                mentions[name] = mentions.get(name, 0) + 1
+                chunks_by_name.setdefault(name, set()).add(ca.get("chunk_index"))
+    return resolve_aliases(mentions, chunks_by_name)
+
+
+def premerge_entities(
+    batch_results: list[dict],
+    chunk_analyses: list[dict],
+) -> tuple[list[dict], dict]:
+    """
+    Fold duplicate characters/locations across all batch results before consolidation.
+
+    Each alias group keeps one entry (canonical name, combined descriptions, summed
+    mentions) in the batch where it first appears; later copies are dropped.
+    *chunk_analyses* characters_present / locations_present are rewritten in place to
+    canonical names (deduplicated), so chunk links match the merged entities.
+
+    Returns (merged batch results, report) where report has per-kind entry counts,
+    the alias groups found and the consolidation prompt size (chars) before / after.
+    """
+    chars_before = _payload_chars(batch_results)
+    alias_maps = {
+        "characters": _resolve_kind(batch_results, chunk_analyses, "characters", "characters_present"),
+        "locations": _resolve_kind(batch_results, chunk_analyses, "locations", "locations_present"),
+    }
+    fields = {"characters": CHARACTER_TEXT_FIELDS, "locations": LOCATION_TEXT_FIELDS}
+
+    folded: dict[str, dict[str, dict]] = {}
+    first_batch: dict[str, dict[str, int]] = {}
+    entries_before: dict[str, int] = {}
+    for kind, alias_map in alias_maps.items():
+        renamed: list[tuple[int, dict]] = []
+        for n, b in enumerate(batch_results):
+            for ent in b.get(kind, []):
+                if not isinstance(ent, dict) or not (ent.get("name") or "").strip():
+                    continue
+                name = ent["name"].strip()
+                renamed.append((n, dict(ent, name=alias_map.get(name, name))))
+        entries_before[kind] = len(renamed)
+        first_batch[kind] = {}
+        for n, ent in renamed:
+            first_batch[kind].setdefault(ent["name"].lower(), n)
+        folded[kind] = {
+            e["name"].lower(): e for e in fold_entities((e for _, e in renamed), fields[kind])
+        }
+
+    merged_results: list[dict] = []
+    for n, b in enumerate(batch_results):
+        out = dict(b)
+        for kind in ("characters", "locations"):
+            out[kind] = [e for key, e in folded[kind].items() if first_batch[kind][key] == n]
+        merged_results.append(out)
+
+    for ca in chunk_analyses:
+        for kind, present_key in (("characters", "characters_present"), ("locations", "locations_present")):
+            present = ca.get(present_key)
+            if present:
+                alias_map = alias_maps[kind]
+                ca[present_key] = list(dict.fromkeys(
+                    alias_map.get(p.strip(), p.strip()) for p in present if isinstance(p, str) and p.strip()
+                ))
+
+    chars_after = _payload_chars(merged_results)
+    report = {
+        "characters_before": entries_before["characters"],
+        "characters_after": len(folded["characters"]),
+        "locations_before": entries_before["locations"],
+        "locations_after": len(folded["locations"]),
+        "alias_groups": {kind: _alias_groups(alias_map) for kind, alias_map in alias_maps.items()},
+        "prompt_chars_before": chars_before,
+        "prompt_chars_after": chars_after,
+        "prompt_chars_saved": chars_before - chars_after,
+    }
+    logger.info(
+        "[entity_merge] characters %d -> %d, locations %d -> %d entries; "
+        "consolidation input %d -> %d chars (saved %d, %.0f%%)",
+        report["characters_before"], report["characters_after"],
+        report["locations_before"], report["locations_after"],
+        chars_before, chars_after, chars_before - chars_after,
+        100.0 * (chars_before - chars_after) / chars_before if chars_before else 0.0,
+    )
+    return merged_results, report
@@ -0,0 +1,196 @@
+"""
+Extraction Pool — PDF / DOCX text extraction in isolated worker processes.
+
+PyPDF2 and python-docx are pure-Python parsers: a large or malformed document can
+hold the CPU (and the GIL) for minutes or allocate until the host swaps. Each
+extraction therefore runs in its own spawned process:
+
+  - At most EXTRACTION_WORKERS extractions run at once; further uploads wait for a slot.
+  - PDFs are extracted page-parallel: contiguous page ranges in up to
+    PDF_PAGE_PROCESSES processes, returning per-page text so real page boundaries
+    survive into chunking.
+  - A job that exceeds EXTRACTION_TIMEOUT_SECONDS is killed.
+  - The worker's address space is capped at EXTRACTION_MEMORY_MB (RLIMIT_AS, where
+    the platform has it), so a runaway parse fails with MemoryError instead of
+    taking the API down.
+
+A process per job (rather than a long-lived pool) is what makes the timeout
+enforceable: a stuck worker is terminated without affecting other uploads.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from app.services.upload_service import (
+    UploadError,
+    extract_docx_structure,
+    extract_pdf_page_texts,
+    extract_text_from_file,
+    pdf_structure,
+)
+
+logger = logging.getLogger(__name__)
+
+# Extractions running at once (each in its own process)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# Wall-clock limit per document
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "120"))
+# Address-space limit per worker process; 0 disables
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", "1536"))
+# PDFs are split into page ranges extracted by up to this many processes each
+PDF_PAGE_PROCESSES = int(os.getenv("PDF_PAGE_PROCESSES", "0")) or min(4, os.cpu_count() or 1)
+# Smallest page range worth its own process
+PDF_MIN_PAGES_PER_PROCESS = 25
+
+# spawn: forking a process that runs uvicorn / DB threads is not safe
+_ctx = multiprocessing.get_context("spawn")
+_slots = threading.BoundedSemaphore(max(1, EXTRACTION_WORKERS))
+
+
+def _limit_memory(memory_mb: int) -> None:
+    if resource is None or memory_mb <= 0:
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker(conn, fn: Callable, args: tuple, memory_mb: int) -> None:
+    """Process entry point: send ("ok", fn(*args)) or ("error", message)."""
+    try:
+        _limit_memory(memory_mb)
+        conn.send(("ok", fn(*args)))
+    except UploadError as e:
+        conn.send(("error", str(e)))
+    except MemoryError:
+        conn.send(("error", "Document is too large or complex to extract."))
+    except Exception as e:
+        conn.send(("error", f"Unable to read document: {str(e)}"))
+    finally:
+        conn.close()
+
+
+def _run_jobs(jobs: list[tuple[Callable, tuple]], timeout: float, memory_mb: int, label: str) -> list[Any]:
+    """
+    Run each (fn, args) in its own process, all at once, and return the results in
+    order. Every process is killed when the shared *timeout* passes or any job fails.
+    """
+    deadline = time.monotonic() + timeout
+    started = []
+    try:
+        for fn, args in jobs:
+            receiver, sender = _ctx.Pipe(duplex=False)
+            proc = _ctx.Process(target=_worker, args=(sender, fn, args, memory_mb), daemon=True)
+            proc.start()
+            sender.close()  # so recv() sees EOF if the worker dies
+            started.append((proc, receiver))
+
+        results = []
+        for proc, receiver in started:
+            if not receiver.poll(max(0.0, deadline - time.monotonic())):
+                logger.warning("[extraction] %s timed out after %.0fs, killing workers", label, timeout)
+                raise UploadError(
+                    "Document took too long to process. Please upload a simpler file or convert it to .txt."
+                )
+            try:
+                status, payload = receiver.recv()
+            except EOFError:
+                proc.join(timeout=1)
+                logger.error("[extraction] worker for %s died (exit code %s)", label, proc.exitcode)
+                raise UploadError("Document could not be processed.")
+            if status != "ok":
+                raise UploadError(payload)
+            results.append(payload)
+        return results
+    finally:
+        for proc, receiver in started:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            receiver.close()
+
+
+def extract_text_isolated(
+    file_path: str,
+    extension: str,
+    *,
+    timeout: Optional[float] = None,
+    memory_mb: Optional[int] = None,
+) -> str:
+    """
+    extract_text_from_file() in a separate process with a timeout and memory cap.
+    Blocks the calling thread (not the event loop — call it via a threadpool).
+
+    Raises:
+        UploadError: On extraction errors, timeout, memory limit or worker crash
+    """
+    timeout = EXTRACTION_TIMEOUT_SECONDS if timeout is None else timeout
+    memory_mb = EXTRACTION_MEMORY_MB if memory_mb is None else memory_mb
+    with _slots:
+        (text,) = _run_jobs([(extract_text_from_file, (file_path, extension))], timeout, memory_mb, file_path)
+    return text
+
+
+def extract_docx_isolated(
+    file_path: str,
+    *,
+    timeout: Optional[float] = None,
+    memory_mb: Optional[int] = None,
+) -> tuple[str, list[dict]]:
+    """upload_service.extract_docx_structure() — (text, headings) — in a limited process."""
+    timeout = EXTRACTION_TIMEOUT_SECONDS if timeout is None else timeout
+    memory_mb = EXTRACTION_MEMORY_MB if memory_mb is None else memory_mb
+    with _slots:
+        (result,) = _run_jobs([(extract_docx_structure, (file_path,))], timeout, memory_mb, file_path)
+    return result
+
+
+def _page_ranges(page_count: int, processes: int, min_pages: int) -> list[tuple[int, int]]:
+    """Split pages [0, page_count) into up to *processes* contiguous ranges of >= *min_pages*."""
+    parts = max(1, min(processes, page_count // max(1, min_pages)))
+    size = -(-page_count // parts)  # ceil division
+    return [(first, min(first + size, page_count)) for first in range(0, page_count, size)]
+
+
+def extract_pdf_pages_isolated(
+    file_path: str,
+    *,
+    timeout: Optional[float] = None,
+    memory_mb: Optional[int] = None,
+) -> tuple[list[str], list[dict]]:
+    """
+    Text of every PDF page (see upload_service.extract_pdf_page_texts), extracted
+    by up to PDF_PAGE_PROCESSES processes working on contiguous page ranges, and
+    the PDF's top-level outline (see upload_service.pdf_structure). The timeout
+    covers the whole document; the memory cap applies per process.
+
+    Raises:
+        UploadError: On extraction errors, timeout, memory limit or worker crash
+    """
+    timeout = EXTRACTION_TIMEOUT_SECONDS if timeout is None else timeout
+    memory_mb = EXTRACTION_MEMORY_MB if memory_mb is None else memory_mb
+    start = time.monotonic()
+    with _slots:
+        ((page_count, outline),) = _run_jobs([(pdf_structure, (file_path,))], timeout, memory_mb, file_path)
+        if page_count == 0:
+            raise UploadError("PDF file has no pages.")
+        ranges = _page_ranges(page_count, PDF_PAGE_PROCESSES, PDF_MIN_PAGES_PER_PROCESS)
+        parts = _run_jobs(
+            [(extract_pdf_page_texts, (file_path, first, last)) for first, last in ranges],
+            max(0.0, timeout - (time.monotonic() - start)), memory_mb, file_path,
+        )
+    logger.info(
+        "[extraction] %s: %d pages in %d processes, %.2fs",
+        file_path, page_count, len(ranges), time.monotonic() - start,
+    )
+    return [page for part in parts for page in part], outline
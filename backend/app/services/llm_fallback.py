@@ -0,0 +1,31 @@
+"""
+LLM Fallback — marks results built locally because an LLM call failed or its
+response could not be parsed.
+
+The analysis services degrade gracefully instead of raising: an empty consolidation,
+default ontologies and visual tokens, heuristic scenes. Such a result is good enough
+to finish the run, but it must not be checkpointed as a finished stage, or a resumed
+run would reload the failure and never retry the call. as_fallback() wraps it in a
+list / dict subclass that run_full_analysis recognises with is_fallback(); it
+behaves, and serialises, exactly like the plain value.
+"""
+from typing import Any
+
+
+class FallbackList(list):
+    """A list result produced by a fallback path."""
+
+
+class FallbackDict(dict):
+    """A dict result produced by a fallback path."""
+
+
+def as_fallback(result: Any) -> Any:
+    """Mark *result* (a list or dict) as a fallback."""
+    if isinstance(result, dict):
+        return FallbackDict(result)
+    return FallbackList(result)
+
+
+def is_fallback(result: Any) -> bool:
+    return isinstance(result, (FallbackList, FallbackDict))
@@ -0,0 +1,185 @@
+"""
+LLM Limiter — process-wide adaptive rate limiting for OpenAI chat completions.
+
+Every chat.completions.create call of the analysis services goes through
+chat_completion(), which shares one AdaptiveLimiter across all books and threads:
+
+  - Concurrency is adjusted by AIMD: each success raises the limit by 1/limit (about
+    +1 per round of calls), each 429 / 5xx halves it. Throughput settles just below
+    the quota instead of the whole batch pool failing on the first 429.
+  - Retry-After (or retry-after-ms) from a 429 pauses all new calls until it passes;
+    without it, retries back off exponentially with jitter.
+  - Tokens per minute are tracked over a sliding 60s window against
+    OPENAI_TPM_BUDGET. A call waits when its estimate (prompt chars / 4 + max_tokens)
+    would exceed the budget; the estimate is replaced by the real usage afterwards.
+
+The OpenAI clients are created with max_retries=0, so the SDK's own retries don't
+multiply the load behind the limiter's back.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Concurrency the limiter starts with and may grow to (calls in flight, all books)
+LLM_INITIAL_CONCURRENCY = int(os.getenv("OPENAI_INITIAL_CONCURRENCY", "4"))
+LLM_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+# Tokens-per-minute budget (prompt + completion); 0 disables TPM pacing
+LLM_TPM_BUDGET = int(os.getenv("OPENAI_TPM_BUDGET", "0"))
+# Attempts per call for rate-limit / server / connection errors
+LLM_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "6"))
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+_TPM_WINDOW_SECONDS = 60.0
+_CHARS_PER_TOKEN = 4
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit + Retry-After pause + sliding-window token budget."""
+
+    def __init__(
+        self,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        tpm_budget: int = LLM_TPM_BUDGET,
+        clock=time.monotonic,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self.tpm_budget = max(0, tpm_budget)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._clock = clock
+        self._cond = threading.Condition()
+        # [timestamp, tokens] per call in the last minute; entries are mutated on release
+        self._window: deque[list] = deque()
+
+    def _tokens_in_window(self, now: float) -> int:
+        while self._window and now - self._window[0][0] >= _TPM_WINDOW_SECONDS:
+            self._window.popleft()
+        return sum(entry[1] for entry in self._window)
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """0 if a call of *tokens* may start now, else how long to wait (upper bound)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return 1.0  # woken by release()
+        if self.tpm_budget:
+            used = self._tokens_in_window(now)
+            if self._window and used + tokens > self.tpm_budget:
+                return max(0.05, self._window[0][0] + _TPM_WINDOW_SECONDS - now)
+        return 0.0
+
+    def acquire(self, tokens: int) -> list:
+        """Block until a call estimated at *tokens* may start; returns its window entry."""
+        with self._cond:
+            while True:
+                now = self._clock()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    break
+                self._cond.wait(timeout=wait)
+            self.in_flight += 1
+            entry = [now, tokens]
+            self._window.append(entry)
+            return entry
+
+    def release(
+        self,
+        entry: list,
+        *,
+        tokens: Optional[int] = None,
+        throttled: bool = False,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Finish a call: record actual *tokens*, and grow (success) or halve (*throttled*) the limit."""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if tokens is not None:
+                entry[1] = tokens
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, self._clock() + retry_after)
+                logger.warning(
+                    "[llm_limiter] throttled: concurrency limit -> %d%s",
+                    int(self.limit), f", pausing {retry_after:.1f}s" if retry_after else "",
+                )
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+limiter = AdaptiveLimiter()
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form — fall back to exponential backoff
+    return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.RateLimitError):
+        # An exhausted quota / billing limit won't recover by waiting
+        return getattr(exc, "code", None) != "insufficient_quota"
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500 or exc.status_code == 408
+    return isinstance(exc, openai.APIConnectionError)  # includes APITimeoutError
+
+
+def _estimate_tokens(kwargs: dict) -> int:
+    chars = sum(len(str(m.get("content") or "")) for m in kwargs.get("messages", []))
+    return chars // _CHARS_PER_TOKEN + int(kwargs.get("max_tokens") or 0)
+
+
+def chat_completion(client: Any, **kwargs: Any) -> Any:
+    """
+    client.chat.completions.create(**kwargs) through the shared limiter, retrying
+    429 / 5xx / connection errors up to LLM_MAX_ATTEMPTS times. Other errors, and the
+    last retryable one, are raised unchanged.
+    """
+    estimate = _estimate_tokens(kwargs)
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        entry = limiter.acquire(estimate)
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            retryable = _is_retryable(exc)
+            retry_after = _retry_after_seconds(exc) if retryable else None
+            limiter.release(entry, tokens=0 if not retryable else None,
+                            throttled=retryable, retry_after=retry_after)
+            if not retryable or attempt == LLM_MAX_ATTEMPTS:
+                raise
+            # With Retry-After the limiter pauses every caller and acquire() does the waiting
+            delay = retry_after or min(
+                BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)
+            ) * random.uniform(0.5, 1.0)
+            logger.warning(
+                "[llm_limiter] %s (attempt %d/%d), retrying in %.1fs",
+                type(exc).__name__, attempt, LLM_MAX_ATTEMPTS, delay,
+            )
+            if not retry_after:
+                time.sleep(delay)
+            continue
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        limiter.release(entry, tokens=total if isinstance(total, int) else None)
+        return response
+    raise RuntimeError("unreachable")  # pragma: no cover
@@ -12,6 +12,9 @@ from typing import Optional
 
 from openai import OpenAI
 
+from app.services.llm_fallback import as_fallback
+from app.services.llm_limiter import chat_completion
+
 from app.services.ontology_constants import ENTITY_CLASSES, NON_HUMAN_CLASSES
 
 logger = logging.getLogger(__name__)
@@ -25,7 +28,7 @@ def _get_client() -> OpenAI:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY environment variable is not set")
-        _client = OpenAI(api_key=api_key)
+        _client = OpenAI(api_key=api_key, max_retries=0)  # retried by llm_limiter.chat_completion
     return _client
 
 
@@ -84,7 +87,8 @@ def classify_entities_batch(entities: list[dict]) -> list[dict]:
     logger.info("[ontology] classify_entities_batch: %d entities", len(entities))
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model=MODEL,
             messages=[
                 {"role": "system", "content": ONTOLOGY_PROMPT},
@@ -101,7 +105,7 @@ def classify_entities_batch(entities: list[dict]) -> list[dict]:
         )
     except Exception as e:
         logger.error("[ontology] LLM call failed: %s", e)
-        return _build_fallback_results(entities)
+        return as_fallback(_build_fallback_results(entities))
 
     # Strip markdown code fences if present
     if raw.startswith("```"):
@@ -114,7 +118,7 @@ def classify_entities_batch(entities: list[dict]) -> list[dict]:
             raise ValueError("Expected JSON array")
     except (json.JSONDecodeError, ValueError) as e:
         logger.error("[ontology] Failed to parse response: %s | raw: %s", e, raw[:500])
-        return _build_fallback_results(entities)
+        return as_fallback(_build_fallback_results(entities))
 
     # Validate and normalise each result
     validated = []
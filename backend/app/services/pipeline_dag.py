@@ -0,0 +1,106 @@
+"""
+Pipeline DAG — run analysis stages as a dependency graph.
+
+Each Stage lists the stages whose outputs it needs and starts as soon as all of them
+have finished, so independent stages (e.g. scene windowing and entity consolidation)
+overlap instead of running back to back. Stages run on a thread pool, since the LLM
+clients are synchronous; stages marked inline run on the calling thread instead
+(callbacks that touch the caller's DB session). Start offset and duration of every
+stage are recorded.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    name: str
+    # Called with {stage name: output} of all finished stages; returns this stage's output
+    fn: Callable[[dict[str, Any]], Any]
+    deps: tuple[str, ...] = ()
+    inline: bool = False
+
+
+def _validate(stages: list[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names: {names}")
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"Stage {s.name!r} depends on unknown stages {missing}")
+    # Kahn's algorithm: every stage must become ready eventually
+    done: set[str] = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(d in done for d in s.deps)]
+        if not ready:
+            raise ValueError(f"Dependency cycle among stages {[s.name for s in remaining]}")
+        done.update(s.name for s in ready)
+        remaining = [s for s in remaining if s.name not in done]
+
+
+def run_stages(stages: list[Stage], max_workers: int = 4) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Execute *stages* respecting their deps, up to *max_workers* pool stages at a time.
+
+    Returns (outputs, timings): outputs maps stage name → return value, timings maps
+    stage name → {"start": s, "end": s, "seconds": s} relative to the pipeline start.
+    The first stage exception cancels stages not yet started and is re-raised.
+    """
+    _validate(stages)
+    outputs: dict[str, Any] = {}
+    timings: dict[str, dict] = {}
+    pending = list(stages)
+    running: dict[Future, Stage] = {}
+    t0 = time.perf_counter()
+
+    def _timed(stage: Stage, inputs: dict[str, Any]) -> tuple[Any, float, float]:
+        start = time.perf_counter()
+        out = stage.fn(inputs)
+        return out, start, time.perf_counter()
+
+    def _finish(stage: Stage, out: Any, start: float, end: float) -> None:
+        outputs[stage.name] = out
+        timings[stage.name] = {
+            "start": round(start - t0, 3),
+            "end": round(end - t0, 3),
+            "seconds": round(end - start, 3),
+        }
+        logger.info(
+            "[pipeline] %s done in %.2fs (started at +%.2fs)", stage.name, end - start, start - t0
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        try:
+            while pending or running:
+                ready = [s for s in pending if all(d in outputs for d in s.deps)]
+                pending = [s for s in pending if s not in ready]
+                # Hand pool stages off first so they overlap with any inline work
+                for stage in ready:
+                    if not stage.inline:
+                        running[pool.submit(_timed, stage, dict(outputs))] = stage
+                inline = [s for s in ready if s.inline]
+                for stage in inline:
+                    _finish(stage, *_timed(stage, dict(outputs)))
+                if inline:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _finish(running.pop(future), *future.result())
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+    logger.info(
+        "[pipeline] %d stages done in %.2fs wall, %.2fs summed",
+        len(stages), time.perf_counter() - t0, sum(t["seconds"] for t in timings.values()),
+    )
+    return outputs, timings
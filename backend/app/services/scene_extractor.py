@@ -12,6 +12,9 @@ from typing import Optional
 
 from openai import OpenAI
 
+from app.services.llm_fallback import as_fallback
+from app.services.llm_limiter import chat_completion
+
 logger = logging.getLogger(__name__)
 
 _client: Optional[OpenAI] = None
@@ -23,7 +26,7 @@ def _get_client() -> OpenAI:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY environment variable is not set")
-        _client = OpenAI(api_key=api_key)
+        _client = OpenAI(api_key=api_key, max_retries=0)  # retried by llm_limiter.chat_completion
     return _client
 
 
@@ -288,7 +291,8 @@ def extract_scenes_llm(
     )
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model=MODEL,
             messages=[
                 {"role": "system", "content": prompt},
@@ -305,7 +309,7 @@ def extract_scenes_llm(
         )
     except Exception as e:
         logger.error("[scene_extractor] LLM call failed: %s", e)
-        return _build_scene_fallbacks(candidates, scene_count)
+        return as_fallback(_build_scene_fallbacks(candidates, scene_count))
 
     # Strip markdown code fences if present
     if raw.startswith("```"):
@@ -319,7 +323,7 @@ def extract_scenes_llm(
             raise ValueError("Expected scenes list")
     except (json.JSONDecodeError, ValueError) as e:
         logger.error("[scene_extractor] Failed to parse LLM response: %s | raw: %s", e, raw[:500])
-        return _build_scene_fallbacks(candidates, scene_count)
+        return as_fallback(_build_scene_fallbacks(candidates, scene_count))
 
     # Validate and normalise each scene
     validated: list[dict] = []
@@ -12,6 +12,9 @@ from typing import Optional
 
 from openai import OpenAI
 
+from app.services.llm_fallback import as_fallback
+from app.services.llm_limiter import chat_completion
+
 logger = logging.getLogger(__name__)
 
 _client: Optional[OpenAI] = None
@@ -23,7 +26,7 @@ def _get_client() -> OpenAI:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY environment variable is not set")
-        _client = OpenAI(api_key=api_key)
+        _client = OpenAI(api_key=api_key, max_retries=0)  # retried by llm_limiter.chat_completion
     return _client
 
 
@@ -181,7 +184,8 @@ def compose_scenes_batch(
     logger.info("[scene_composer] compose_scenes_batch: %d scenes", len(scenes))
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model=MODEL,
             messages=[
                 {"role": "system", "content": SCENE_TOKEN_PROMPT},
@@ -198,7 +202,7 @@ def compose_scenes_batch(
         )
     except Exception as e:
         logger.error("[scene_composer] LLM call failed: %s", e)
-        return _apply_scene_fallbacks(scenes, character_ontologies, style_category)
+        return as_fallback(_apply_scene_fallbacks(scenes, character_ontologies, style_category))
 
     # Strip markdown code fences
     if raw.startswith("```"):
@@ -211,7 +215,7 @@ def compose_scenes_batch(
             raise ValueError("Expected JSON array")
     except (json.JSONDecodeError, ValueError) as e:
         logger.error("[scene_composer] Failed to parse response: %s | raw: %s", e, raw[:500])
-        return _apply_scene_fallbacks(scenes, character_ontologies, style_category)
+        return as_fallback(_apply_scene_fallbacks(scenes, character_ontologies, style_category))
 
     # Merge results back into scenes
     result_by_id = {r.get("scene_id"): r for r in results if isinstance(r, dict)}
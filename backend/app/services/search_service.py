@@ -1,4 +1,5 @@
 """Reference image search service with multi-provider engine selection and query diversification."""
+import asyncio
 import json as _json
 import logging
 from typing import Literal, Optional
@@ -16,6 +17,7 @@ from app.services.providers import (
     WikimediaProvider,
     DeviantArtProvider,
 )
+from app.services.db_writer import get_db_writer
 from app.services.engine_selector import select_engines
 
 logger = logging.getLogger(__name__)
@@ -375,17 +377,28 @@ def _save_query(
     results_count: int,
     provider: str,
 ) -> None:
+    """Log a query through the DB writer without waiting for it (search_references_for_book flushes)."""
     if db is None:
         return
-    crud.create_search_query(
-        db,
-        book_id=book_id,
-        entity_type=entity_type,
-        entity_name=entity_name,
-        query_text=query_text,
-        results_count=results_count,
-        provider=provider,
-    )
+
+    def _write(w: Session) -> None:
+        crud.create_search_query(
+            w,
+            book_id=book_id,
+            entity_type=entity_type,
+            entity_name=entity_name,
+            query_text=query_text,
+            results_count=results_count,
+            provider=provider,
+            commit=False,
+        )
+
+    get_db_writer(db.get_bind()).submit(_write).add_done_callback(_log_failed_write)
+
+
+def _log_failed_write(future) -> None:
+    if future.exception() is not None:
+        logger.warning("Could not save search query: %s", future.exception())
 
 
 # ---------------------------------------------------------------------------
@@ -806,6 +819,8 @@ async def search_references_for_book(
                 assign_placeholder(db, loc.id, "location")
             loc_results.append({"id": loc.id, "name": loc.name, "is_main": bool(loc.is_main), "images": [], "placeholder_assigned": True})
 
+    if db is not None:
+        await asyncio.wrap_future(get_db_writer(db.get_bind()).barrier())  # queries logged above are committed
     mode = "all" if search_all else "main_only"
     return {
         "book_id": book_id,
@@ -0,0 +1,99 @@
+"""
+Text Store — chunk text served from the book's text file instead of the database.
+
+A chunk is a span of its book's UTF-8 text file (data/texts/*.txt), so when the
+chunker's output is exactly that span only (byte offset, byte length) is stored in
+chunks.text_offset / text_length and chunks.text stays empty. Reads slice a
+memory-mapped view of the file: the OS pages in just the bytes of the chunk, the
+file is mapped once per process (up to MAX_OPEN_TEXTS files), and large TEXT values
+no longer crowd the SQLite page cache. Chunks whose text differs from the source
+span (normalised blank lines, CRLF files) keep their text in the column.
+"""
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Text files kept mapped at once (least recently used are unmapped first)
+MAX_OPEN_TEXTS = int(os.getenv("MAX_OPEN_TEXTS", "32"))
+
+# path -> ((mtime_ns, size), mmap)
+_maps: "OrderedDict[str, tuple[tuple[int, int], mmap.mmap]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _mapped(path: str) -> mmap.mmap:
+    """Mapping of *path* (caller holds _lock); remapped if the file was replaced."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    entry = _maps.get(path)
+    if entry is not None and entry[0] == stamp:
+        _maps.move_to_end(path)
+        return entry[1]
+    if entry is not None:
+        entry[1].close()
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _maps[path] = (stamp, mapped)
+    while len(_maps) > MAX_OPEN_TEXTS:
+        _, (_, oldest) = _maps.popitem(last=False)
+        oldest.close()
+    return mapped
+
+
+def read_span(path: str, offset: int, length: int) -> str:
+    """UTF-8 text of bytes [offset, offset + length) of the file at *path*."""
+    with _lock:
+        data = _mapped(path)[offset:offset + length]
+    return data.decode("utf-8")
+
+
+def close_all() -> None:
+    """Unmap every text file (application shutdown, tests)."""
+    with _lock:
+        for _, mapped in _maps.values():
+            mapped.close()
+        _maps.clear()
+
+
+def read_book_text(path: str) -> tuple[str, bool]:
+    """
+    Text of a book's text file as the chunker sees it (universal newlines), and
+    whether character positions in it map to bytes of the file, i.e. whether chunk
+    spans can be stored as offsets (see attach_byte_spans).
+    """
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8")
+    if "\r" in text:
+        return text.replace("\r\n", "\n").replace("\r", "\n"), False
+    return text, True
+
+
+def attach_byte_spans(text: str, chunks: list[dict]) -> int:
+    """
+    Add text_offset / text_length (UTF-8 bytes of *text*) to each chunk whose
+    "text" is exactly text[start_char:end_char]; returns how many got one.
+    *text* must be the content of the file the offsets will be read from.
+    """
+    matching = [
+        c for c in chunks
+        if "start_char" in c and text[c["start_char"]:c["end_char"]] == c["text"]
+    ]
+    positions = sorted({p for c in matching for p in (c["start_char"], c["end_char"])})
+    if text.isascii():
+        byte_at = {p: p for p in positions}
+    else:
+        # One pass over the text: bytes before each position
+        byte_at = {}
+        prev_char = prev_byte = 0
+        for p in positions:
+            prev_byte += len(text[prev_char:p].encode("utf-8"))
+            prev_char = p
+            byte_at[p] = prev_byte
+    for c in matching:
+        c["text_offset"] = byte_at[c["start_char"]]
+        c["text_length"] = byte_at[c["end_char"]] - c["text_offset"]
+    return len(matching)
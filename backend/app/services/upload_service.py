@@ -1,9 +1,22 @@
 """File upload service for manuscript uploads (.txt, .docx, .pdf)."""
+import codecs
+import hashlib
 import logging
 import os
+import re
+import tempfile
 import time
+import zipfile
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Any, Iterator, Tuple, Optional
+
+try:
+    from charset_normalizer import from_bytes as _detect_charset
+except ImportError:
+    _detect_charset = None
+
+from app.services.chapter_service import detect_chapters
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +26,14 @@ MAX_FILE_SIZE = 20 * 1024 * 1024
 # Supported file extensions
 SUPPORTED_EXTENSIONS = {".txt", ".docx", ".pdf"}
 
+# Read size when streaming an upload to disk (bounds memory per upload)
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Bytes of a non-UTF-8 text upload examined to detect its charset, starting this
+# many bytes before its first invalid UTF-8 byte
+CHARSET_SAMPLE_BYTES = 64 * 1024
+CHARSET_SAMPLE_LEAD_BYTES = 256
+
 
 class UploadError(Exception):
     """Custom exception for upload-related errors."""
@@ -30,105 +51,418 @@ def validate_file(filename: str, file_size: int) -> None:
     Raises:
         UploadError: If validation fails
     """
-    # Check file extension
+    validate_extension(filename)
+    _check_size(file_size)
+    logger.info(f"File validation passed: {filename} ({file_size} bytes)")
+
+
+def validate_extension(filename: str) -> None:
+    """Raise UploadError unless *filename* has a supported extension."""
     ext = Path(filename).suffix.lower()
     if ext not in SUPPORTED_EXTENSIONS:
         raise UploadError(
             f"Invalid file type. Please upload {', '.join(SUPPORTED_EXTENSIONS)} files only."
         )
-    
-    # Check file size
+
+
+def _check_size(file_size: int) -> None:
     if file_size > MAX_FILE_SIZE:
         size_mb = file_size / (1024 * 1024)
         raise UploadError(
             f"File too large ({size_mb:.1f}MB). Maximum size is {MAX_FILE_SIZE / (1024 * 1024):.0f}MB."
         )
-    
-    logger.info(f"File validation passed: {filename} ({file_size} bytes)")
 
 
-def extract_text_from_txt(file_path: str) -> str:
-    """Extract text from .txt file."""
+async def stream_upload_to_disk(
+    upload: Any,
+    filename: str,
+    upload_dir: str,
+    *,
+    block_size: int = UPLOAD_BLOCK_SIZE,
+) -> Tuple[str, int, str]:
+    """
+    Copy an upload (anything with ``async read(size)``, e.g. FastAPI's UploadFile) to
+    *upload_dir* in fixed-size blocks, hashing as it goes.
+
+    The size limit is enforced while streaming, so an oversized upload is rejected
+    after MAX_FILE_SIZE + one block instead of after being read whole. Data goes to a
+    temporary file that is renamed into place only when complete.
+
+    Returns:
+        (file_path, size_in_bytes, sha256_hex)
+
+    Raises:
+        UploadError: If the extension is unsupported, the file is too large or
+        cannot be written
+    """
+    validate_extension(filename)
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    file_path = os.path.join(upload_dir, filename)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-        if not text.strip():
-            raise UploadError("Text file is empty.")
+        tmp = tempfile.NamedTemporaryFile(dir=upload_dir, prefix=".upload-", suffix=".part", delete=False)
+    except OSError as e:
+        raise UploadError(f"Failed to save file: {str(e)}")
+    try:
+        with tmp:
+            while True:
+                block = await upload.read(block_size)
+                if not block:
+                    break
+                size += len(block)
+                _check_size(size)
+                digest.update(block)
+                tmp.write(block)
+        os.replace(tmp.name, file_path)
+    except BaseException as e:
+        # Oversized, disk error or client gone: never leave a partial file behind
+        _remove_quietly(tmp.name)
+        if isinstance(e, OSError):
+            raise UploadError(f"Failed to save file: {str(e)}")
+        raise
+    logger.info(f"Saved uploaded file to: {file_path} ({size} bytes)")
+    return file_path, size, digest.hexdigest()
+
+
+def _remove_quietly(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# Text encodings identified by their byte order mark (UTF-32 before UTF-16: same prefix)
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _bom_encoding(data: bytes) -> Optional[Tuple[str, int]]:
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding, len(bom)
+    return None
+
+
+def _detect_legacy_charset(data: bytes, bad_byte: int) -> str:
+    """
+    Charset of *data*, which is not valid UTF-8 at offset *bad_byte*. The sample
+    examined starts just before that byte, since a leading run of plain ASCII (title
+    page, licence) says nothing about the charset. A sample that is UTF-8 but for a
+    few stray bytes stays UTF-8; otherwise charset-normalizer decides (latin-1 if it
+    is unavailable or undecided).
+    """
+    start = max(0, bad_byte - CHARSET_SAMPLE_LEAD_BYTES)
+    sample = data[start:start + CHARSET_SAMPLE_BYTES]
+    non_ascii = len(sample.translate(None, bytes(range(128))))
+    if codecs.decode(sample, "utf-8", errors="replace").count("\ufffd") * 20 <= non_ascii:
+        return "utf-8"
+    best = _detect_charset(sample).best() if _detect_charset is not None else None
+    if best is None or codecs.lookup(best.encoding).name == "ascii":
+        return "latin-1"
+    return best.encoding
+
+
+def detect_text_encoding(data: bytes) -> Tuple[str, int]:
+    """
+    Encoding of a text file's bytes and the length of its byte order mark.
+
+    A BOM decides; otherwise the file is UTF-8 if all of it decodes strictly as
+    UTF-8, else charset-normalizer decides (see _detect_legacy_charset).
+    """
+    bom = _bom_encoding(data)
+    if bom:
+        return bom
+    try:
+        codecs.decode(data, "utf-8")
+        return "utf-8", 0
+    except UnicodeDecodeError as e:
+        return _detect_legacy_charset(data, e.start), 0
+
+
+def normalize_newlines(text: str) -> str:
+    """
+    CRLF (Windows) and lone CR (old Mac) line endings as LF, as text mode would
+    read them. Chapter positions are computed on this text and chunk byte spans point
+    into the file it is saved to, so both must see the same characters.
+    """
+    if "\r" not in text:
         return text
-    except UnicodeDecodeError:
-        # Try with different encodings
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                text = f.read()
-            if not text.strip():
-                raise UploadError("Text file is empty.")
-            return text
-        except Exception as e:
-            raise UploadError(f"Unable to read text file: {str(e)}")
-    except Exception as e:
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def decode_text_bytes(data: bytes) -> Tuple[str, str]:
+    """
+    Decode a text file read as bytes (encoding as detect_text_encoding), with line
+    endings normalised (see normalize_newlines). A UTF-8 file is decoded in one
+    strict pass; only a file that fails it is decoded again in the detected charset.
+
+    Returns:
+        (text, encoding)
+    """
+    encoding, bom_length = _bom_encoding(data) or ("utf-8", 0)
+    try:
+        errors = "replace" if bom_length else "strict"
+        text = codecs.decode(memoryview(data)[bom_length:], encoding, errors=errors)
+    except UnicodeDecodeError as e:
+        encoding = _detect_legacy_charset(data, e.start)
+        # Stray invalid bytes (when the detector still says UTF-8) become U+FFFD
+        text = codecs.decode(memoryview(data), encoding, errors="replace")
+    return normalize_newlines(text), encoding
+
+
+def extract_text_from_txt(file_path: str) -> str:
+    """Extract text from .txt file (any encoding, see decode_text_bytes)."""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
         raise UploadError(f"Unable to read text file: {str(e)}")
+    text, encoding = decode_text_bytes(data)
+    if encoding != "utf-8":
+        logger.info(f"Decoded {file_path} as {encoding}")
+    if not text.strip():
+        raise UploadError("Text file is empty.")
+    return text
 
 
 def extract_text_from_docx(file_path: str) -> str:
-    """Extract text from .docx file using python-docx."""
+    """Extract text from .docx file (same text python-docx's doc.paragraphs gives)."""
+    text, _ = extract_docx_structure(file_path)
+    return text
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADING_NAME = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+
+def _docx_style_levels(zf: zipfile.ZipFile) -> dict[str, int]:
+    """Heading level per paragraph style id (Title = 0, Heading N = N), following basedOn."""
     try:
-        from docx import Document
-    except ImportError:
-        raise UploadError(
-            "DOCX support not available. Please contact administrator."
-        )
-    
+        root = ET.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    own: dict[str, Optional[int]] = {}
+    based_on: dict[str, str] = {}
+    for style in root.iter(f"{_W}style"):
+        if style.get(f"{_W}type") != "paragraph":
+            continue
+        style_id = style.get(f"{_W}styleId")
+        name_el = style.find(f"{_W}name")
+        name = name_el.get(f"{_W}val", "") if name_el is not None else ""
+        outline = style.find(f"{_W}pPr/{_W}outlineLvl")
+        level = None
+        if outline is not None and outline.get(f"{_W}val", "").isdigit() and int(outline.get(f"{_W}val")) < 9:
+            level = int(outline.get(f"{_W}val")) + 1
+        elif _HEADING_NAME.match(name):
+            level = int(_HEADING_NAME.match(name).group(1))
+        elif name.lower() == "title":
+            level = 0
+        own[style_id] = level
+        parent = style.find(f"{_W}basedOn")
+        if parent is not None:
+            based_on[style_id] = parent.get(f"{_W}val")
+
+    levels: dict[str, int] = {}
+    for style_id in own:
+        seen, current = set(), style_id
+        while current in own and current not in seen:
+            if own[current] is not None:
+                levels[style_id] = own[current]
+                break
+            seen.add(current)
+            current = based_on.get(current)
+    return levels
+
+
+def _docx_run_text(run: ET.Element) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f"{_W}t":
+            parts.append(child.text or "")
+        elif tag in (f"{_W}tab", f"{_W}ptab"):
+            parts.append("\t")
+        elif tag == f"{_W}cr":
+            parts.append("\n")
+        elif tag == f"{_W}br":
+            # Line breaks only; page / column breaks have no text
+            if child.get(f"{_W}type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == f"{_W}noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _docx_paragraph(p: ET.Element, style_levels: dict[str, int]) -> Tuple[str, Optional[int]]:
+    parts = []
+    for child in p:
+        if child.tag == f"{_W}r":
+            parts.append(_docx_run_text(child))
+        elif child.tag == f"{_W}hyperlink":
+            parts.extend(_docx_run_text(r) for r in child.findall(f"{_W}r"))
+
+    level = None
+    ppr = p.find(f"{_W}pPr")
+    if ppr is not None:
+        outline = ppr.find(f"{_W}outlineLvl")
+        style = ppr.find(f"{_W}pStyle")
+        if outline is not None and outline.get(f"{_W}val", "").isdigit() and int(outline.get(f"{_W}val")) < 9:
+            level = int(outline.get(f"{_W}val")) + 1
+        elif style is not None:
+            level = style_levels.get(style.get(f"{_W}val"))
+    return "".join(parts), level
+
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[Tuple[str, Optional[int]]]:
+    """
+    Stream (text, heading_level) for each body paragraph of a .docx, in order.
+
+    word/document.xml is iterparsed straight from the zip and every body element is
+    discarded once read, so memory stays flat regardless of document size. Text
+    matches python-docx's Paragraph.text for doc.paragraphs (runs and hyperlinks;
+    tables, text boxes and tracked insertions are skipped). heading_level is 0 for
+    Title, N for Heading N / outline level N, None for body text.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        style_levels = _docx_style_levels(zf)
+        with zf.open("word/document.xml") as xml:
+            body = None
+            depth = 0
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and elem.tag == f"{_W}body":
+                        body = elem
+                    continue
+                depth -= 1
+                if body is not None and depth == 2:
+                    # Direct child of w:body is complete
+                    if elem.tag == f"{_W}p":
+                        yield _docx_paragraph(elem, style_levels)
+                    body.remove(elem)
+
+
+def extract_docx_structure(file_path: str) -> Tuple[str, list[dict]]:
+    """
+    Text of a .docx (paragraphs joined by newlines) and its headings.
+
+    Returns:
+        (text, headings) — headings as {title, level, word_offset}, word_offset
+        being the number of words of the text before the heading
+
+    Raises:
+        UploadError: If the file cannot be read or has no text
+    """
+    parts: list[str] = []
+    headings: list[dict] = []
+    words = 0
     try:
-        doc = Document(file_path)
-        paragraphs = [para.text for para in doc.paragraphs]
-        text = '\n'.join(paragraphs)
-        
-        if not text.strip():
-            raise UploadError("DOCX file contains no readable text.")
-        
-        return text
-    except Exception as e:
+        for para_text, level in iter_docx_paragraphs(file_path):
+            if level is not None and para_text.strip():
+                headings.append({"title": para_text.strip(), "level": level, "word_offset": words})
+            parts.append(para_text)
+            words += len(para_text.split())
+    except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError) as e:
         raise UploadError(f"Unable to read DOCX file: {str(e)}")
 
+    text = '\n'.join(parts)
+    if not text.strip():
+        raise UploadError("DOCX file contains no readable text.")
+    return text, headings
+
 
 def extract_text_from_pdf(file_path: str) -> str:
     """Extract text from PDF using PyPDF2."""
+    text, _ = join_pdf_pages(extract_pdf_page_texts(file_path))
+    return text
+
+
+def _open_pdf(file_path: str):
     try:
         from PyPDF2 import PdfReader
     except ImportError:
         raise UploadError(
             "PDF support not available. Please contact administrator."
         )
-    
     try:
-        reader = PdfReader(file_path)
-        
+        return PdfReader(file_path)
+    except Exception as e:
+        raise UploadError(f"Unable to read PDF file: {str(e)}")
+
+
+def pdf_structure(file_path: str) -> Tuple[int, list[dict]]:
+    """Number of pages and the top-level outline (bookmarks) as [{title, page}] (0-based page)."""
+    reader = _open_pdf(file_path)
+    try:
+        page_count = len(reader.pages)
+    except Exception as e:
+        raise UploadError(f"Unable to read PDF file: {str(e)}")
+    outline = []
+    try:
+        for entry in reader.outline:
+            if isinstance(entry, list):  # nested children of the previous entry
+                continue
+            page = reader.get_destination_page_number(entry)
+            if page is not None and page >= 0:
+                outline.append({"title": str(entry.title or "").strip(), "page": page})
+    except Exception as e:
+        # A broken outline only costs chapter detection, not the upload
+        logger.warning("Ignoring unreadable PDF outline in %s: %s", file_path, e)
+        outline = []
+    return page_count, outline
+
+
+def extract_pdf_page_texts(file_path: str, first: int = 0, last: Optional[int] = None) -> list[str]:
+    """
+    Text of pages [first, last) of a PDF, one string per page ('' for pages without
+    text). Ranges let extraction_pool extract one PDF in several processes.
+    """
+    reader = _open_pdf(file_path)
+    try:
         if len(reader.pages) == 0:
             raise UploadError("PDF file has no pages.")
-        
-        # Extract text from all pages
-        text_parts = []
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(page_text)
-        
-        text = '\n'.join(text_parts)
-        
-        # Check if we extracted meaningful text
-        if not text.strip() or len(text.strip()) < 100:
-            raise UploadError(
-                "PDF must contain extractable text, not scanned images. "
-                "Please upload a text-based PDF or convert to .txt/.docx."
-            )
-        
-        return text
+        pages = reader.pages[first:last]
+        return [page.extract_text() or "" for page in pages]
     except UploadError:
         raise
     except Exception as e:
         raise UploadError(f"Unable to read PDF file: {str(e)}")
 
 
+def join_pdf_pages(page_texts: list[str]) -> Tuple[str, list[int]]:
+    """
+    Join page texts into the manuscript text and record where each page starts.
+
+    Returns:
+        (text, page_word_starts) — page_word_starts[i] is the number of words of
+        the text before PDF page i + 1, used to map chunks to real pages
+
+    Raises:
+        UploadError: If the PDF has no extractable text
+    """
+    parts: list[str] = []
+    page_word_starts: list[int] = []
+    words = 0
+    for page_text in page_texts:
+        page_word_starts.append(words)
+        if page_text:
+            parts.append(page_text)
+            words += len(page_text.split())
+    text = '\n'.join(parts)
+
+    # Check if we extracted meaningful text
+    if not text.strip() or len(text.strip()) < 100:
+        raise UploadError(
+            "PDF must contain extractable text, not scanned images. "
+            "Please upload a text-based PDF or convert to .txt/.docx."
+        )
+    return text, page_word_starts
+
+
 def extract_text_from_file(file_path: str, extension: str) -> str:
     """
     Extract text from uploaded file based on extension.
@@ -266,23 +600,57 @@ def process_manuscript_upload(
     temp_file_path = save_uploaded_file(file_content, filename, upload_dir)
     logger.info("[upload_service] save_uploaded_file done in %.2fs", time.perf_counter() - t1)
 
+    return process_saved_manuscript(temp_file_path, filename)
+
+
+def process_saved_manuscript(temp_file_path: str, filename: str) -> Tuple[str, dict]:
+    """
+    Extract text and compute metadata for a manuscript already saved to disk
+    (see stream_upload_to_disk). The file is removed if processing fails.
+    Blocking: PDF / DOCX parsing waits on an extraction worker process.
+
+    Returns:
+        Tuple of (extracted_text, metadata_dict), as process_manuscript_upload;
+        metadata_dict also has chapters (see chapter_service.detect_chapters), for
+        PDFs page_word_starts (see join_pdf_pages), for DOCX headings (see
+        extract_docx_structure)
+    """
     try:
         t2 = time.perf_counter()
         extension = Path(filename).suffix.lower()
-        text = extract_text_from_file(temp_file_path, extension)
+        page_word_starts = None
+        headings = None
+        pdf_outline = None
+        if extension == '.pdf':
+            from app.services.extraction_pool import extract_pdf_pages_isolated  # imports this module
+            page_texts, pdf_outline = extract_pdf_pages_isolated(temp_file_path)
+            text, page_word_starts = join_pdf_pages(page_texts)
+        elif extension == '.docx':
+            from app.services.extraction_pool import extract_docx_isolated  # imports this module
+            text, headings = extract_docx_isolated(temp_file_path)
+        else:
+            text = extract_text_from_file(temp_file_path, extension)
         logger.info("[upload_service] extract_text_from_file (%s) done in %.2fs, text_len=%d", extension, time.perf_counter() - t2, len(text))
 
         t3 = time.perf_counter()
         word_count = compute_word_count(text)
-        estimated_pages = estimate_page_count(word_count)
+        # PDFs have real pages; other formats are estimated from the word count
+        estimated_pages = len(page_word_starts) if page_word_starts else estimate_page_count(word_count)
         title = guess_title_from_text(text, filename)
-        logger.info("[upload_service] metadata (word_count, pages, title) done in %.2fs", time.perf_counter() - t3)
+        chapters = detect_chapters(
+            text, headings=headings, pdf_outline=pdf_outline, page_word_starts=page_word_starts,
+            plain_text=extension == '.txt',
+        )
+        logger.info("[upload_service] metadata (word_count, pages, title, chapters) done in %.2fs", time.perf_counter() - t3)
         
         metadata = {
             'title': title,
             'word_count': word_count,
             'estimated_pages': estimated_pages,
             'original_filename': filename,
+            'page_word_starts': page_word_starts,
+            'headings': headings,
+            'chapters': chapters,
         }
         
         logger.info(
@@ -0,0 +1,204 @@
+"""
+Benchmark: streaming chunker (book_service.iter_chunks) and the process-parallel
+chunker (book_service.chunk_text_parallel) vs the previous chunk_text.
+
+The previous implementation is kept below verbatim as the reference. All run on the
+same synthetic manuscript (default 1M words, with some oversized paragraphs to hit
+the sentence-splitting path); outputs must be identical.
+
+Usage (from backend directory):
+  python -m scripts.bench_chunking [--words 1000000] [--target 2000] [--overlap 200]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# Ensure backend/app is on path when run as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import book_service
+from app.services.book_service import WORDS_PER_PAGE, _get_encoder, chunk_text, chunk_text_parallel
+
+
+# ---------------------------------------------------------------------------
+# Reference: chunk_text before the streaming rewrite
+# ---------------------------------------------------------------------------
+
+def _legacy_chunk_text(text, *, target_tokens=2000, overlap_tokens=200):
+    paragraphs = re.split(r"\n\s*\n", text)
+    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+
+    enc = _get_encoder()
+    chunks = []
+    current_paragraphs = []
+    current_tokens = 0
+    word_offset = 0
+
+    def _flush(paras, w_offset):
+        chunk_text_str = "\n\n".join(paras)
+        words = chunk_text_str.split()
+        wc = len(words)
+        start_page = max(1, w_offset // WORDS_PER_PAGE + 1)
+        end_page = max(start_page, (w_offset + wc) // WORDS_PER_PAGE + 1)
+        return {
+            "chunk_index": len(chunks),
+            "text": chunk_text_str,
+            "start_page": start_page,
+            "end_page": end_page,
+            "word_count": wc,
+        }
+
+    for para in paragraphs:
+        para_tokens = len(enc.encode(para))
+        if para_tokens > target_tokens:
+            if current_paragraphs:
+                chunks.append(_flush(current_paragraphs, word_offset))
+                overlap_paras, overlap_tok = _legacy_pick_overlap(current_paragraphs, enc, overlap_tokens)
+                word_offset += sum(len(p.split()) for p in current_paragraphs) - sum(
+                    len(p.split()) for p in overlap_paras
+                )
+                current_paragraphs = list(overlap_paras)
+                current_tokens = overlap_tok
+            for sub in _legacy_split_large_paragraph(para, enc, target_tokens, overlap_tokens):
+                sub_words = sub.split()
+                start_p = max(1, word_offset // WORDS_PER_PAGE + 1)
+                end_p = max(start_p, (word_offset + len(sub_words)) // WORDS_PER_PAGE + 1)
+                chunks.append({
+                    "chunk_index": len(chunks),
+                    "text": sub,
+                    "start_page": start_p,
+                    "end_page": end_p,
+                    "word_count": len(sub_words),
+                })
+                word_offset += len(sub_words)
+            current_paragraphs = []
+            current_tokens = 0
+            continue
+
+        if current_tokens + para_tokens > target_tokens and current_paragraphs:
+            chunks.append(_flush(current_paragraphs, word_offset))
+            overlap_paras, overlap_tok = _legacy_pick_overlap(current_paragraphs, enc, overlap_tokens)
+            word_offset += sum(len(p.split()) for p in current_paragraphs) - sum(
+                len(p.split()) for p in overlap_paras
+            )
+            current_paragraphs = list(overlap_paras)
+            current_tokens = overlap_tok
+
+        current_paragraphs.append(para)
+        current_tokens += para_tokens
+
+    if current_paragraphs:
+        chunks.append(_flush(current_paragraphs, word_offset))
+    return chunks
+
+
+def _legacy_pick_overlap(paragraphs, enc, max_tokens):
+    picked = []
+    total = 0
+    for para in reversed(paragraphs):
+        t = len(enc.encode(para))
+        if total + t > max_tokens:
+            break
+        picked.insert(0, para)
+        total += t
+    return picked, total
+
+
+def _legacy_split_large_paragraph(text, enc, target_tokens, overlap_tokens):
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    parts = []
+    current = []
+    current_tok = 0
+    for sent in sentences:
+        st = len(enc.encode(sent))
+        if current_tok + st > target_tokens and current:
+            parts.append(" ".join(current))
+            overlap_sents, _ = _legacy_pick_overlap(current, enc, overlap_tokens)
+            current = list(overlap_sents)
+            current_tok = sum(len(enc.encode(s)) for s in current)
+        current.append(sent)
+        current_tok += st
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+# ---------------------------------------------------------------------------
+# Synthetic manuscript
+# ---------------------------------------------------------------------------
+
+_VOCAB = (
+    "the a of and to in was he she it that his her with as for had on at by not but "
+    "from they said one all were we when there been which their an this would into "
+    "castle shadow river ancient glowing lantern whispered storm crimson silver forest "
+    "Holmes Watson Irina Moscow Baker street carriage window letter morning evening"
+).split()
+
+
+def make_manuscript(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    paragraphs: list[str] = []
+    produced = 0
+    while produced < words:
+        # Mostly normal paragraphs, occasionally one far over the chunk target
+        n = rng.randint(3000, 4500) if rng.random() < 0.01 else rng.randint(20, 180)
+        sentences, left = [], n
+        while left > 0:
+            k = min(left, rng.randint(6, 24))
+            sent = " ".join(rng.choice(_VOCAB) for _ in range(k))
+            sentences.append(sent[0].upper() + sent[1:] + rng.choice(".!?"))
+            left -= k
+        paragraphs.append(" ".join(sentences))
+        produced += n
+    return "\n\n".join(paragraphs)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--words", type=int, default=1_000_000)
+    parser.add_argument("--target", type=int, default=2000)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    text = make_manuscript(args.words)
+    enc = _get_encoder()
+    enc.encode("warm up")
+
+    legacy, t_legacy = _timed(_legacy_chunk_text, text, target_tokens=args.target, overlap_tokens=args.overlap)
+    streaming, t_stream = _timed(chunk_text, text, target_tokens=args.target, overlap_tokens=args.overlap)
+
+    book_service._get_chunk_pool().submit(book_service.count_tokens, "warm up").result()  # start workers
+    parallel, t_parallel = _timed(
+        chunk_text_parallel, text, target_tokens=args.target, overlap_tokens=args.overlap, min_chars=0,
+    )
+    book_service.shutdown_chunk_pool()
+
+    first_chunk_at = time.perf_counter()
+    next(book_service.iter_chunks(text, target_tokens=args.target, overlap_tokens=args.overlap))
+    first_chunk_at = time.perf_counter() - first_chunk_at
+
+    print(f"manuscript: {len(text.split()):,} words, {len(text):,} chars -> {len(streaming)} chunks")
+    print(f"previous chunk_text : {t_legacy:8.2f}s")
+    print(f"streaming chunker   : {t_stream:8.2f}s  ({t_legacy / t_stream:.2f}x faster)")
+    print(f"parallel chunker    : {t_parallel:8.2f}s  ({t_legacy / t_parallel:.2f}x faster, "
+          f"{book_service.CHUNK_WORKERS} workers)")
+    print(f"first chunk yielded : {first_chunk_at * 1000:8.1f}ms")
+    # The previous chunker did not report source spans
+    without_spans = [{k: v for k, v in c.items() if k not in ("start_char", "end_char")} for c in streaming]
+    if not (legacy == without_spans and streaming == parallel):
+        print("OUTPUT MISMATCH")
+        sys.exit(1)
+    print("outputs identical")
+
+
+if __name__ == "__main__":
+    main()
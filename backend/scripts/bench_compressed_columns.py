@@ -0,0 +1,168 @@
+"""
+Benchmark: CompressedText columns vs plain TEXT — SQLite file size and read latency.
+
+Builds two throwaway databases with the same synthetic catalogue (chunks with text
+and visual analysis JSON, characters with ontology/visual tokens, scenes with
+prompt JSON): one with the values stored as plain TEXT (as before), one through the
+models (compressed). Reports the file size after VACUUM and the time to load every
+row through the ORM, and checks that both read back identical values.
+
+Usage (from backend directory):
+  python -m scripts.bench_compressed_columns [--books 20] [--chunks 150]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Ensure backend/app is on path when run as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Book, Character, Chunk, Scene  # noqa: E402
+
+_WORDS = (
+    "the a of and to in was he she it that his her with as for had on at by castle "
+    "shadow river ancient glowing lantern whispered storm crimson silver forest "
+    "cloak armour tower mist candle velvet iron"
+).split()
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _visual_json(rng: random.Random) -> str:
+    return json.dumps({
+        "visual_layers": {
+            "subject": _sentence(rng, 12), "mood": _sentence(rng, 4),
+            "atmosphere": _sentence(rng, 8), "visual_style": _sentence(rng, 6),
+        },
+        "visual_tokens": {
+            "core_tokens": [_sentence(rng, 2) for _ in range(6)],
+            "style_tokens": [_sentence(rng, 2) for _ in range(4)],
+            "technical_tokens": [_sentence(rng, 2) for _ in range(3)],
+        },
+    })
+
+
+def _ontology_json(rng: random.Random) -> str:
+    return json.dumps({
+        "entity_class": "human", "materiality": "corporeal", "embodiment": "humanoid",
+        "power_status": _sentence(rng, 2), "visual_type": "character",
+        "visual_markers": [_sentence(rng, 3) for _ in range(5)],
+        "search_archetype": _sentence(rng, 4), "anti_human_override": False,
+    })
+
+
+def _populate(session, books: int, chunks: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    for b in range(books):
+        book = Book(title=f"Book {b}", total_words=chunks * 1500)
+        session.add(book)
+        session.flush()
+        session.add_all(
+            Chunk(
+                book_id=book.id, chunk_index=i,
+                text="\n\n".join(_sentence(rng, rng.randint(40, 160)) for _ in range(12)),
+                visual_analysis_json=_visual_json(rng),
+            )
+            for i in range(chunks)
+        )
+        session.add_all(
+            Character(
+                book_id=book.id, name=f"Character {i}",
+                ontology_json=_ontology_json(rng), entity_visual_tokens_json=_visual_json(rng),
+            )
+            for i in range(20)
+        )
+        session.add_all(
+            Scene(
+                book_id=book.id, title=f"Scene {i}", chunk_start_index=i, chunk_end_index=i,
+                scene_prompt_draft=_sentence(rng, 80),
+                scene_visual_tokens_json=_visual_json(rng), t2i_prompt_json=_visual_json(rng),
+            )
+            for i in range(10)
+        )
+    session.commit()
+
+
+def _decompress_all(engine) -> None:
+    """Rewrite every compressed value as plain TEXT — the layout before CompressedText."""
+    from app.models import CompressedText, decompress_text
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if not isinstance(column.type, CompressedText):
+                    continue
+                rows = conn.execute(
+                    text(f"SELECT rowid, {column.name} FROM {table.name} WHERE typeof({column.name}) = 'blob'")
+                ).all()
+                if rows:
+                    conn.execute(
+                        text(f"UPDATE {table.name} SET {column.name} = :value WHERE rowid = :rowid"),
+                        [{"rowid": rowid, "value": decompress_text(value)} for rowid, value in rows],
+                    )
+
+
+def _load_all(engine) -> tuple[list, float]:
+    session = sessionmaker(bind=engine)()
+    start = time.perf_counter()
+    values = [(c.stored_text, c.visual_analysis_json) for c in session.query(Chunk).order_by(Chunk.id)]
+    values += [(c.ontology_json, c.entity_visual_tokens_json) for c in session.query(Character).order_by(Character.id)]
+    values += [(s.scene_prompt_draft, s.t2i_prompt_json) for s in session.query(Scene).order_by(Scene.id)]
+    elapsed = time.perf_counter() - start
+    session.close()
+    return values, elapsed
+
+
+def _vacuumed_size(engine, path: str) -> int:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+    return os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=150, help="chunks per book")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("plain", "compressed"):
+            path = os.path.join(tmp, f"{mode}.db")
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=engine)
+            session = sessionmaker(bind=engine)()
+            _populate(session, args.books, args.chunks)
+            session.close()
+            if mode == "plain":
+                _decompress_all(engine)
+            size = _vacuumed_size(engine, path)
+            _load_all(engine)  # warm the OS page cache
+            values, elapsed = _load_all(engine)
+            results[mode] = (size, elapsed, values)
+            engine.dispose()
+
+    plain_size, plain_time, plain_values = results["plain"]
+    comp_size, comp_time, comp_values = results["compressed"]
+    print(f"catalogue: {args.books} books x {args.chunks} chunks ({len(plain_values):,} rows read)")
+    print(f"plain TEXT     : {plain_size / 1e6:8.2f} MB, full read {plain_time * 1000:8.1f} ms")
+    print(f"CompressedText : {comp_size / 1e6:8.2f} MB, full read {comp_time * 1000:8.1f} ms  "
+          f"({plain_size / comp_size:.2f}x smaller)")
+    if plain_values != comp_values:
+        print("VALUE MISMATCH")
+        sys.exit(1)
+    print("values identical")
+
+
+if __name__ == "__main__":
+    main()
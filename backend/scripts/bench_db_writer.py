@@ -0,0 +1,120 @@
+"""
+Benchmark: background writes committed through their own sessions vs the DbWriter
+single-writer queue.
+
+Writer threads behave like the background stages (analysis checkpoints, chunk
+analysis updates, search-query log): small writes, each of which must be durable
+before the thread goes on. In "direct" mode every write opens a session and commits
+(as before); in "queued" mode it is submitted to one DbWriter and waited for, so
+concurrent writes share transactions. Both modes use the pragma profile of
+app.database and run for the same wall time; reports writes per second, commits and
+"database is locked" failures.
+
+Usage (from backend directory):
+  python -m scripts.bench_db_writer [--threads 8] [--seconds 10] [--busy-ms 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Ensure backend/app is on path when run as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.database import SQLITE_PRAGMAS, Base, use_sqlite_pragmas  # noqa: E402
+from app.services.db_writer import DbWriter  # noqa: E402
+
+_PAYLOAD = b"x" * 2048
+
+
+def _write_job(book_id: int, thread: int, i: int):
+    def job(db):
+        crud.save_analysis_checkpoint(db, f"run-{thread}", f"stage-{i}", _PAYLOAD, commit=False)
+        crud.create_search_query(
+            db, book_id=book_id, entity_type="character", entity_name=f"E{thread}",
+            query_text=f"query {i}", commit=False,
+        )
+    return job
+
+
+def _run(Session, book_id: int, threads: int, seconds: float, writer) -> dict:
+    stop = threading.Event()
+    stats = {"writes": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def stage(n: int) -> None:
+        i = 0
+        while not stop.is_set():
+            i += 1
+            job = _write_job(book_id, n, i)
+            try:
+                if writer is not None:
+                    writer.write(job)
+                else:
+                    db = Session()
+                    try:
+                        job(db)
+                        db.commit()
+                    finally:
+                        db.close()
+                with lock:
+                    stats["writes"] += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+
+    workers = [threading.Thread(target=stage, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=8, help="concurrent background stages")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--busy-ms", type=int, default=2000, help="lock wait before 'database is locked'")
+    args = parser.parse_args()
+
+    pragmas = dict(SQLITE_PRAGMAS, busy_timeout=str(args.busy_ms))
+    print(f"{args.threads} writing threads, {args.seconds:.0f}s per mode, lock wait {args.busy_ms} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "queued"):
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp, mode + '.db')}",
+                connect_args={"check_same_thread": False, "timeout": args.busy_ms / 1000},
+                pool_size=args.threads + 1, max_overflow=0,
+            )
+            use_sqlite_pragmas(engine, pragmas)
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            db = Session()
+            book_id = crud.create_book(db, title="Bench").id
+            db.close()
+
+            writer = DbWriter(Session) if mode == "queued" else None
+            stats = _run(Session, book_id, args.threads, args.seconds, writer)
+            commits = stats["writes"]
+            if writer is not None:
+                writer.close()
+                commits = writer.commits
+            engine.dispose()
+            print(f"{mode:7s}: {stats['writes'] / args.seconds:8.1f} writes/s in {commits} commits, "
+                  f"{stats['locked']} locked errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: concurrent readers and writers on the real schema, with SQLite defaults
+vs the pragma profile of app.database (SQLITE_PRAGMAS: WAL, synchronous=NORMAL,
+page cache, mmap, temp_store, busy_timeout).
+
+Writer threads behave like the background analysis (chunk batches, entity inserts,
+updates, one commit each); reader threads like request handlers (chunk and
+character listings). Each mode runs for the same wall time on a fresh database file
+and reports operations per second and "database is locked" failures.
+
+Usage (from backend directory):
+  python -m scripts.bench_sqlite_contention [--readers 8] [--writers 3] [--seconds 10] [--busy-ms 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Ensure backend/app is on path when run as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.database import SQLITE_PRAGMAS, Base, use_sqlite_pragmas  # noqa: E402
+
+_PARAGRAPH = "The lantern swung in the storm as the carriage rattled past the castle gate. " * 12
+
+
+def _make_engine(path: str, pragmas: dict, busy_ms: int, threads: int):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": busy_ms / 1000},
+        pool_size=threads, max_overflow=0,
+    )
+    use_sqlite_pragmas(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _seed(Session, books: int) -> list[int]:
+    db = Session()
+    ids = []
+    for b in range(books):
+        book = crud.create_book(db, title=f"Book {b}")
+        crud.create_chunks_batch(db, book.id, [
+            {"chunk_index": i, "text": _PARAGRAPH, "word_count": 160} for i in range(50)
+        ])
+        for i in range(10):
+            crud.create_character(db, book_id=book.id, name=f"Character {i}")
+        ids.append(book.id)
+    db.close()
+    return ids
+
+
+def _run(Session, book_ids: list[int], readers: int, writers: int, seconds: float) -> dict:
+    stop = threading.Event()
+    stats = {"reads": 0, "writes": 0, "locked": 0, "read_latency": 0.0}
+    lock = threading.Lock()
+
+    def reader(n: int) -> None:
+        db = Session()
+        i = n
+        while not stop.is_set():
+            book_id = book_ids[i % len(book_ids)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                crud.get_chunks_by_book(db, book_id)
+                crud.get_characters_by_book(db, book_id)
+                db.rollback()  # end the read transaction, like a finished request
+                with lock:
+                    stats["reads"] += 1
+                    stats["read_latency"] += time.perf_counter() - start
+            except OperationalError as e:
+                db.rollback()
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+        db.close()
+
+    def writer(n: int) -> None:
+        db = Session()
+        i = 0
+        while not stop.is_set():
+            book_id = book_ids[(n + i) % len(book_ids)]
+            i += 1
+            try:
+                crud.create_chunks_batch(db, book_id, [
+                    {"chunk_index": 1000 + n * 100000 + i * 10 + k, "text": _PARAGRAPH} for k in range(10)
+                ])
+                crud.create_character(db, book_id=book_id, name=f"W{n}-{i}")
+                db.execute(text("UPDATE books SET status = :s WHERE id = :id"), {"s": f"w{i}", "id": book_id})
+                db.commit()
+                with lock:
+                    stats["writes"] += 1
+            except OperationalError as e:
+                db.rollback()
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--books", type=int, default=10)
+    parser.add_argument("--busy-ms", type=int, default=2000, help="lock wait before 'database is locked'")
+    args = parser.parse_args()
+
+    defaults = {"journal_mode": "DELETE", "synchronous": "FULL"}
+    tuned = dict(SQLITE_PRAGMAS, busy_timeout=str(args.busy_ms))
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s per mode, "
+          f"lock wait {args.busy_ms} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pragmas in (("defaults", defaults), ("tuned profile", tuned)):
+            engine = _make_engine(
+                os.path.join(tmp, f"{name.split()[0]}.db"), pragmas, args.busy_ms, args.readers + args.writers,
+            )
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            book_ids = _seed(Session, args.books)
+            stats = _run(Session, book_ids, args.readers, args.writers, args.seconds)
+            engine.dispose()
+            avg_ms = 1000 * stats["read_latency"] / max(1, stats["reads"])
+            print(f"{name:14s}: {stats['reads'] / args.seconds:8.1f} reads/s (avg {avg_ms:6.1f} ms), "
+                  f"{stats['writes'] / args.seconds:7.1f} write txns/s, {stats['locked']} locked errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Integration tests for POST /api/books/{id}/analyze: validation, the 202 response,
+the analysis run it creates and the background task it queues, and the request
+parameters reaching the background analysis.
+The background analysis or its LLM calls are mocked; no API keys required.
+"""
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base, get_db
+from app.main import app
+from app.routers.books import resume_interrupted_analyses
+from app.services import ai_service, analysis_store
+from app.services.analysis_store import RunLock
+from app.services.db_writer import shutdown_db_writer
+
+ANALYZE_BODY = {
+    "style_category": "fantasy",
+    "illustration_frequency": 4,
+    "layout_style": "inline_classic",
+    "is_well_known": False,
+    "author": "A. Writer",
+}
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'analyze.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(session_factory):
+    return TestClient(app)
+
+
+@pytest.fixture()
+def background():
+    with patch("app.routers.books._run_analysis_background") as mock:
+        yield mock
+
+
+def _create_book(session_factory, chunk_texts: list[str]) -> int:
+    db = session_factory()
+    book_id = crud.create_book(db, title="Analyze me").id
+    if chunk_texts:
+        crud.create_chunks_batch(
+            db, book_id, [{"chunk_index": i, "text": t} for i, t in enumerate(chunk_texts)]
+        )
+    db.close()
+    return book_id
+
+
+def test_analyze_unknown_book_returns_404(client, background):
+    r = client.post("/api/books/999/analyze", json=ANALYZE_BODY)
+    assert r.status_code == 404
+    background.assert_not_called()
+
+
+def test_analyze_without_chunks_returns_400(client, session_factory, background):
+    book_id = _create_book(session_factory, [])
+    r = client.post(f"/api/books/{book_id}/analyze", json=ANALYZE_BODY)
+    assert r.status_code == 400
+    background.assert_not_called()
+
+
+def test_analyze_starts_run_and_queues_background_task(client, session_factory, background):
+    book_id = _create_book(session_factory, ["First chunk.", "Second chunk."])
+    r = client.post(f"/api/books/{book_id}/analyze", json=ANALYZE_BODY)
+
+    assert r.status_code == 202, r.text
+    assert r.json()["status"] == "analyzing"
+    db = session_factory()
+    book = crud.get_book(db, book_id)
+    assert book.status == "analyzing"
+    assert book.author == "A. Writer"
+    run = crud.get_latest_analysis_run(db, book_id)
+    assert run.status == "running"
+    db.close()
+
+    background.assert_called_once()
+    called_book_id, req_dict, run_id = background.call_args.args
+    assert called_book_id == book_id
+    assert run_id == run.run_id
+    assert req_dict["style_category"] == "fantasy"
+    assert req_dict["scene_count"] == 10
+
+
+def test_reposting_analyze_for_unchanged_chunks_resumes_the_run(client, session_factory, background):
+    book_id = _create_book(session_factory, ["First chunk.", "Second chunk."])
+    url = f"/api/books/{book_id}/analyze"
+    client.post(url, json=ANALYZE_BODY)
+    client.post(url, json=dict(ANALYZE_BODY, author="Someone else"))  # not a resume parameter
+    first, resumed = (c.args[2] for c in background.call_args_list)
+    assert resumed == first
+
+    client.post(url, json=dict(ANALYZE_BODY, scene_count=5))
+    changed = background.call_args.args[2]
+    assert changed != first
+
+    db = session_factory()
+    crud.update_analysis_run_status(db, changed, "completed")
+    db.close()
+    client.post(url, json=dict(ANALYZE_BODY, scene_count=5))
+    after_completed = background.call_args.args[2]
+    assert after_completed != changed
+
+    db = session_factory()
+    assert crud.get_latest_analysis_run(db, book_id).run_id == after_completed
+    assert crud.get_analysis_run(db, first) is None  # superseded runs are dropped
+    db.close()
+
+
+def _fake_batch(chunks, run_id=None):
+    return {
+        "characters": [],
+        "locations": [],
+        "chunk_analyses": [{"chunk_index": c["chunk_index"], "action_level": 0.5} for c in chunks],
+    }
+
+
+def _analyze_with_mocked_llm(client, session_factory, book_id: int, body: dict):
+    """POST /analyze and run the real background task against the test DB; returns the cache mock."""
+    with patch("app.routers.books.SessionLocal", session_factory), \
+            patch("app.routers.books.ChunkAnalysisCache") as cache_cls, \
+            patch("app.services.batch_planner.count_tokens", side_effect=lambda text: len(text.split())), \
+            patch.object(ai_service, "analyze_chunk_batch", side_effect=_fake_batch), \
+            patch.object(ai_service, "consolidate_results", return_value={"main_characters": []}), \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]):
+        cache_cls.return_value.get_many.return_value = {}
+        try:
+            r = client.post(f"/api/books/{book_id}/analyze", json=body)
+        finally:
+            shutdown_db_writer()
+    assert r.status_code == 202, r.text
+    db = session_factory()
+    assert crud.get_book(db, book_id).status == "ready"
+    db.close()
+    return cache_cls.return_value
+
+
+def test_fresh_request_bypasses_chunk_analysis_cache(client, session_factory):
+    book_id = _create_book(session_factory, ["First chunk.", "Second chunk."])
+    body = dict(ANALYZE_BODY, scene_count=0)
+
+    cache = _analyze_with_mocked_llm(client, session_factory, book_id, dict(body, fresh=True))
+    cache.get_many.assert_not_called()
+    cache.put_many.assert_called()  # still refreshed for later runs
+
+    cache = _analyze_with_mocked_llm(client, session_factory, book_id, body)
+    cache.get_many.assert_called()
+
+
+def test_startup_resumes_each_interrupted_run_in_one_worker_only(client, session_factory, background, tmp_path):
+    book_ids = [_create_book(session_factory, ["Some chunk."]) for _ in range(2)]
+    for book_id in book_ids:
+        client.post(f"/api/books/{book_id}/analyze", json=ANALYZE_BODY)  # background mocked: left "analyzing"
+    runs = [c.args[2] for c in background.call_args_list]
+    background.reset_mock()
+
+    with patch.object(analysis_store, "RUN_LOCK_DIR", str(tmp_path)), \
+            patch("app.routers.books.SessionLocal", session_factory), \
+            patch("app.routers.books.threading.Thread") as thread_cls:
+        other_worker = RunLock(runs[0])
+        assert other_worker.acquire()  # the first run is still executing elsewhere
+        resume_interrupted_analyses()
+        other_worker.release()
+
+    thread_cls.assert_called_once()
+    book_id, _req, run_id, run_lock = thread_cls.call_args.kwargs["args"]
+    assert (book_id, run_id) == (book_ids[1], runs[1])
+    assert not RunLock(runs[1], lock_dir=str(tmp_path)).acquire()  # held for the resumed run
+    run_lock.release()
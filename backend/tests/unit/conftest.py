@@ -0,0 +1,24 @@
+"""
+Shared fixtures of the unit tests.
+"""
+import re
+from unittest.mock import patch
+
+import pytest
+
+from app.services import book_service
+
+
+class WordEncoder:
+    """Stand-in for the tiktoken encoder: one token per word or punctuation mark."""
+
+    def encode(self, text):
+        return re.findall(r"\w+|[^\w\s]", text)
+
+
+@pytest.fixture()
+def word_encoder():
+    """Replace book_service's tiktoken encoder with a WordEncoder (nothing to download)."""
+    encoder = WordEncoder()
+    with patch.object(book_service, "_encoder", encoder):
+        yield encoder
@@ -0,0 +1,130 @@
+"""
+Unit tests for resumable analysis: analysis_store.CheckpointStore and
+run_full_analysis() resuming from checkpoints. LLM calls are mocked.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.database import Base
+from app.services import ai_service
+from app.services.analysis_store import CheckpointStore, RunLock, batch_stage, chunks_fingerprint
+from app.services.llm_fallback import as_fallback
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    book = crud.create_book(db, title="Checkpoint book")
+    crud.create_analysis_run(db, book_id=book.id, run_id="run-1")
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+CHUNKS = [{"chunk_index": i, "text": f"Chunk number {i}.", "token_count": 5} for i in range(6)]
+
+
+def _fake_batch(chunks, run_id=None):
+    return {
+        "characters": [{"name": "Alice", "physical_description": "tall"}],
+        "locations": [],
+        "chunk_analyses": [
+            {"chunk_index": c["chunk_index"], "action_level": 0.5, "characters_present": ["Alice"]}
+            for c in chunks
+        ],
+    }
+
+
+def _fake_consolidate(*args, **kwargs):
+    return {
+        "main_characters": [{"name": "Alice", "physical_description": "tall", "is_main": True}],
+        "main_locations": [],
+        "tone_and_style": {"genre": "fiction"},
+    }
+
+
+def test_store_round_trip_survives_new_instance(session_factory):
+    store = CheckpointStore("run-1", session_factory=session_factory)
+    assert store.get("consolidation") is None
+    store.put("consolidation", {"main_characters": [{"name": "Ирина"}]})
+    reopened = CheckpointStore("run-1", session_factory=session_factory)
+    assert reopened.get("consolidation") == {"main_characters": [{"name": "Ирина"}]}
+
+
+def test_fingerprint_depends_on_text_and_llm_params():
+    base = chunks_fingerprint(CHUNKS, {"scene_count": 10, "is_well_known": False})
+    assert base == chunks_fingerprint(CHUNKS, {"scene_count": 10, "is_well_known": False, "style_category": "x"})
+    assert base != chunks_fingerprint(CHUNKS, {"scene_count": 5, "is_well_known": False})
+    edited = [dict(c) for c in CHUNKS]
+    edited[3]["text"] = "Edited."
+    assert base != chunks_fingerprint(edited, {"scene_count": 10, "is_well_known": False})
+
+
+def test_resumed_run_makes_no_llm_calls_for_finished_stages(session_factory):
+    with patch.object(ai_service, "analyze_chunk_batch", side_effect=_fake_batch) as batch_mock, \
+            patch.object(ai_service, "consolidate_results", side_effect=_fake_consolidate) as cons_mock, \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]):
+        first = ai_service.run_full_analysis(
+            CHUNKS, scene_count=0, analysis_run_id="run-1",
+            checkpoints=CheckpointStore("run-1", session_factory=session_factory),
+        )
+        calls_first = batch_mock.call_count
+        assert calls_first >= 1 and cons_mock.call_count == 1
+
+        second = ai_service.run_full_analysis(
+            CHUNKS, scene_count=0, analysis_run_id="run-1",
+            checkpoints=CheckpointStore("run-1", session_factory=session_factory),
+        )
+        assert batch_mock.call_count == calls_first
+        assert cons_mock.call_count == 1
+
+    assert [c["chunk_index"] for c in second["chunk_analyses"]] == list(range(6))
+    assert second["main_characters"][0]["name"] == first["main_characters"][0]["name"]
+
+
+def test_fallback_results_are_retried_by_a_resumed_run(session_factory):
+    failed = as_fallback({"main_characters": [], "main_locations": [], "tone_and_style": {}})
+
+    def _partial_batch(chunks, run_id=None):
+        return _fake_batch(chunks[:-1])  # gave up on the last chunk
+
+    with patch.object(ai_service, "analyze_chunk_batch", side_effect=_partial_batch) as batch_mock, \
+            patch.object(ai_service, "consolidate_results", side_effect=[failed, _fake_consolidate()]) as cons_mock, \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]):
+        calls = []
+        for _ in range(2):
+            result = ai_service.run_full_analysis(
+                CHUNKS, scene_count=0, analysis_run_id="run-1",
+                checkpoints=CheckpointStore("run-1", session_factory=session_factory),
+            )
+            calls.append(batch_mock.call_count)
+
+    assert cons_mock.call_count == 2
+    assert result["main_characters"][0]["name"] == "Alice"
+    assert calls[1] == 2 * calls[0]  # incomplete batches are asked again
+    assert CheckpointStore("run-1", session_factory=session_factory).get("consolidation") == _fake_consolidate()
+
+
+def test_batch_stage_key_uses_chunk_range():
+    assert batch_stage(CHUNKS[2:5]) == "batch:2-4"
+
+
+def test_run_lock_is_exclusive_until_released(tmp_path):
+    first = RunLock("run-1", lock_dir=str(tmp_path))
+    assert first.acquire()
+    assert not RunLock("run-1", lock_dir=str(tmp_path)).acquire()
+    assert RunLock("run-2", lock_dir=str(tmp_path)).acquire()
+    first.release()
+    assert RunLock("run-1", lock_dir=str(tmp_path)).acquire()
@@ -0,0 +1,76 @@
+"""
+Unit tests for concurrent chunk-batch analysis in ai_service.
+analyze_chunk_batch is mocked — no LLM calls.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.ai_service import _analyze_batches_concurrently
+
+
+def _make_batches(n_batches: int, size: int = 3) -> list[list[dict]]:
+    return [
+        [{"chunk_index": b * size + i, "text": f"chunk {b * size + i}"} for i in range(size)]
+        for b in range(n_batches)
+    ]
+
+
+def _fake_analyze(chunks, run_id=None):
+    # Later batches finish first, so completion order is the reverse of batch order
+    time.sleep(0.02 * (10 - chunks[0]["chunk_index"] // 3))
+    return {
+        "characters": [],
+        "locations": [],
+        "chunk_analyses": [{"chunk_index": c["chunk_index"]} for c in chunks],
+    }
+
+
+def test_results_keep_batch_order():
+    batches = _make_batches(6)
+    with patch("app.services.ai_service.analyze_chunk_batch", side_effect=_fake_analyze):
+        results = _analyze_batches_concurrently(batches, run_id="r", concurrency=6)
+    indices = [ca["chunk_index"] for r in results for ca in r["chunk_analyses"]]
+    assert indices == list(range(18))
+
+
+def test_progress_callback_is_cumulative_and_complete():
+    batches = _make_batches(5)
+    calls: list[tuple[int, int]] = []
+    with patch("app.services.ai_service.analyze_chunk_batch", side_effect=_fake_analyze):
+        _analyze_batches_concurrently(batches, None, 3, progress_callback=lambda d, t: calls.append((d, t)))
+    assert [d for d, _ in calls] == [3, 6, 9, 12, 15]
+    assert all(t == 15 for _, t in calls)
+
+
+def test_concurrency_is_bounded():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _tracking(chunks, run_id=None):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return {"chunk_analyses": []}
+
+    with patch("app.services.ai_service.analyze_chunk_batch", side_effect=_tracking):
+        _analyze_batches_concurrently(_make_batches(8), None, 2)
+    assert peak <= 2
+
+
+def test_failing_batch_propagates():
+    def _boom(chunks, run_id=None):
+        if chunks[0]["chunk_index"] == 3:
+            raise RuntimeError("openai down")
+        return {"chunk_analyses": []}
+
+    with patch("app.services.ai_service.analyze_chunk_batch", side_effect=_boom):
+        with pytest.raises(RuntimeError):
+            _analyze_batches_concurrently(_make_batches(4), None, 2)
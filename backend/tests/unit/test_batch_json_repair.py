@@ -0,0 +1,68 @@
+"""
+Unit tests for truncated batch-analysis JSON: salvage of complete elements and
+split-retry of only the missing chunks. The OpenAI client is mocked.
+"""
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services import ai_service
+
+
+def _response(content: str, finish_reason: str = "stop"):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+        usage=SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2),
+    )
+
+
+def _full(indexes):
+    return json.dumps({
+        "characters": [{"name": "Alice"}],
+        "locations": [],
+        "chunk_analyses": [{"chunk_index": i, "action_level": 0.5} for i in indexes],
+    })
+
+
+def _chunks(n):
+    return [{"chunk_index": i, "text": f"Chunk {i}."} for i in range(n)]
+
+
+def _requested(call):
+    content = call.kwargs["messages"][1]["content"]
+    return [int(line.split()[2]) for line in content.splitlines() if line.startswith("--- CHUNK")]
+
+
+def test_parse_salvages_complete_elements_before_cut():
+    text = _full([0, 1, 2])
+    cut = text[: text.index('{"chunk_index": 2') + 20]
+    result, complete = ai_service.parse_batch_response(cut)
+    assert not complete
+    assert result["characters"] == [{"name": "Alice"}]
+    assert [ca["chunk_index"] for ca in result["chunk_analyses"]] == [0, 1]
+
+
+def test_truncated_batch_rerequests_only_missing_chunks():
+    text = _full([0, 1, 2, 3])
+    truncated = text[: text.index('{"chunk_index": 2') + 5]
+    with patch.object(ai_service, "_get_client") as client_mock:
+        create = client_mock.return_value.chat.completions.create
+        create.side_effect = [_response(truncated, "length"), _response(_full([2, 3]))]
+        result = ai_service.analyze_chunk_batch(_chunks(4))
+
+    assert [ca["chunk_index"] for ca in result["chunk_analyses"]] == [0, 1, 2, 3]
+    assert [_requested(c) for c in create.call_args_list] == [[0, 1, 2, 3], [2, 3]]
+
+
+def test_unrecoverable_response_is_split_and_retries_are_bounded():
+    with patch.object(ai_service, "_get_client") as client_mock:
+        create = client_mock.return_value.chat.completions.create
+        create.return_value = _response("{not json", "length")
+        result = ai_service.analyze_chunk_batch(_chunks(4))
+
+    assert result["chunk_analyses"] == []
+    calls = [_requested(c) for c in create.call_args_list]
+    assert calls[:3] == [[0, 1, 2, 3], [0, 1], [0]]
+    assert max(len(c) for c in calls[1:]) <= 2
+    # 1 + 2 + 4 + 4 calls: halves, quarters, then single chunks retried once more
+    assert len(calls) == 11
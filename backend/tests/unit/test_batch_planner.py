@@ -0,0 +1,75 @@
+"""
+Unit tests for batch_planner.plan_batches().
+Chunks carry precomputed token_count, so no tokenizer is needed.
+"""
+from app.services.batch_planner import (
+    OUTPUT_SAFETY_MARGIN,
+    chunk_token_count,
+    estimate_output_tokens,
+    plan_batches,
+    resolve_max_output_tokens,
+)
+
+
+def make_chunks(token_counts: list[int]) -> list[dict]:
+    return [
+        {"chunk_index": i, "text": "x", "token_count": t}
+        for i, t in enumerate(token_counts)
+    ]
+
+
+def test_preserves_order_and_covers_every_chunk():
+    chunks = make_chunks([2000] * 37 + [150])
+    batches = plan_batches(chunks)
+    flat = [c["chunk_index"] for b in batches for c in b]
+    assert flat == list(range(38))
+
+
+def test_respects_input_budget():
+    chunks = make_chunks([2000] * 30)
+    batches = plan_batches(chunks, max_input_tokens=8000, max_output_tokens=100000, max_chunks=100)
+    for b in batches:
+        assert sum(chunk_token_count(c) for c in b) <= 8000
+
+
+def test_respects_output_budget():
+    chunks = make_chunks([500] * 50)
+    max_output = 4096
+    batches = plan_batches(chunks, max_input_tokens=10**6, max_output_tokens=max_output, max_chunks=100)
+    for b in batches:
+        est = estimate_output_tokens([chunk_token_count(c) for c in b])
+        assert est <= max_output * OUTPUT_SAFETY_MARGIN
+
+
+def test_small_chunks_pack_into_fewer_calls_than_large():
+    small = plan_batches(make_chunks([200] * 40), max_input_tokens=20000, max_chunks=100)
+    large = plan_batches(make_chunks([2000] * 40), max_input_tokens=20000, max_chunks=100)
+    assert len(small) < len(large)
+
+
+def test_max_chunks_cap():
+    batches = plan_batches(make_chunks([10] * 25), max_chunks=7)
+    assert max(len(b) for b in batches) == 7
+
+
+def test_oversized_chunk_gets_own_batch():
+    batches = plan_batches(make_chunks([100, 90000, 100]), max_input_tokens=60000)
+    assert [len(b) for b in batches] == [1, 1, 1]
+
+
+def test_empty_input():
+    assert plan_batches([]) == []
+
+
+def test_output_budget_defaults_to_model_limit():
+    assert resolve_max_output_tokens("gpt-4o-mini") == 16384
+    assert resolve_max_output_tokens("gpt-4o-mini-2024-07-18") == 16384
+    assert resolve_max_output_tokens("gpt-4-0613") == 8192
+    assert resolve_max_output_tokens("gpt-4-turbo") == 4096
+    assert resolve_max_output_tokens("some-local-model") == 4096
+
+
+def test_configured_output_budget_is_clamped_to_model_limit():
+    assert resolve_max_output_tokens("gpt-4o-mini", 8000) == 8000
+    assert resolve_max_output_tokens("gpt-3.5-turbo", 16000) == 4096
+    assert resolve_max_output_tokens("some-local-model", 32000) == 32000
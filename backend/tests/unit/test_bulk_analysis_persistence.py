@@ -0,0 +1,144 @@
+"""
+Unit tests for the bulk persistence path of analysis results (entities, chunk links,
+scenes): rows and links come out as before, duplicates are skipped by
+ON CONFLICT DO NOTHING, and a whole book takes a few dozen statements.
+"""
+import json
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base
+from app.models import Character, ChunkCharacter, ChunkLocation, Location, Scene, SceneCharacter, SceneLocation
+from app.routers.books import _persist_chunk_links, _persist_entities, _persist_scenes
+
+N_CHUNKS = 300
+N_CHARS = 40
+N_LOCS = 25
+N_SCENES = 20
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _statements(engine) -> list[str]:
+    seen: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: seen.append(stmt))
+    return seen
+
+
+def _consolidated() -> dict:
+    return {
+        "main_characters": [
+            {
+                "name": f"Char {i}", "physical_description": "tall", "typical_emotions": ["calm", "wry"],
+                "is_main": i < 5, "ontology": {"entity_class": "human"} if i % 2 == 0 else None,
+                "entity_visual_tokens": {"core_tokens": ["red cloak"]},
+            }
+            for i in range(N_CHARS)
+        ],
+        "main_locations": [
+            {"name": f"Place {i}", "atmosphere": "misty", "is_main": i == 0} for i in range(N_LOCS)
+        ],
+        "known_adaptations": [{"title": "Film"}],
+        "tone_and_style": {"genre": "gothic", "mood": "dark", "visual_style": "ink"},
+    }
+
+
+def _analyses() -> list[dict]:
+    return [
+        {
+            "chunk_index": i,
+            # Duplicate mention in another case: must produce one link
+            "characters_present": [f"Char {i % N_CHARS}", f"char {i % N_CHARS}", f"Char {(i + 1) % N_CHARS}"],
+            "locations_present": [f"Place {i % N_LOCS}", "Nowhere"],
+        }
+        for i in range(N_CHUNKS)
+    ]
+
+
+def _scenes() -> list[dict]:
+    return [
+        {
+            "title": f"Scene {i}", "chunk_start_index": i * 10, "chunk_end_index": i * 10 + 5,
+            "characters_present": [f"Char {i}", f"CHAR {i}", "Stranger"], "primary_location": f"Place {i}",
+            "scene_visual_tokens": {"core_tokens": ["storm"]},
+        }
+        for i in range(N_SCENES)
+    ]
+
+
+def _seed_book(session_factory) -> tuple[int, dict[int, int]]:
+    db = session_factory()
+    book = crud.create_book(db, title="Bulk")
+    crud.create_chunks_batch(db, book.id, [{"chunk_index": i, "text": f"chunk {i}"} for i in range(N_CHUNKS)])
+    ids = {c.chunk_index: c.id for c in crud.get_chunks_by_book(db, book.id)}
+    db.close()
+    return book.id, ids
+
+
+def test_whole_book_persists_in_a_few_dozen_statements(engine, session_factory):
+    book_id, chunk_ids = _seed_book(session_factory)
+    statements = _statements(engine)
+
+    db = session_factory()
+    chars, locs = _persist_entities(db, book_id, _consolidated(), {"is_well_known": True})
+    _persist_chunk_links(db, chunk_ids, _analyses(), chars, locs)
+    _persist_scenes(db, book_id, _scenes(), chars, locs)
+    db.commit()
+    db.close()
+
+    assert len(statements) < 25, statements
+
+    db = session_factory()
+    assert db.query(Character).count() == N_CHARS
+    assert db.query(Location).count() == N_LOCS
+    hero = db.query(Character).filter(Character.name == "Char 0").one()
+    assert hero.is_main == 1 and hero.typical_emotions == "calm, wry"
+    assert json.loads(hero.ontology_json) == {"entity_class": "human"}
+    assert db.query(Character).filter(Character.name == "Char 1").one().ontology_json is None
+    assert db.query(ChunkCharacter).count() == 2 * N_CHUNKS
+    assert db.query(ChunkLocation).count() == N_CHUNKS
+    linked = [c.chunk_index for c in crud.get_chunks_for_character(db, chars["char 7"])]
+    assert linked == [i for i in range(N_CHUNKS) if i % N_CHARS in (6, 7)]
+    assert db.query(Scene).count() == N_SCENES
+    assert db.query(SceneCharacter).count() == N_SCENES
+    assert db.query(SceneLocation).count() == N_SCENES
+    scene = db.query(Scene).filter(Scene.title == "Scene 4").one()
+    assert [sc.character.name for sc in scene.scene_characters] == ["Char 4"]
+    assert [sl.location.name for sl in scene.scene_locations] == ["Place 4"]
+    assert json.loads(crud.get_book(db, book_id).known_adaptations_json) == [{"title": "Film"}]
+    assert crud.get_visual_bible(db, book_id).tone_description == "gothic | dark | ink"
+    db.close()
+
+
+def test_links_skip_existing_rows_and_scenes_are_replaced(session_factory):
+    book_id, chunk_ids = _seed_book(session_factory)
+    db = session_factory()
+    chars, locs = _persist_entities(db, book_id, _consolidated(), {})
+    _persist_chunk_links(db, chunk_ids, _analyses(), chars, locs)
+    _persist_scenes(db, book_id, _scenes(), chars, locs)
+    db.commit()
+
+    _persist_chunk_links(db, chunk_ids, _analyses(), chars, locs)  # all present already
+    _persist_scenes(db, book_id, _scenes()[:3], chars, locs)
+    db.commit()
+
+    assert db.query(ChunkCharacter).count() == 2 * N_CHUNKS
+    assert [s.title for s in db.query(Scene).order_by(Scene.id)] == ["Scene 0", "Scene 1", "Scene 2"]
+    assert db.query(SceneCharacter).count() == 3
+    assert db.query(SceneLocation).count() == 3
+    assert crud.get_book(db, book_id).known_adaptations_json is None  # not a well-known book
+    db.close()
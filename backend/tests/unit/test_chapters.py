@@ -0,0 +1,156 @@
+"""
+Unit tests for structure-aware ingestion: chapter detection (DOCX headings, PDF
+outline, heading lines), per-chapter chunking that never straddles a chapter, and
+batch planning that keeps chapters apart. The tiktoken encoder is replaced by a
+word/punctuation tokenizer.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.services import book_service
+from app.services.batch_planner import plan_batches
+from app.services.book_service import chunk_chapters, chunk_text
+from app.services.chapter_service import build_chapters, detect_chapters, heading_lines
+from app.services.text_store import attach_byte_spans, read_book_text
+from app.services.upload_service import process_saved_manuscript
+
+
+pytestmark = pytest.mark.usefixtures("word_encoder")
+
+
+def _para(tag, i, words=40):
+    return " ".join(f"{tag}p{i}w{j}" for j in range(words)) + "."
+
+
+def _book(chapters=3, paragraphs=5, front_matter=True):
+    parts = ["Copyright page.\n\nFor my family."] if front_matter else []
+    for c in range(1, chapters + 1):
+        parts.append(f"Chapter {c}")
+        parts.extend(_para(f"c{c}", i) for i in range(paragraphs))
+    return "\n\n".join(parts)
+
+
+def test_heading_lines_in_plain_text():
+    text = "Prologue\n\nIt began.\n\nCHAPTER IV: The Storm\n\nRain.\n\nSee chapter 4 below.\n\nГлава 3\n\nТекст."
+    assert [title for _, title in heading_lines(text)] == [
+        "Prologue", "CHAPTER IV: The Storm", "Глава 3",
+    ]
+    # Plain text needs a blank line before the heading
+    assert heading_lines("Some text\nChapter 2\n\nMore") == []
+    assert [t for _, t in heading_lines("Some text\nChapter 2\n\nMore", blank_line_before=False)] == ["Chapter 2"]
+
+
+def test_build_chapters_covers_text_contiguously():
+    text = _book()
+    chapters = detect_chapters(text)
+
+    assert [c["title"] for c in chapters] == [None, "Chapter 1", "Chapter 2", "Chapter 3"]
+    assert [c["chapter_index"] for c in chapters] == [0, 1, 2, 3]
+    assert chapters[0]["start_char"] == 0
+    assert chapters[-1]["end_char"] == len(text)
+    for prev, nxt in zip(chapters, chapters[1:]):
+        assert prev["end_char"] == nxt["start_char"]
+        assert nxt["start_word"] == prev["start_word"] + prev["word_count"]
+    for ch in chapters:
+        assert ch["start_word"] == len(text[:ch["start_char"]].split())
+        assert ch["word_count"] == len(text[ch["start_char"]:ch["end_char"]].split())
+
+
+def test_no_front_matter_chapter_when_text_starts_with_heading():
+    chapters = detect_chapters(_book(front_matter=False))
+    assert [c["title"] for c in chapters] == ["Chapter 1", "Chapter 2", "Chapter 3"]
+    assert chapters[0]["start_char"] == 0
+
+
+def test_crlf_upload_keeps_chapters_and_byte_spans(tmp_path):
+    upload = tmp_path / "upload.txt"
+    upload.write_bytes(_book(front_matter=False).replace("\n", "\r\n").encode("utf-8"))
+    text, metadata = process_saved_manuscript(str(upload), "book.txt")
+
+    assert "\r" not in text
+    chapters = metadata["chapters"]
+    assert [c["title"] for c in chapters] == ["Chapter 1", "Chapter 2", "Chapter 3"]
+
+    # Saved as the upload route does; chunking reads it back with the same positions
+    stored = tmp_path / "stored.txt"
+    with open(stored, "w", encoding="utf-8") as f:
+        f.write(text)
+    read, offsets_valid = read_book_text(str(stored))
+    assert (read, offsets_valid) == (text, True)
+    for ch in chapters:
+        assert read[ch["start_char"]:].startswith(ch["title"])
+    chunks = chunk_chapters(read, chapters, target_tokens=100, overlap_tokens=45)
+    assert attach_byte_spans(read, chunks) == len(chunks)
+
+
+def test_single_heading_is_no_structure():
+    assert detect_chapters(_book(chapters=1)) == []
+    assert build_chapters("text", []) == []
+
+
+def test_docx_headings_use_shallowest_repeated_level():
+    text = "My Novel\nPart One\nChapter text one\nA scene\nMore\nPart Two\nChapter text two"
+    headings = [
+        {"title": "My Novel", "level": 0, "word_offset": 0},
+        {"title": "Part One", "level": 1, "word_offset": 2},
+        {"title": "A scene", "level": 2, "word_offset": 7},
+        {"title": "Part Two", "level": 1, "word_offset": 10},
+    ]
+    chapters = detect_chapters(text, headings=headings, plain_text=False)
+
+    assert [c["title"] for c in chapters] == [None, "Part One", "Part Two"]
+    assert text[chapters[1]["start_char"]:].startswith("Part One")
+    assert text[chapters[2]["start_char"]:].startswith("Part Two")
+
+
+def test_pdf_outline_maps_to_page_starts():
+    pages = ["Title page", "Beginning of the story", "middle", "The End part"]
+    text = "\n\n".join(pages)
+    page_word_starts = [0, 2, 6, 7]
+    outline = [{"title": "Opening", "page": 1}, {"title": "Finale", "page": 3}, {"title": "Bad", "page": 9}]
+    chapters = detect_chapters(text, pdf_outline=outline, page_word_starts=page_word_starts, plain_text=False)
+
+    assert [(c["title"], c["start_word"]) for c in chapters] == [(None, 0), ("Opening", 2), ("Finale", 7)]
+    assert text[chapters[2]["start_char"]:] == "The End part"
+
+
+def test_chunk_chapters_never_straddles_a_chapter():
+    text = _book(chapters=3, paragraphs=5)
+    chapters = detect_chapters(text)
+    chunks = chunk_chapters(text, chapters, target_tokens=100, overlap_tokens=45)
+
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        ch = chapters[chunk["chapter_index"]]
+        assert chunk["text"] in text[ch["start_char"]:ch["end_char"]]
+    assert {c["chapter_index"] for c in chunks} == {0, 1, 2, 3}
+    # Chapter chunks keep the page numbers of the full text
+    whole = chunk_text(text, target_tokens=100, overlap_tokens=45)
+    assert chunks[-1]["end_page"] == whole[-1]["end_page"]
+    assert sum(c["word_count"] for c in chunks) >= len(text.split())
+
+
+def test_chunk_chapters_parallel_matches_serial():
+    text = _book(chapters=4, paragraphs=8)
+    chapters = detect_chapters(text)
+    serial = chunk_chapters(text, chapters, target_tokens=100, overlap_tokens=45, min_chars=10**9)
+    with patch.object(book_service, "_SEGMENT_CHARS", 500), ThreadPoolExecutor(2) as pool:
+        parallel = chunk_chapters(
+            text, chapters, target_tokens=100, overlap_tokens=45, min_chars=0, executor=pool,
+        )
+    assert parallel == serial
+
+
+def test_batches_do_not_cross_chapters():
+    chunks = [
+        {"chunk_index": i, "text": "x", "token_count": 10, "chapter_index": i // 3}
+        for i in range(7)
+    ]
+    batches = plan_batches(chunks, max_chunks=20)
+    assert [[c["chunk_index"] for c in b] for b in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    # Chunks without chapters are packed as before
+    for c in chunks:
+        c["chapter_index"] = None
+    assert len(plan_batches(chunks, max_chunks=20)) == 1
@@ -0,0 +1,85 @@
+"""
+Unit tests for the content-addressed chunk analysis cache: only edited chunks are
+re-analysed, batches are re-planned around cache hits, and fresh runs bypass it.
+LLM calls are mocked.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.services import ai_service
+from app.services.analysis_store import ChunkAnalysisCache, assemble_batch_result, split_batch_result
+
+
+@pytest.fixture()
+def cache():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield ChunkAnalysisCache(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    engine.dispose()
+
+
+def _chunks(edited: dict[int, str] | None = None) -> list[dict]:
+    edited = edited or {}
+    return [
+        {"chunk_index": i, "text": edited.get(i, f"Chunk number {i}."), "token_count": 5}
+        for i in range(6)
+    ]
+
+
+def _fake_batch(chunks, run_id=None):
+    return {
+        "characters": [{"name": f"Hero {c['chunk_index']}"} for c in chunks],
+        "locations": [{"name": "Unlisted place"}],
+        "chunk_analyses": [
+            {"chunk_index": c["chunk_index"], "action_level": 0.5,
+             "characters_present": [f"Hero {c['chunk_index']}"]}
+            for c in chunks
+        ],
+    }
+
+
+def _run(chunks, cache, **kwargs):
+    with patch.object(ai_service, "analyze_chunk_batch", side_effect=_fake_batch) as batch_mock, \
+            patch.object(ai_service, "consolidate_results", return_value={"main_characters": []}), \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.batch_planner.BATCH_MAX_CHUNKS", 2), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]):
+        result = ai_service.run_full_analysis(chunks, scene_count=0, chunk_cache=cache, **kwargs)
+    sent = sorted(c["chunk_index"] for call in batch_mock.call_args_list for c in call.args[0])
+    return result, sent, batch_mock
+
+
+def test_split_and_assemble_round_trip():
+    result = _fake_batch(_chunks()[:2])
+    entries = split_batch_result(result)
+    assert [c["name"] for c in entries[1]["characters"]] == ["Hero 1"]
+    # Entities no chunk lists stay with the first chunk
+    assert entries[0]["locations"] == [{"name": "Unlisted place"}]
+    assert assemble_batch_result(entries)["chunk_analyses"] == result["chunk_analyses"]
+
+
+def test_only_edited_chunks_are_reanalysed(cache):
+    _, sent, _ = _run(_chunks(), cache)
+    assert sent == [0, 1, 2, 3, 4, 5]
+
+    result, sent, _ = _run(_chunks({3: "Chunk number 3, typo fixed."}), cache)
+    assert sent == [3]
+    assert [ca["chunk_index"] for ca in result["chunk_analyses"]] == [0, 1, 2, 3, 4, 5]
+    assert {ca["chunk_index"] for ca in result["chunk_analyses"] if "dramatic_score" in ca} == set(range(6))
+
+
+def test_fresh_run_skips_cache_and_busts_prompts(cache):
+    _run(_chunks(), cache)
+    _, sent, batch_mock = _run(_chunks(), cache, fresh=True, analysis_run_id="run-x")
+    assert sent == [0, 1, 2, 3, 4, 5]
+    assert {call.kwargs["run_id"] for call in batch_mock.call_args_list} == {"run-x"}
+
+    _, sent, _ = _run(_chunks(), cache, analysis_run_id="run-y")
+    assert sent == []
@@ -0,0 +1,87 @@
+"""
+Unit tests for the streaming chunker (book_service.iter_chunks / chunk_text):
+chunk boundaries, paragraph overlap, oversized-paragraph splitting, lazy output and
+the segment-parallel path. The tiktoken encoder is replaced by a word/punctuation
+tokenizer.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.services import book_service
+from app.services.book_service import chunk_text, chunk_text_parallel, iter_chunks
+
+
+pytestmark = pytest.mark.usefixtures("word_encoder")
+
+
+def _para(i, words=40):
+    return " ".join(f"p{i}w{j}" for j in range(words)) + "."
+
+
+def test_paragraphs_are_packed_with_overlap():
+    text = "\n\n".join(_para(i) for i in range(10))
+    chunks = chunk_text(text, target_tokens=100, overlap_tokens=45)
+
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert all(c["word_count"] == len(c["text"].split()) for c in chunks)
+    # 41 tokens per paragraph: two fit a chunk, the last one carries over
+    assert chunks[0]["text"] == "\n\n".join([_para(0), _para(1)])
+    assert chunks[1]["text"].startswith(_para(1))
+
+
+def test_oversized_paragraph_is_split_on_sentences(word_encoder):
+    big = " ".join(f"Sentence number {i} is here." for i in range(60))
+    text = "\n\n".join([_para(0), big, _para(1)])
+    chunks = chunk_text(text, target_tokens=50, overlap_tokens=10)
+
+    assert chunks[0]["text"] == _para(0)
+    assert all(len(word_encoder.encode(c["text"])) <= 50 for c in chunks[1:-1])
+    assert chunks[-1]["text"] == _para(1)
+    assert chunks[-1]["start_page"] >= chunks[0]["start_page"]
+
+
+def test_iter_chunks_yields_lazily():
+    text = "\n\n".join(_para(i) for i in range(5))
+    gen = iter_chunks(text, target_tokens=50, overlap_tokens=0)
+    first = next(gen)
+    assert first == {
+        "chunk_index": 0, "text": _para(0), "start_page": 1, "end_page": 1, "word_count": 40,
+        "start_char": 0, "end_char": len(_para(0)),
+    }
+    assert len(list(gen)) == 4
+
+
+def test_parallel_chunking_matches_serial():
+    big = " ".join(f"Sentence number {i} is here." for i in range(60))
+    text = "\n\n".join(big if i % 7 == 3 else _para(i, 10 + i % 30) for i in range(80))
+    serial = chunk_text(text, target_tokens=120, overlap_tokens=30)
+
+    # Segments of a few paragraphs each, so chunks and overlaps straddle segment edges
+    with patch.object(book_service, "_SEGMENT_CHARS", 500), ThreadPoolExecutor(4) as pool:
+        parallel = chunk_text_parallel(
+            text, target_tokens=120, overlap_tokens=30, min_chars=0, executor=pool,
+        )
+    assert parallel == serial
+
+
+def test_parallel_chunking_uses_serial_path_for_small_texts():
+    text = "\n\n".join(_para(i) for i in range(3))
+    with patch.object(book_service, "_get_chunk_pool") as pool_mock:
+        chunks = chunk_text_parallel(text, target_tokens=50, overlap_tokens=0, min_chars=10_000)
+    pool_mock.assert_not_called()
+    assert chunks == chunk_text(text, target_tokens=50, overlap_tokens=0)
+
+
+def test_real_page_boundaries_map_chunks_to_pdf_pages():
+    text = "\n\n".join(_para(i, 20) for i in range(6))  # 20 words each
+    # Page 1: paragraphs 0-1, page 2 has no text, page 3: 2-4, page 4: 5
+    page_word_starts = [0, 40, 40, 100]
+    single = chunk_text(text, target_tokens=21, overlap_tokens=0, page_word_starts=page_word_starts)
+    assert [(c["start_page"], c["end_page"]) for c in single] == [
+        (1, 1), (1, 1), (3, 3), (3, 3), (3, 3), (4, 4),
+    ]
+    # Two paragraphs per chunk: the last chunk spans pages 3-4
+    paired = chunk_text(text, target_tokens=42, overlap_tokens=0, page_word_starts=page_word_starts)
+    assert [(c["start_page"], c["end_page"]) for c in paired] == [(1, 1), (3, 3), (3, 4)]
@@ -0,0 +1,89 @@
+"""
+Unit tests for CompressedText columns: round trip, small values left as TEXT,
+rows written before compression still readable, and the one-off migration that
+compresses them.
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, database
+from app.database import Base
+from app.models import COMPRESS_MIN_BYTES, Chunk, compress_text, decompress_text
+
+VISUAL = json.dumps({
+    "visual_layers": {"subject": "a lantern in the storm " * 8, "mood": "ominous"},
+    "visual_tokens": {"core_tokens": ["glowing lantern", "crimson cloak"] * 6},
+})
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _stored(engine, column="visual_analysis_json"):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT typeof({column}), {column} FROM chunks")).all()
+
+
+def test_round_trip_and_small_values():
+    assert compress_text("short") == "short"
+    assert compress_text("x" * (COMPRESS_MIN_BYTES - 1)) == "x" * (COMPRESS_MIN_BYTES - 1)
+    packed = compress_text(VISUAL)
+    assert isinstance(packed, bytes) and len(packed) < len(VISUAL) / 2
+    assert decompress_text(packed) == VISUAL
+    assert decompress_text("legacy plain text") == "legacy plain text"
+    assert decompress_text(None) is None
+    with pytest.raises(ValueError):
+        decompress_text(b"\x7fgarbage")
+
+
+def test_orm_stores_blob_and_reads_text(engine):
+    db = sessionmaker(bind=engine)()
+    book = crud.create_book(db, title="Compressed")
+    crud.create_chunks_batch(db, book.id, [{"chunk_index": 0, "text": "Chunk " * 100}])
+    chunk = crud.get_chunks_by_book(db, book.id)[0]
+    chunk.visual_analysis_json = VISUAL
+    db.commit()
+    db.close()
+
+    assert [row[0] for row in _stored(engine)] == ["blob"]
+    assert [row[0] for row in _stored(engine, "text")] == ["blob"]
+    db = sessionmaker(bind=engine)()
+    chunk = db.query(Chunk).one()
+    assert chunk.visual_analysis_json == VISUAL
+    assert chunk.text == "Chunk " * 100
+    db.close()
+
+
+def test_migration_compresses_existing_rows_once(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO books (id, title) VALUES (1, 'Old')"))
+        conn.execute(
+            text("INSERT INTO chunks (book_id, chunk_index, text, visual_analysis_json) VALUES (1, :i, :t, :v)"),
+            [{"i": i, "t": f"chunk {i}", "v": VISUAL} for i in range(3)],
+        )
+
+    with patch.object(database, "engine", engine), patch.object(database, "_COMPRESS_BATCH_ROWS", 2):
+        database._compress_text_columns()
+        assert [row[0] for row in _stored(engine)] == ["blob"] * 3
+        assert [row[0] for row in _stored(engine, "text")] == ["text"] * 3  # below COMPRESS_MIN_BYTES
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA user_version")).scalar() == database._COMPRESSED_SCHEMA_VERSION
+
+        # Marked done: plain rows written later by old code are left alone
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE chunks SET visual_analysis_json = :v"), {"v": VISUAL})
+        database._compress_text_columns()
+        assert [row[0] for row in _stored(engine)] == ["text"] * 3
+
+    db = sessionmaker(bind=engine)()
+    assert [c.visual_analysis_json for c in db.query(Chunk)] == [VISUAL] * 3
+    db.close()
@@ -0,0 +1,174 @@
+"""
+Unit tests for the single-writer queue (app.services.db_writer): queued jobs are
+merged into few transactions, flush() is a barrier, a failing job fails only its own
+Future, and the analysis stores and reference-image search write through it.
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base
+from app.models import Chunk, ReferenceImage, SearchQuery
+from app.routers.visual_bible import _persist_reference_images
+from app.services.analysis_store import ChunkAnalysisCache, CheckpointStore
+from app.services.db_writer import DbWriter, get_db_writer, shutdown_db_writer
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture()
+def book_id(session_factory):
+    db = session_factory()
+    book = crud.create_book(db, title="Writer")
+    db.close()
+    return book.id
+
+
+def _log_query(book_id: int, text: str):
+    def job(db):
+        crud.create_search_query(
+            db, book_id=book_id, entity_type="character", entity_name="Ann", query_text=text, commit=False,
+        )
+        return text
+    return job
+
+
+def _queries(session_factory) -> list[str]:
+    db = session_factory()
+    try:
+        return sorted(q.query_text for q in db.query(SearchQuery))
+    finally:
+        db.close()
+
+
+def test_queued_jobs_share_transactions_and_flush_is_a_barrier(session_factory, book_id):
+    writer = DbWriter(session_factory, max_batch=500, linger_ms=50)
+    gate = threading.Event()
+    blocker = writer.submit(lambda db: gate.wait(5))
+    futures = [writer.submit(_log_query(book_id, f"q{i:02d}")) for i in range(40)]
+    gate.set()
+    writer.flush(timeout=5)
+
+    assert blocker.done()
+    assert [f.result() for f in futures] == [f"q{i:02d}" for i in range(40)]
+    assert _queries(session_factory) == [f"q{i:02d}" for i in range(40)]
+    assert writer.commits <= 3  # blocker + one or two merged batches, not 40
+    writer.close()
+
+
+def test_failing_job_fails_only_its_own_future(session_factory, book_id):
+    writer = DbWriter(session_factory, max_batch=500, linger_ms=50)
+    gate = threading.Event()
+    writer.submit(lambda db: gate.wait(5))
+    good = [writer.submit(_log_query(book_id, f"ok{i}")) for i in range(3)]
+
+    def bad(db):
+        _log_query(book_id, "rolled back")(db)
+        raise ValueError("boom")
+
+    failed = writer.submit(bad)
+    good.append(writer.submit(_log_query(book_id, "ok3")))
+    gate.set()
+
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    assert [f.result(timeout=5) for f in good] == ["ok0", "ok1", "ok2", "ok3"]
+    assert _queries(session_factory) == ["ok0", "ok1", "ok2", "ok3"]
+    writer.close()
+
+
+def test_jobs_of_a_batch_see_earlier_jobs_rows(session_factory):
+    writer = DbWriter(session_factory, max_batch=500, linger_ms=50)
+    gate = threading.Event()
+    writer.submit(lambda db: gate.wait(5))
+    first = writer.submit(lambda db: crud.save_analysis_checkpoint(db, "run", "stage", b"1", commit=False))
+    second = writer.submit(lambda db: crud.save_analysis_checkpoint(db, "run", "stage", b"2", commit=False))
+    gate.set()
+    first.result(timeout=5)
+    second.result(timeout=5)  # an update of the row added by the first job, no unique violation
+
+    db = session_factory()
+    assert crud.get_analysis_checkpoints(db, "run") == {"stage": b"2"}
+    db.close()
+    writer.close()
+
+
+def test_close_writes_queued_jobs_and_rejects_new_ones(session_factory, book_id):
+    writer = DbWriter(session_factory, linger_ms=0)
+    futures = [writer.submit(_log_query(book_id, f"q{i}")) for i in range(5)]
+    writer.close(timeout=5)
+    assert all(f.done() and f.exception() is None for f in futures)
+    with pytest.raises(RuntimeError):
+        writer.submit(_log_query(book_id, "late"))
+
+
+def test_analysis_stores_write_through_writer(session_factory, book_id):
+    writer = DbWriter(session_factory)
+    store = CheckpointStore("run-1", session_factory=session_factory, writer=writer)
+    store.put("consolidation", {"main_characters": [{"name": "Ann"}]})
+    cache = ChunkAnalysisCache(session_factory, writer=writer)
+    cache.put_many({"k" * 64: {"analysis": {"dramatic_score": 0.5}}})
+
+    reopened = CheckpointStore("run-1", session_factory=session_factory)
+    assert reopened.get("consolidation") == {"main_characters": [{"name": "Ann"}]}
+    assert ChunkAnalysisCache(session_factory).get_many(["k" * 64]) == {"k" * 64: {"analysis": {"dramatic_score": 0.5}}}
+    assert writer.commits == 2
+    writer.close()
+
+
+def test_bulk_chunk_analysis_update(session_factory, book_id):
+    db = session_factory()
+    crud.create_chunks_batch(db, book_id, [{"chunk_index": i, "text": f"chunk {i}"} for i in range(3)])
+    ids = [c.id for c in crud.get_chunks_by_book(db, book_id)]
+    db.close()
+
+    writer = DbWriter(session_factory)
+    rows = [
+        {"id": ids[0], "dramatic_score": 0.9, "visual_analysis_json": '{"visual_layers": {}}'},
+        {"id": ids[2], "dramatic_score": 0.1},
+    ]
+    assert writer.write(lambda w: crud.update_chunks_analysis(w, rows, commit=False)) == 2
+    writer.close()
+
+    db = session_factory()
+    chunks = db.query(Chunk).order_by(Chunk.chunk_index).all()
+    assert [c.dramatic_score for c in chunks] == [0.9, None, 0.1]
+    assert chunks[0].visual_analysis_json == '{"visual_layers": {}}'
+    assert chunks[0].text == "chunk 0"
+    db.close()
+
+
+def test_reference_images_are_deduplicated_within_one_write(session_factory, book_id):
+    db = session_factory()
+    char_id = crud.create_character(db, book_id=book_id, name="Ann").id
+    db.close()
+    images = [{"url": "https://img/1.jpg"}, {"url": "https://img/2.jpg"}, {"url": "https://img/1.jpg"}]
+
+    writer = DbWriter(session_factory)
+    pools = [("character", char_id, images, "serpapi")]
+    writer.write(lambda w: _persist_reference_images(w, book_id, pools))
+    writer.write(lambda w: _persist_reference_images(w, book_id, pools))  # all present already
+    writer.close()
+
+    db = session_factory()
+    assert sorted(r.url for r in db.query(ReferenceImage)) == ["https://img/1.jpg", "https://img/2.jpg"]
+    db.close()
+
+
+def test_one_writer_per_engine(session_factory):
+    bind = session_factory.kw["bind"]
+    try:
+        assert get_db_writer(bind) is get_db_writer(bind)
+        assert get_db_writer(bind) is not get_db_writer()
+        assert get_db_writer(bind).session_factory.kw["bind"] is bind  # stores read where it writes
+    finally:
+        shutdown_db_writer()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the streaming DOCX extractor: text parity with python-docx,
+heading levels, run-level semantics (hyperlinks, breaks, tables) and flat memory
+on large documents.
+"""
+import tracemalloc
+import zipfile
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+from app.services.upload_service import extract_docx_structure, iter_docx_paragraphs
+
+_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def _write_raw_docx(path, body_xml: str) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("word/document.xml", f"<w:document {_NS}><w:body>{body_xml}</w:body></w:document>")
+
+
+def test_text_matches_python_docx_and_keeps_headings(tmp_path):
+    doc = Document()
+    doc.add_heading("The Book", level=0)
+    doc.add_heading("Chapter One", level=1)
+    p = doc.add_paragraph("It was a dark\tnight.")
+    p.add_run(" Line").add_break()
+    p.add_run("two").add_break(WD_BREAK.PAGE)
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "table text is not a body paragraph"
+    doc.add_paragraph("")
+    doc.add_heading("A Section", level=2)
+    doc.add_paragraph("More words here.")
+    path = tmp_path / "book.docx"
+    doc.save(path)
+
+    text, headings = extract_docx_structure(str(path))
+
+    assert text == "\n".join(p.text for p in Document(str(path)).paragraphs)
+    assert headings == [
+        {"title": "The Book", "level": 0, "word_offset": 0},
+        {"title": "Chapter One", "level": 1, "word_offset": 2},
+        {"title": "A Section", "level": 2, "word_offset": 11},
+    ]
+
+
+def test_run_semantics_follow_python_docx(tmp_path):
+    path = tmp_path / "raw.docx"
+    _write_raw_docx(path, (
+        '<w:p><w:pPr><w:outlineLvl w:val="2"/></w:pPr><w:r><w:t>Part</w:t></w:r></w:p>'
+        '<w:p><w:r><w:t xml:space="preserve">See </w:t></w:r>'
+        '<w:hyperlink><w:r><w:t>link</w:t></w:r></w:hyperlink>'
+        '<w:ins><w:r><w:t>inserted</w:t></w:r></w:ins>'
+        '<w:r><w:noBreakHyphen/><w:cr/><w:br w:type="column"/><w:t>end</w:t></w:r></w:p>'
+    ))
+    assert list(iter_docx_paragraphs(str(path))) == [("Part", 3), ("See link-\nend", None)]
+
+
+def test_memory_stays_flat_on_large_documents(tmp_path):
+    para = '<w:p><w:r><w:t>' + "word " * 40 + '</w:t></w:r></w:p>'
+    path = tmp_path / "big.docx"
+    _write_raw_docx(path, para * 40_000)  # ~9 MB of document.xml
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_docx_paragraphs(str(path)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 40_000
+    assert peak < 2 * 1024 * 1024
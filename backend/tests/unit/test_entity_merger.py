@@ -0,0 +1,61 @@
+"""
+Unit tests for entity_merger: alias resolution and the deterministic pre-merge
+that runs between the batch loop and consolidation.
+"""
+from app.services.entity_merger import name_tokens, premerge_entities, resolve_aliases
+
+
+def test_name_tokens_strip_titles_punctuation_and_case():
+    assert name_tokens("Mr. Sherlock Holmes") == ("sherlock", "holmes")
+    assert name_tokens("Доктор Ватсон") == ("ватсон",)
+    assert name_tokens("Пётр") == name_tokens("петр")
+
+
+def test_variants_resolve_to_most_complete_name():
+    aliases = resolve_aliases({
+        "Holmes": 5, "Sherlock Holmes": 3, "Mr. Holmes": 2, "Sherlok Holmes": 1,
+        "Watson": 6, "Dr. Watson": 3, "John Watson": 1,
+    })
+    assert {aliases[n] for n in ("Holmes", "Mr. Holmes", "Sherlok Holmes")} == {"Sherlock Holmes"}
+    assert {aliases[n] for n in ("Watson", "Dr. Watson")} == {"John Watson"}
+
+
+def test_ambiguous_or_conflicting_names_stay_apart():
+    aliases = resolve_aliases({"Holmes": 2, "Sherlock Holmes": 3, "Mycroft Holmes": 1})
+    assert aliases["Holmes"] == "Holmes"
+
+    aliases = resolve_aliases({"Mr. Hudson": 1, "Mrs. Hudson": 4})
+    assert aliases["Mr. Hudson"] != aliases["Mrs. Hudson"]
+
+    # Always listed side by side in the same chunks -> two different people
+    aliases = resolve_aliases(
+        {"Anna": 3, "Anna Karenina": 3},
+        {"Anna": {1, 2, 3}, "Anna Karenina": {1, 2, 3}},
+    )
+    assert aliases["Anna"] == "Anna"
+
+
+def test_premerge_folds_duplicates_and_rewrites_chunk_names():
+    batches = [
+        {"characters": [{"name": "Holmes", "physical_description": "tall, thin"}], "locations": [
+            {"name": "Baker Street", "visual_description": "foggy street"}]},
+        {"characters": [
+            {"name": "Sherlock Holmes", "physical_description": "hawk-like nose"},
+            {"name": "Watson", "physical_description": "moustache"},
+        ], "locations": [{"name": "baker street", "visual_description": "foggy street"}]},
+    ]
+    chunk_analyses = [
+        {"chunk_index": 0, "characters_present": ["Holmes"], "locations_present": ["Baker Street"]},
+        {"chunk_index": 1, "characters_present": ["Sherlock Holmes", "Watson"], "locations_present": []},
+    ]
+    merged, report = premerge_entities(batches, chunk_analyses)
+
+    assert merged[0]["characters"][0]["name"] == "Sherlock Holmes"
+    assert merged[0]["characters"][0]["mentions"] == 2
+    assert "hawk-like nose" in merged[0]["characters"][0]["physical_description"]
+    assert [c["name"] for c in merged[1]["characters"]] == ["Watson"]
+    assert merged[1]["locations"] == []
+    assert chunk_analyses[0]["characters_present"] == ["Sherlock Holmes"]
+    assert report["characters_before"] == 3 and report["characters_after"] == 2
+    assert report["alias_groups"]["characters"] == {"Sherlock Holmes": ["Holmes"]}
+    assert report["prompt_chars_saved"] > 0
@@ -0,0 +1,88 @@
+"""
+Unit tests for extraction_pool: text comes back from the worker process, parser
+errors surface as UploadError, a hung job is killed at the timeout, and PDFs are
+extracted page-parallel with their real page boundaries. Uses real spawned processes.
+"""
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services import extraction_pool
+from app.services.extraction_pool import _page_ranges, extract_pdf_pages_isolated, extract_text_isolated
+from app.services.upload_service import UploadError, join_pdf_pages
+
+
+def _write_pdf(path, pages: list[str]) -> None:
+    """Minimal PDF with one line of Helvetica text per page ('' = blank page)."""
+    n = len(pages)
+    font_id = 3 + 2 * n
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET" if text else ""
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def test_text_is_extracted_in_worker(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_text("Chapter One\n\nIt was a dark night.", encoding="utf-8")
+    assert extract_text_isolated(str(path), ".txt") == "Chapter One\n\nIt was a dark night."
+
+
+def test_parser_errors_become_upload_errors(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4 definitely not a pdf")
+    with pytest.raises(UploadError):
+        extract_text_isolated(str(path), ".pdf")
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs a FIFO to block the worker")
+def test_hung_extraction_is_killed_at_timeout(tmp_path):
+    fifo = tmp_path / "never_written.txt"
+    os.mkfifo(fifo)  # open() blocks forever: no writer
+    start = time.perf_counter()
+    with pytest.raises(UploadError, match="too long"):
+        extract_text_isolated(str(fifo), ".txt", timeout=2)
+    assert time.perf_counter() - start < 10
+
+
+def test_page_ranges_are_contiguous_and_bounded():
+    assert _page_ranges(10, processes=4, min_pages=25) == [(0, 10)]
+    assert _page_ranges(500, processes=4, min_pages=25) == [(0, 125), (125, 250), (250, 375), (375, 500)]
+    assert _page_ranges(7, processes=3, min_pages=1) == [(0, 3), (3, 6), (6, 7)]
+
+
+def test_pdf_pages_extracted_in_parallel_keep_page_boundaries(tmp_path):
+    pages = [f"Page {i} words of the manuscript text here" if i != 2 else "" for i in range(7)]
+    path = tmp_path / "book.pdf"
+    _write_pdf(path, pages)
+
+    with patch.object(extraction_pool, "PDF_PAGE_PROCESSES", 3), \
+            patch.object(extraction_pool, "PDF_MIN_PAGES_PER_PROCESS", 1):
+        extracted, outline = extract_pdf_pages_isolated(str(path))
+
+    assert [t.strip() for t in extracted] == pages
+    assert outline == []
+    text, page_word_starts = join_pdf_pages(extracted)
+    assert page_word_starts == [0, 8, 16, 16, 24, 32, 40]
+    assert len(text.split()) == 48
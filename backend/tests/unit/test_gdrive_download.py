@@ -0,0 +1,139 @@
+"""
+Unit tests for the streamed Google Drive import (book_service.download_to_file /
+download_text_from_google_drive): early size cutoff, Range resume after a dropped
+connection, and the content checks. HTTP is served by httpx.MockTransport.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from app.services.book_service import download_text_from_google_drive, download_to_file
+
+LINK = "https://drive.google.com/file/d/abc123/view"
+BODY = ("Chapter 1\n\nIt was a dark and stormy night. " * 200).encode("utf-8")
+
+
+class _Stream(httpx.AsyncByteStream):
+    """Body in blocks of *block* bytes; raises ReadError after *fail_after* bytes."""
+
+    def __init__(self, data, block=1024, fail_after=None):
+        self.data, self.block, self.fail_after = data, block, fail_after
+        self.sent = 0
+
+    async def __aiter__(self):
+        for i in range(0, len(self.data), self.block):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise httpx.ReadError("connection reset")
+            self.sent += len(self.data[i:i + self.block])
+            yield self.data[i:i + self.block]
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _download(handler, tmp_path, **kwargs):
+    async def run():
+        async with _client(handler) as client:
+            return await download_to_file("https://example.test/f", str(tmp_path / "f.part"), client=client, **kwargs)
+    return asyncio.run(run())
+
+
+def test_download_streams_to_file(tmp_path):
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/plain"}, stream=_Stream(BODY))
+
+    _download(handler, tmp_path, max_bytes=len(BODY))
+    assert (tmp_path / "f.part").read_bytes() == BODY
+
+
+def test_oversized_download_stops_at_limit(tmp_path):
+    stream = _Stream(BODY * 100, block=4096)
+
+    def handler(request):
+        return httpx.Response(200, stream=stream)  # no Content-Length
+
+    with pytest.raises(RuntimeError, match="limit"):
+        _download(handler, tmp_path, max_bytes=16 * 1024)
+    assert stream.sent <= 16 * 1024 + 4096
+    assert not os.path.exists(tmp_path / "f.part")
+
+
+def test_content_length_over_limit_is_rejected_before_reading(tmp_path):
+    stream = _Stream(BODY)
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-length": str(len(BODY))}, stream=stream)
+
+    with pytest.raises(RuntimeError, match="limit"):
+        _download(handler, tmp_path, max_bytes=100)
+    assert stream.sent == 0
+
+
+def test_interrupted_download_resumes_with_range(tmp_path):
+    ranges = []
+
+    def handler(request):
+        ranges.append(request.headers.get("range"))
+        if len(ranges) == 1:
+            return httpx.Response(200, stream=_Stream(BODY, fail_after=3072))
+        start = int(request.headers["range"][len("bytes="):-1])
+        return httpx.Response(
+            206,
+            headers={"content-range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"},
+            stream=_Stream(BODY[start:]),
+        )
+
+    _download(handler, tmp_path, retries=2)
+    assert ranges == [None, "bytes=3072-"]
+    assert (tmp_path / "f.part").read_bytes() == BODY
+
+
+def test_server_without_range_support_restarts(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request.headers.get("range"))
+        fail_after = 2048 if len(calls) == 1 else None
+        return httpx.Response(200, stream=_Stream(BODY, fail_after=fail_after))
+
+    _download(handler, tmp_path, retries=1)
+    assert calls == [None, "bytes=2048-"]
+    assert (tmp_path / "f.part").read_bytes() == BODY
+
+
+def test_gives_up_after_retries(tmp_path):
+    def handler(request):
+        return httpx.Response(200, stream=_Stream(BODY, fail_after=0))
+
+    with pytest.raises(RuntimeError, match="failed"):
+        _download(handler, tmp_path, retries=2)
+    assert not os.path.exists(tmp_path / "f.part")
+
+
+def test_download_text_decodes_and_checks_content():
+    def handler(request):
+        assert request.url.params["id"] == "abc123"
+        return httpx.Response(
+            200, headers={"content-type": "text/plain; charset=windows-1251"},
+            content="Глава 1\n\nТекст.".encode("cp1251"),
+        )
+
+    async def run(handler):
+        async with _client(handler) as client:
+            return await download_text_from_google_drive(LINK, client=client)
+
+    assert asyncio.run(run(handler)) == "Глава 1\n\nТекст."
+
+    with pytest.raises(RuntimeError, match="not appear to be a .txt"):
+        asyncio.run(run(lambda r: httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF")))
+    with pytest.raises(RuntimeError, match="publicly shared"):
+        asyncio.run(run(lambda r: httpx.Response(
+            200, headers={"content-type": "text/html"}, content=b"<a href='https://accounts.google.com/ServiceLogin'>",
+        )))
+    with pytest.raises(RuntimeError, match="HTTP 404"):
+        asyncio.run(run(lambda r: httpx.Response(404)))
+    with pytest.raises(ValueError):
+        asyncio.run(download_text_from_google_drive("https://example.com/x"))
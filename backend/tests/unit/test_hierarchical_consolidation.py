@@ -0,0 +1,78 @@
+"""
+Unit tests for the tree-reduce consolidation in ai_service (reduce_entity_groups).
+Token counting and the merge LLM call are mocked.
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services import ai_service
+
+
+@pytest.fixture(autouse=True)
+def _char_token_estimate():
+    with patch.object(ai_service, "count_tokens", side_effect=lambda text: len(text) // 4):
+        yield
+
+
+def _batch(n: int, per_batch: int = 8) -> dict:
+    return {
+        "characters": [
+            {"name": f"Char {n}-{i}", "physical_description": "tall, grey coat, " * 5}
+            for i in range(per_batch)
+        ] + [{"name": "Alice", "physical_description": f"red hair (section {n})"}],
+        "locations": [{"name": f"Place {n}", "visual_description": "stone walls " * 5}],
+    }
+
+
+def _fake_merge(group, run_id=None):
+    keep = ai_service.MERGE_KEEP_PER_KIND
+    return {
+        "characters": ai_service._top_by_mentions(group["characters"], keep),
+        "locations": ai_service._top_by_mentions(group["locations"], keep),
+    }
+
+
+def test_small_input_is_deduped_without_merge_calls():
+    with patch.object(ai_service, "merge_entity_group") as merge_mock:
+        reduced = ai_service.reduce_entity_groups([_batch(0, 1), _batch(1, 1)], group_tokens=10_000)
+    merge_mock.assert_not_called()
+    alice = [c for c in reduced["characters"] if c["name"] == "Alice"]
+    assert len(alice) == 1
+    assert alice[0]["mentions"] == 2
+    assert "section 0" in alice[0]["physical_description"]
+    assert "section 1" in alice[0]["physical_description"]
+
+
+def test_long_input_is_reduced_to_budget_in_levels():
+    batches = [_batch(n) for n in range(60)]
+    budget = 3000
+    assert ai_service._estimate_entity_tokens({"b": batches}) > budget * 5
+
+    with patch.object(ai_service, "merge_entity_group", side_effect=_fake_merge) as merge_mock:
+        reduced = ai_service.reduce_entity_groups(batches, group_tokens=budget, concurrency=4)
+
+    assert ai_service._estimate_entity_tokens(reduced) <= budget
+    # Groups of several batch outputs per call, not one call per batch
+    assert 1 < merge_mock.call_count < len(batches)
+    for call in merge_mock.call_args_list:
+        assert ai_service._estimate_entity_tokens(call.args[0]) <= budget
+    # The entity seen in every section survives with its mentions accumulated
+    alice = [c for c in reduced["characters"] if c["name"] == "Alice"]
+    assert alice and alice[0]["mentions"] == len(batches)
+
+
+def test_merge_falls_back_to_name_based_cut_on_bad_json():
+    class _Resp:
+        class usage:
+            prompt_tokens = completion_tokens = total_tokens = 0
+
+        choices = [type("C", (), {"message": type("M", (), {"content": "{not json"})()})()]
+
+    group = ai_service._dedupe_group(_batch(0, per_batch=30))
+    with patch.object(ai_service, "_get_client") as client_mock:
+        client_mock.return_value.chat.completions.create.return_value = _Resp()
+        merged = ai_service.merge_entity_group(group)
+    assert len(merged["characters"]) == ai_service.MERGE_KEEP_PER_KIND
+    assert json.dumps(merged)
@@ -0,0 +1,101 @@
+"""
+Unit tests for run_full_analysis() streaming results out through on_chunk_analyses /
+on_entities_ready while the run continues. LLM calls are mocked.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from app.services import ai_service
+
+CHUNKS = [{"chunk_index": i, "text": f"Chunk number {i}.", "token_count": 5} for i in range(6)]
+
+
+def _fake_batch(chunks, run_id=None):
+    return {
+        "characters": [{"name": "Alice", "physical_description": "tall"}],
+        "locations": [],
+        "chunk_analyses": [
+            {
+                "chunk_index": c["chunk_index"],
+                "action_level": 0.5,
+                "characters_present": ["Alice"],
+                "visual_layers": {"environment": "forest"},
+            }
+            for c in chunks
+        ],
+    }
+
+
+def _fake_consolidate(*args, **kwargs):
+    return {
+        "main_characters": [{"name": "Alice", "physical_description": "tall", "is_main": True}],
+        "main_locations": [],
+        "tone_and_style": {"genre": "fiction"},
+    }
+
+
+def test_chunk_analyses_and_entities_are_emitted_before_later_stages():
+    events: list[tuple] = []
+
+    def _consolidate(*args, **kwargs):
+        events.append(("consolidate",))
+        return _fake_consolidate()
+
+    with patch.object(ai_service, "analyze_chunk_batch", side_effect=_fake_batch), \
+            patch.object(ai_service, "consolidate_results", side_effect=_consolidate), \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.batch_planner.BATCH_MAX_CHUNKS", 2), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]):
+        result = ai_service.run_full_analysis(
+            CHUNKS,
+            scene_count=0,
+            concurrency=1,
+            on_chunk_analyses=lambda analyses: events.append(
+                ("chunks", [ca["chunk_index"] for ca in analyses], "visual_tokens" in analyses[0])
+            ),
+            on_entities_ready=lambda consolidated: events.append(
+                ("entities", [c["name"] for c in consolidated["main_characters"]])
+            ),
+        )
+
+    assert events == [
+        ("chunks", [0, 1], True),
+        ("chunks", [2, 3], True),
+        ("chunks", [4, 5], True),
+        ("consolidate",),
+        ("entities", ["Alice"]),
+    ]
+    # Persisted via the callback, so the bulky visual data is not kept in the result
+    assert len(result["chunk_analyses"]) == 6
+    assert all("visual_tokens" not in ca and "visual_layers" not in ca for ca in result["chunk_analyses"])
+    assert all("dramatic_score" in ca for ca in result["chunk_analyses"])
+
+
+def test_scene_stages_do_not_see_character_priority_being_written():
+    consolidated = threading.Event()
+    seen_keys: list[set] = []
+
+    def _consolidate(*args, **kwargs):
+        consolidated.set()
+        return _fake_consolidate()
+
+    def _candidates(chunk_analyses, scene_count):
+        # Runs in parallel with the character_priority stage; give it time to finish
+        consolidated.wait(5)
+        time.sleep(0.2)
+        seen_keys.extend(set(ca) for ca in chunk_analyses)
+        return []
+
+    with patch.object(ai_service, "analyze_chunk_batch", side_effect=_fake_batch), \
+            patch.object(ai_service, "consolidate_results", side_effect=_consolidate), \
+            patch.object(ai_service, "build_entity_visual_tokens_batch", return_value=[]), \
+            patch("app.services.batch_planner.BATCH_MAX_CHUNKS", 2), \
+            patch("app.services.ontology_service.classify_entities_batch", return_value=[]), \
+            patch("app.services.scene_extractor.group_chunks_into_candidate_scenes", side_effect=_candidates):
+        result = ai_service.run_full_analysis(CHUNKS, scene_count=3, concurrency=1)
+
+    assert len(seen_keys) == 6
+    assert all("character_priority" not in keys for keys in seen_keys)
+    # Merged once the stage graph has finished
+    assert all(ca["character_priority"] == 0.8 for ca in result["chunk_analyses"])
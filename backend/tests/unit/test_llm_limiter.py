@@ -0,0 +1,83 @@
+"""
+Unit tests for llm_limiter: AIMD concurrency, Retry-After handling, TPM pacing and
+which OpenAI errors are retried. No network calls — the client is a stub.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from app.services import llm_limiter
+from app.services.llm_limiter import AdaptiveLimiter, chat_completion
+
+
+def _error(cls, status: int, headers: dict | None = None, body=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return cls("error", response=httpx.Response(status, headers=headers or {}, request=request), body=body)
+
+
+def _ok(total_tokens: int = 50):
+    return SimpleNamespace(usage=SimpleNamespace(total_tokens=total_tokens))
+
+
+@pytest.fixture()
+def fresh_limiter():
+    lim = AdaptiveLimiter(initial_concurrency=4, max_concurrency=8, tpm_budget=0)
+    with patch.object(llm_limiter, "limiter", lim), patch.object(llm_limiter.time, "sleep") as sleep_mock:
+        yield lim, sleep_mock
+
+
+def test_aimd_halves_on_throttle_and_grows_on_success():
+    lim = AdaptiveLimiter(initial_concurrency=4, max_concurrency=8)
+    lim.release(lim.acquire(10), throttled=True)
+    assert lim.limit == 2
+    for _ in range(10):
+        lim.release(lim.acquire(10), tokens=10)
+    assert 4 < lim.limit <= 8
+    for _ in range(5):
+        lim.release(lim.acquire(10), throttled=True)
+    assert lim.limit == 1
+
+
+def test_tpm_budget_delays_calls_until_window_frees():
+    now = [0.0]
+    lim = AdaptiveLimiter(initial_concurrency=4, tpm_budget=100, clock=lambda: now[0])
+    lim.release(lim.acquire(80), tokens=90)
+    now[0] = 10.0
+    assert lim._wait_time(now[0], 20) > 0
+    assert lim._wait_time(now[0], 5) == 0
+    now[0] = 61.0
+    assert lim._wait_time(now[0], 80) == 0
+
+
+def test_rate_limit_retries_honouring_retry_after(fresh_limiter):
+    lim, sleep_mock = fresh_limiter
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        _error(openai.RateLimitError, 429, {"retry-after-ms": "50"}),
+        _error(openai.InternalServerError, 503),
+        _ok(),
+    ]
+    assert chat_completion(client, model="m", messages=[{"role": "user", "content": "hi"}]).usage
+    assert client.chat.completions.create.call_count == 3
+    # Retry-After pauses all callers inside the limiter; only the 503 backs off by sleeping
+    assert lim.paused_until > 0
+    assert sleep_mock.call_count == 1
+    assert lim.limit == 2  # 4 -> 2 -> 1 on the errors, +1 on the success
+    assert lim.in_flight == 0
+
+
+def test_non_retryable_errors_raise_immediately(fresh_limiter):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = _error(openai.BadRequestError, 400)
+    with pytest.raises(openai.BadRequestError):
+        chat_completion(client, model="m", messages=[])
+    assert client.chat.completions.create.call_count == 1
+
+    quota = _error(openai.RateLimitError, 429, body={"code": "insufficient_quota"})
+    client.chat.completions.create.side_effect = quota
+    with pytest.raises(openai.RateLimitError):
+        chat_completion(client, model="m", messages=[])
+    assert client.chat.completions.create.call_count == 2
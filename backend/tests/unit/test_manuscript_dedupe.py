@@ -0,0 +1,76 @@
+"""
+Unit tests for content-addressed manuscript deduplication: finding an earlier
+upload by file hash and cloning its chunks and analysis into the new book.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.database import Base
+from app.models import ChunkCharacter, SceneCharacter
+
+SHA = "ab" * 32
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _analysed_book(db) -> int:
+    book = crud.create_book(db, title="Dup", total_words=500, content_sha256=SHA)
+    chunks = crud.create_chunks_batch(db, book.id, [
+        {"chunk_index": i, "text": f"Chunk {i}", "start_page": 1, "end_page": 1, "word_count": 2}
+        for i in range(3)
+    ])
+    hero = crud.create_character(db, book_id=book.id, name="Hero", is_main=True)
+    crud.update_character(db, hero.id, selected_reference_urls='["http://img"]')
+    crud.create_location(db, book_id=book.id, name="Castle")
+    crud.link_chunk_characters(db, chunks[1].id, [hero.id])
+    scene = crud.create_scene(db, book_id=book.id, title="Duel", chunk_start_index=1, chunk_end_index=2)
+    crud.create_scene_character(db, scene_id=scene.id, character_id=hero.id)
+    crud.create_visual_bible(db, book_id=book.id, style_category="fiction")
+    crud.update_book(db, book.id, status="ready", total_pages=2, scene_count=1)
+    return book.id
+
+
+def test_find_prefers_analysed_books(db):
+    source_id = _analysed_book(db)
+    crud.create_book(db, title="Later, not chunked", content_sha256=SHA)
+    assert crud.find_book_by_content_sha256(db, SHA).id == source_id
+    assert crud.find_book_by_content_sha256(db, SHA, exclude_book_id=source_id).status == "imported"
+    assert crud.find_book_by_content_sha256(db, "cd" * 32) is None
+
+
+def test_clone_copies_chunks_and_analysis_with_remapped_ids(db):
+    source_id = _analysed_book(db)
+    target = crud.create_book(db, title="Dup", content_sha256=SHA)
+
+    counts = crud.clone_book_analysis(db, source_id, target.id)
+    assert counts == {"chunks": 3, "characters": 1, "locations": 1, "scenes": 1}
+
+    target = crud.get_book(db, target.id)
+    assert (target.status, target.total_pages, target.scene_count) == ("ready", 2, 1)
+    chunks = crud.get_chunks_by_book(db, target.id)
+    assert [c.text for c in chunks] == ["Chunk 0", "Chunk 1", "Chunk 2"]
+    (hero,) = crud.get_characters_by_book(db, target.id)
+    assert hero.is_main == 1 and hero.selected_reference_urls is None
+    assert [c.id for c in crud.get_chunks_for_character(db, hero.id)] == [chunks[1].id]
+    (scene,) = crud.get_scenes_by_book(db, target.id)
+    assert db.query(SceneCharacter).filter_by(scene_id=scene.id).one().character_id == hero.id
+    assert crud.get_visual_bible(db, target.id).style_category == "fiction"
+
+    # Source untouched; cloning again replaces rather than duplicates
+    assert db.query(ChunkCharacter).count() == 2
+    crud.clone_book_analysis(db, source_id, target.id)
+    assert len(crud.get_chunks_by_book(db, target.id)) == 3
+    assert len(crud.get_chunks_by_book(db, source_id)) == 3
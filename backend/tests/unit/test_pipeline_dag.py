@@ -0,0 +1,61 @@
+"""
+Unit tests for pipeline_dag.run_stages: dependency order, overlap of independent
+stages, inline stages on the calling thread, timings and error propagation.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.pipeline_dag import Stage, run_stages
+
+
+def test_independent_stages_overlap_and_deps_see_outputs():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _side(name):
+        def _fn(_out):
+            barrier.wait()  # deadlocks (BrokenBarrierError) unless both run at once
+            return name
+        return _fn
+
+    outputs, timings = run_stages([
+        Stage("a", _side("A")),
+        Stage("b", _side("B")),
+        Stage("c", lambda out: out["a"] + out["b"], deps=("a", "b")),
+    ], max_workers=2)
+
+    assert outputs == {"a": "A", "b": "B", "c": "AB"}
+    assert timings["c"]["start"] >= max(timings["a"]["end"], timings["b"]["end"])
+    assert set(timings["a"]) == {"start", "end", "seconds"}
+
+
+def test_inline_stage_runs_on_calling_thread():
+    caller = threading.get_ident()
+    outputs, _ = run_stages([
+        Stage("work", lambda _out: threading.get_ident()),
+        Stage("callback", lambda _out: threading.get_ident(), deps=("work",), inline=True),
+    ])
+    assert outputs["callback"] == caller
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", lambda o: 1, deps=("missing",))])
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", lambda o: 1, deps=("b",)), Stage("b", lambda o: 1, deps=("a",))])
+
+
+def test_stage_error_propagates_and_skips_dependents():
+    ran = []
+
+    def _boom(_out):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        run_stages([
+            Stage("bad", _boom),
+            Stage("slow", lambda _out: time.sleep(0.05)),
+            Stage("after", lambda _out: ran.append(1), deps=("bad",)),
+        ])
+    assert ran == []
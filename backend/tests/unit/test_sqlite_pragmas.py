@@ -0,0 +1,40 @@
+"""
+Unit tests for the SQLite pragma profile (database.use_sqlite_pragmas): pragmas are
+applied per connection, empty values keep SQLite's default, and in WAL mode a
+reader is not blocked by an open write transaction.
+"""
+from sqlalchemy import create_engine, text
+
+from app.database import SQLITE_PRAGMAS, use_sqlite_pragmas
+
+
+def _engine(tmp_path, pragmas):
+    engine = create_engine(f"sqlite:///{tmp_path / 'p.db'}", connect_args={"timeout": 0.1})
+    use_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def test_profile_is_applied_to_each_connection(tmp_path):
+    engine = _engine(tmp_path, dict(SQLITE_PRAGMAS, cache_size="-2048", temp_store=""))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -2048
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 0  # default kept
+    engine.dispose()
+
+
+def test_wal_reader_is_not_blocked_by_writer(tmp_path):
+    engine = _engine(tmp_path, {"journal_mode": "WAL", "busy_timeout": "100"})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    writer = engine.connect()
+    tx = writer.begin()
+    writer.execute(text("INSERT INTO t VALUES (2)"))  # holds the write lock
+    with engine.connect() as reader:
+        assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 1
+    tx.commit()
+    writer.close()
+    engine.dispose()
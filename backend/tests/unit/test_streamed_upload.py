@@ -0,0 +1,54 @@
+"""
+Unit tests for upload_service.stream_upload_to_disk: block-wise copy, on-the-fly
+sha256, size limit enforced mid-stream and no partial files left behind.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.services import upload_service
+from app.services.upload_service import UploadError, stream_upload_to_disk
+
+
+class _FakeUpload:
+    """Minimal async reader in the shape of FastAPI's UploadFile."""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+        self.read_sizes: list[int] = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        return self._buf.read(size)
+
+
+def test_upload_is_streamed_in_blocks_and_hashed(tmp_path):
+    data = os.urandom(10_000)
+    upload = _FakeUpload(data)
+    path, size, sha = asyncio.run(stream_upload_to_disk(upload, "book.txt", str(tmp_path), block_size=4096))
+
+    assert size == len(data)
+    assert sha == hashlib.sha256(data).hexdigest()
+    assert open(path, "rb").read() == data
+    assert set(upload.read_sizes) == {4096}
+    assert os.listdir(tmp_path) == ["book.txt"]
+
+
+def test_oversized_upload_stops_early_and_cleans_up(tmp_path):
+    upload = _FakeUpload(b"x" * 50_000)
+    with patch.object(upload_service, "MAX_FILE_SIZE", 10_000), pytest.raises(UploadError, match="too large"):
+        asyncio.run(stream_upload_to_disk(upload, "book.txt", str(tmp_path), block_size=4096))
+
+    assert len(upload.read_sizes) == 3  # stopped just past the limit, not at EOF
+    assert os.listdir(tmp_path) == []
+
+
+def test_unsupported_extension_is_rejected_before_reading(tmp_path):
+    upload = _FakeUpload(b"data")
+    with pytest.raises(UploadError, match="Invalid file type"):
+        asyncio.run(stream_upload_to_disk(upload, "book.exe", str(tmp_path)))
+    assert upload.read_sizes == []
@@ -0,0 +1,89 @@
+"""
+Unit tests for text upload decoding (upload_service.decode_text_bytes /
+extract_text_from_txt): BOMs, UTF-8, and charset detection for legacy
+single-byte encodings such as cp1251.
+"""
+import codecs
+
+import pytest
+
+from app.services import upload_service
+from app.services.upload_service import (
+    CHARSET_SAMPLE_BYTES,
+    UploadError,
+    decode_text_bytes,
+    detect_text_encoding,
+    extract_text_from_txt,
+)
+
+RUSSIAN = (
+    "Глава 1\n\nБыл тёмный и бурный вечер. Холмс сидел у окна и смотрел на улицу, "
+    "где ехали кареты. - Ватсон, - сказал он, - у нас гость.\n\n"
+)
+
+
+@pytest.mark.parametrize("bom, encoding", [
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+])
+def test_bom_selects_encoding_and_is_stripped(bom, encoding):
+    text, detected = decode_text_bytes(bom + RUSSIAN.encode(encoding))
+    assert detected == encoding
+    assert text == RUSSIAN
+
+
+def test_utf8_without_bom():
+    assert decode_text_bytes(RUSSIAN.encode("utf-8")) == (RUSSIAN, "utf-8")
+
+
+def test_line_endings_are_normalised():
+    assert decode_text_bytes(b"One.\r\n\r\nTwo.\rThree.\n") == ("One.\n\nTwo.\nThree.\n", "utf-8")
+    text, _ = decode_text_bytes(codecs.BOM_UTF16_LE + "Глава\r\n".encode("utf-16-le"))
+    assert text == "Глава\n"
+
+
+def test_utf8_character_cut_at_sample_end_is_still_utf8():
+    data = ("a" * (CHARSET_SAMPLE_BYTES - 1) + "ж" * 10).encode("utf-8")
+    assert detect_text_encoding(data) == ("utf-8", 0)
+
+
+@pytest.mark.parametrize("encoding", ["cp1251", "koi8-r"])
+def test_cyrillic_legacy_encodings_are_detected(encoding):
+    text, detected = decode_text_bytes((RUSSIAN * 5).encode(encoding))
+    assert text == RUSSIAN * 5
+    assert codecs.lookup(detected).name == codecs.lookup(encoding).name
+
+
+@pytest.mark.parametrize("encoding", ["cp1251", "koi8-r"])
+def test_legacy_encoding_after_long_ascii_prefix_is_detected(encoding):
+    # Front matter in plain ASCII beyond the detection sample: UTF-8 must not be assumed
+    text = "Project text. All rights reserved.\n\n" * (2 * CHARSET_SAMPLE_BYTES // 36) + RUSSIAN * 5
+    decoded, detected = decode_text_bytes(text.encode(encoding))
+    assert decoded == text
+    assert codecs.lookup(detected).name == codecs.lookup(encoding).name
+    assert codecs.lookup(detect_text_encoding(text.encode(encoding))[0]).name == codecs.lookup(encoding).name
+
+
+def test_stray_invalid_byte_in_utf8_keeps_utf8():
+    data = ("a" * 2 * CHARSET_SAMPLE_BYTES + RUSSIAN * 20).encode("utf-8") + b"\xff" + (RUSSIAN * 20).encode("utf-8")
+    text, detected = decode_text_bytes(data)
+    assert detected == "utf-8"
+    assert text.count("\ufffd") == 1
+    assert text.endswith(RUSSIAN)
+
+
+def test_without_detector_falls_back_to_latin1(monkeypatch):
+    monkeypatch.setattr(upload_service, "_detect_charset", None)
+    assert decode_text_bytes("café".encode("cp1252")) == ("café", "latin-1")
+
+
+def test_extract_text_from_txt_reads_cp1251(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_bytes((RUSSIAN * 3).encode("cp1251"))
+    assert extract_text_from_txt(str(path)) == RUSSIAN * 3
+
+    path.write_bytes(codecs.BOM_UTF8 + b"  \n")
+    with pytest.raises(UploadError, match="empty"):
+        extract_text_from_txt(str(path))
@@ -0,0 +1,94 @@
+"""
+Unit tests for the offset-indexed chunk text store (text_store): byte spans for
+chunker output, memory-mapped reads, and Chunk.text served from the book's file.
+The tiktoken encoder is replaced by a word/punctuation tokenizer.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.database import Base
+from app.services import text_store
+from app.services.book_service import chunk_text
+from app.services.text_store import attach_byte_spans, read_book_text, read_span
+
+
+@pytest.fixture(autouse=True)
+def close_text_maps(word_encoder):
+    yield
+    text_store.close_all()
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _book_text():
+    paras = [f"Глава {i}. " + " ".join(f"слово{j} word{j}." for j in range(30)) for i in range(8)]
+    return "\n\n".join(paras)
+
+
+def _write(tmp_path, text, name="book.txt"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_spans_read_back_exact_chunk_text(tmp_path):
+    text = _book_text()
+    path = _write(tmp_path, text)
+    chunks = chunk_text(text, target_tokens=150, overlap_tokens=40)
+
+    assert attach_byte_spans(text, chunks) == len(chunks)
+    for c in chunks:
+        assert read_span(path, c["text_offset"], c["text_length"]) == c["text"]
+
+
+def test_normalised_chunks_get_no_span():
+    text = "First para.\n \n\nSecond para."  # separator is normalised to a blank line
+    chunks = chunk_text(text, target_tokens=100, overlap_tokens=0)
+    assert attach_byte_spans(text, chunks) == 0
+    assert "text_offset" not in chunks[0]
+
+
+def test_crlf_files_are_not_offset_indexed(tmp_path):
+    path = _write(tmp_path, "One.\r\n\r\nTwo.")
+    assert read_book_text(path) == ("One.\n\nTwo.", False)
+    assert read_book_text(_write(tmp_path, "One.\n\nTwo.", "lf.txt")) == ("One.\n\nTwo.", True)
+
+
+def test_replaced_file_is_remapped(tmp_path):
+    path = _write(tmp_path, "old text")
+    assert read_span(path, 0, 3) == "old"
+    with open(path, "wb") as f:
+        f.write(b"new text, longer")
+    os.utime(path, ns=(1, 1))
+    assert read_span(path, 0, 3) == "new"
+
+
+def test_chunk_text_comes_from_the_file(db, tmp_path):
+    text = _book_text()
+    path = _write(tmp_path, text)
+    book = crud.create_book(db, title="Mapped", total_words=len(text.split()), file_path=path)
+    chunks_data = chunk_text(text, target_tokens=150, overlap_tokens=40)
+    attach_byte_spans(text, chunks_data)
+    chunks_data[0].pop("text_offset")  # one chunk keeps its own copy
+
+    crud.create_chunks_batch(db, book.id, chunks_data)
+    stored = crud.get_chunks_by_book(db, book.id)
+
+    assert [c.text for c in stored] == [c["text"] for c in chunks_data]
+    assert stored[0].stored_text == chunks_data[0]["text"]
+    assert all(c.stored_text == "" for c in stored[1:])
@@ -29,6 +29,9 @@ export interface Book {
   is_well_known: number;
   well_known_book_title?: string | null;
   similar_book_title?: string | null;
+  content_sha256?: string | null;
+  /** Set on upload when the same file was uploaded before (see cloneBookFrom). */
+  duplicate_of_book_id?: number | null;
   created_at: string | null;
   updated_at: string | null;
 }
@@ -42,6 +45,18 @@ export interface Chunk {
   end_page: number | null;
   word_count: number | null;
   dramatic_score: number | null;
+  chapter_index: number | null;
+}
+
+export interface Chapter {
+  id: number;
+  book_id: number;
+  chapter_index: number;
+  title: string | null;
+  start_char: number;
+  end_char: number;
+  start_word: number;
+  word_count: number | null;
 }
 
 export interface Character {
@@ -152,6 +167,15 @@ export async function chunkBook(bookId: number): Promise<{ status: string; messa
   return data;
 }
 
+/** Copy chunks and analysis from an earlier upload of the same file instead of re-running them. */
+export async function cloneBookFrom(
+  bookId: number,
+  sourceBookId: number
+): Promise<{ status: string; message: string }> {
+  const { data } = await api.post(`/books/${bookId}/clone-from/${sourceBookId}`);
+  return data;
+}
+
 /** Start analysis returns 202; we poll book status until ready/error. */
 const ANALYZE_START_TIMEOUT_MS = 30_000; // only wait for 202
 const ANALYZE_POLL_INTERVAL_MS = 4000;
@@ -168,6 +192,7 @@ export async function analyzeBook(
     well_known_book_title?: string;
     similar_book_title?: string;
     scene_count?: number;
+    fresh?: boolean;
   },
   options?: { onProgress?: (currentChunk: number, totalChunks: number) => void },
 ): Promise<{ status: string; estimated_time: number }> {
@@ -427,6 +452,11 @@ export async function getChunks(bookId: number): Promise<Chunk[]> {
   return data;
 }
 
+export async function getChapters(bookId: number): Promise<Chapter[]> {
+  const { data } = await api.get<Chapter[]>(`/books/${bookId}/chapters`);
+  return data;
+}
+
 /* ------------------------------------------------------------------ */
 /* Reading Progress                                                    */
 /* ------------------------------------------------------------------ */